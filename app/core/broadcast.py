@@ -0,0 +1,126 @@
+"""
+Cross-worker change notifications over PostgreSQL LISTEN/NOTIFY.
+
+Every uvicorn worker keeps its own in-process caches. When CHANGE_CHANNEL is
+set, each local notify_change is also published on that channel and a
+background thread in every other worker feeds it to its local listeners,
+so caches invalidate across the whole deployment.
+"""
+from sqlalchemy import text
+from app.core.changes import receive_change, set_publisher
+from app.core.database import Base, engine
+from decouple import config
+from typing import Optional, Set
+import json
+import os
+import select
+import socket
+import threading
+import uuid
+
+CHANGE_CHANNEL = config("CHANGE_CHANNEL", default="")
+CHANGE_RECONNECT_DELAY = config("CHANGE_RECONNECT_DELAY", default=5.0, cast=float)
+
+
+class ChangeBroadcast(object):
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def publish(self, tables: Set[str]):
+        payload = json.dumps({"origin": self.origin, "tables": sorted(tables)})
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                                   {"channel": self.channel, "payload": payload})
+                connection.commit()
+            self.published += 1
+        except Exception as e:
+            # The write itself is committed; other workers fall back to their cache TTL
+            self.errors += 1
+            self.last_error = str(e)
+
+    def _deliver(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        if message.get("origin") == self.origin:
+            return
+        self.received += 1
+        receive_change(set(message.get("tables", [])))
+
+    def _listen_once(self):
+        raw = engine.raw_connection()
+        connection = raw.driver_connection
+        # Dedicated connection for the lifetime of the listener, not returned to the pool
+        raw.detach()
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            # Changes published while we were not listening are lost; start from a clean slate
+            receive_change(set(Base.metadata.tables))
+            while not self._stop.is_set():
+                if select.select([connection], [], [], 1.0) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    self._deliver(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen_once()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                self._stop.wait(CHANGE_RECONNECT_DELAY)
+
+    def start(self):
+        set_publisher(self.publish)
+        self._thread = threading.Thread(target=self._run, name="change-broadcast", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        set_publisher(None)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        return {
+            "channel": self.channel,
+            "origin": self.origin,
+            "listening": self._thread is not None and self._thread.is_alive(),
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+change_broadcast: Optional[ChangeBroadcast] = None
+
+
+def start_change_broadcast() -> Optional[ChangeBroadcast]:
+    global change_broadcast
+    if CHANGE_CHANNEL and engine.dialect.name == "postgresql" and change_broadcast is None:
+        change_broadcast = ChangeBroadcast(CHANGE_CHANNEL)
+        change_broadcast.start()
+    return change_broadcast
+
+
+def stop_change_broadcast():
+    global change_broadcast
+    if change_broadcast is not None:
+        change_broadcast.stop()
+        change_broadcast = None
@@ -0,0 +1,125 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set, Tuple
+from decouple import config
+from app.core.changes import on_change
+
+REF_CACHE_ENABLED = config("REF_CACHE_ENABLED", default=True, cast=bool)
+REF_CACHE_TTL = config("REF_CACHE_TTL", default=300, cast=float)
+REF_CACHE_MAX_ENTRIES = config("REF_CACHE_MAX_ENTRIES", default=2048, cast=int)
+
+
+class ReferenceCache(object):
+    """
+    In-process read-through cache of rarely changing data (reference tables, user identities).
+
+    Entries are grouped by table, expire after `ttl` seconds and the least recently
+    used ones are evicted above `max_entries`. A committed write to a table drops
+    all entries of that table; a load that raced with such a write is not stored.
+    Values must be immutable (Core rows, tuples of rows).
+    """
+
+    def __init__(self, ttl: float = REF_CACHE_TTL, max_entries: int = REF_CACHE_MAX_ENTRIES,
+                 enabled: bool = REF_CACHE_ENABLED, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.invalidations: Dict[str, int] = {}
+
+    def _lookup(self, entry_key: Tuple[str, Hashable]) -> Tuple[bool, Any, int]:
+        table = entry_key[0]
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(entry_key)
+                self.hits[table] = self.hits.get(table, 0) + 1
+                return True, entry[1], 0
+            self.misses[table] = self.misses.get(table, 0) + 1
+            return False, None, self._generations.get(table, 0)
+
+    def _store(self, entry_key: Tuple[str, Hashable], value: Any, generation: int):
+        with self._lock:
+            if self._generations.get(entry_key[0], 0) == generation:
+                self._entries[entry_key] = (self._clock() + self.ttl, value)
+                self._entries.move_to_end(entry_key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def get_or_load(self, table: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return loader()
+        found, value, generation = self._lookup((table, key))
+        if found:
+            return value
+        value = loader()
+        self._store((table, key), value, generation)
+        return value
+
+    async def get_or_load_async(self, table: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """get_or_load for async readers; shares entries with the sync readers under the same key."""
+        if not self.enabled:
+            return await loader()
+        found, value, generation = self._lookup((table, key))
+        if found:
+            return value
+        value = await loader()
+        self._store((table, key), value, generation)
+        return value
+
+    def invalidate(self, tables: Set[str]):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                self.invalidations[table] = self.invalidations.get(table, 0) + 1
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] in tables]:
+                del self._entries[entry_key]
+
+    def clear(self):
+        with self._lock:
+            for table in {table for table, _ in self._entries}:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+
+    def cached(self, table: str):
+        """Decorator for crud readers `fn(db, *args)`; the result is cached per table and args."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(db, *args):
+                return self.get_or_load(table, (fn.__name__,) + args, lambda: fn(db, *args))
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        with self._lock:
+            tables = sorted(set(self.hits) | set(self.misses) | set(self.invalidations))
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": sum(self.hits.values()),
+                "misses": sum(self.misses.values()),
+                "tables": {
+                    table: {
+                        "hits": self.hits.get(table, 0),
+                        "misses": self.misses.get(table, 0),
+                        "invalidations": self.invalidations.get(table, 0)
+                    } for table in tables
+                }
+            }
+
+
+reference_cache = ReferenceCache()
+
+
+@on_change
+def _invalidate_reference_data(tables: Set[str]):
+    reference_cache.invalidate(tables)
@@ -0,0 +1,31 @@
+from typing import Callable, List, Optional, Set
+
+ChangeListener = Callable[[Set[str]], None]
+
+_listeners: List[ChangeListener] = []
+_publisher: Optional[ChangeListener] = None
+
+
+def on_change(listener: ChangeListener) -> ChangeListener:
+    """Register a callback invoked with the set of table names touched by a committed write."""
+    _listeners.append(listener)
+    return listener
+
+
+def set_publisher(publisher: Optional[ChangeListener]) -> None:
+    """Forward every local change to other workers (see app.core.broadcast)."""
+    global _publisher
+    _publisher = publisher
+
+
+def receive_change(tables: Set[str]) -> None:
+    """Deliver a change made by another worker to the local listeners only."""
+    for listener in _listeners:
+        listener(tables)
+
+
+def notify_change(*tables: str) -> None:
+    changed = set(tables)
+    receive_change(changed)
+    if _publisher is not None:
+        _publisher(changed)
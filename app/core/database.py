@@ -1,30 +1,190 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from dotenv import load_dotenv
 from decouple import config
+import bisect
+import threading
+import time
 
 load_dotenv()
 
-DB_USER = config("DB_USER")
-DB_PASSWORD = config("DB_PASSWORD")
-DB_HOST = config("DB_HOST")
-DB_PORT = config("DB_PORT")
-DB_NAME = config("DB_NAME")
+DATABASE_URL = config("DATABASE_URL", default="")
 
-SQLALCHEMY_DATABASE_URL = (
-    f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-)
+if DATABASE_URL:
+    SQLALCHEMY_DATABASE_URL = DATABASE_URL
+else:
+    DB_USER = config("DB_USER")
+    DB_PASSWORD = config("DB_PASSWORD")
+    DB_HOST = config("DB_HOST")
+    DB_PORT = config("DB_PORT")
+    DB_NAME = config("DB_NAME")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    SQLALCHEMY_DATABASE_URL = (
+        f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    )
+
+# Connections per worker are bounded by DB_POOL_SIZE + DB_MAX_OVERFLOW for the sync engine (which also
+# lends the change broadcast listener and the EXPLAIN sampler their connections) plus
+# DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW for the async one, i.e. 10 + 20 + 5 + 5 = 40 by default
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=10, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=20, cast=int)
+DB_ASYNC_POOL_SIZE = config("DB_ASYNC_POOL_SIZE", default=5, cast=int)
+DB_ASYNC_MAX_OVERFLOW = config("DB_ASYNC_MAX_OVERFLOW", default=5, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30, cast=float)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+DB_STATEMENT_TIMEOUT_MS = config("DB_STATEMENT_TIMEOUT_MS", default=0, cast=int)
+
+# Upper bounds (seconds) of the checkout wait time histogram buckets
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolMetrics(object):
+    def __init__(self, buckets=POOL_WAIT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(buckets) + 1)
+        self.wait_sum = 0.0
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.wait_sum += seconds
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, histogram = 0, {}
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                cumulative += count
+                histogram["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_sum": self.wait_sum,
+                "wait_seconds_histogram": histogram
+            }
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+class _InstrumentedPoolMixin(object):
+    """Records how long each checkout waited for a free connection."""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics = pool_metrics
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+def _engine_options(url: str, asynchronous: bool = False) -> dict:
+    if url.startswith("sqlite"):
+        # SQLite is only used for local benchmarks; keep its default pooling
+        return {} if asynchronous else {"connect_args": {"check_same_thread": False}}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        "pool_size": DB_ASYNC_POOL_SIZE if asynchronous else DB_POOL_SIZE,
+        "max_overflow": DB_ASYNC_MAX_OVERFLOW if asynchronous else DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        if asynchronous:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def _async_url(url: str) -> str:
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 
 AppSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Created on first use so deployments running only the sync path never load the async driver
+_async_engine = None
+_AsyncAppSession = None
+
+def get_async_engine():
+    global _async_engine, _AsyncAppSession
+    if _async_engine is None:
+        async_url = _async_url(SQLALCHEMY_DATABASE_URL)
+        _async_engine = create_async_engine(async_url, **_engine_options(async_url, asynchronous=True))
+        _AsyncAppSession = async_sessionmaker(bind=_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+async def dispose_async_engine():
+    global _async_engine, _AsyncAppSession
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine, _AsyncAppSession = None, None
+
 def get_db():
     db = AppSession()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncAppSession() as db:
+        yield db
+
+def _pool_stats(pool, metrics: PoolMetrics) -> dict:
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "timeout": DB_POOL_TIMEOUT,
+            "recycle": DB_POOL_RECYCLE,
+            "pre_ping": DB_POOL_PRE_PING,
+        })
+    stats.update(metrics.snapshot())
+    return stats
+
+def get_pool_stats() -> dict:
+    stats = _pool_stats(engine.pool, pool_metrics)
+    if _async_engine is not None:
+        stats["async"] = _pool_stats(_async_engine.sync_engine.pool, async_pool_metrics)
+    return stats
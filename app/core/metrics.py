@@ -0,0 +1,172 @@
+"""
+Request and database instrumentation exported in Prometheus text format.
+
+MetricsMiddleware measures every HTTP request and opens a RequestStats in a
+context variable; cursor events of every SQLAlchemy engine (sync and the
+async engine's sync core) add the statement count and DB time to it. Requests
+running more than N_PLUS_ONE_THRESHOLD statements are counted as likely N+1.
+"""
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from decouple import config
+from typing import Dict, Optional, Tuple
+import bisect
+import threading
+import time
+
+N_PLUS_ONE_THRESHOLD = config("METRICS_N_PLUS_ONE_THRESHOLD", default=20, cast=int)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestStats(object):
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram(object):
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class RequestMetrics(object):
+    def __init__(self, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self._statements: Dict[Tuple[str, str], Histogram] = {}
+        self._db_seconds: Dict[Tuple[str, str], float] = {}
+        self._n_plus_one: Dict[Tuple[str, str], int] = {}
+        self.statements_outside_requests = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            latency = self._latency.get((method, route, str(status)))
+            if latency is None:
+                latency = self._latency[(method, route, str(status))] = Histogram(LATENCY_BUCKETS)
+            latency.observe(seconds)
+            statements = self._statements.get(key)
+            if statements is None:
+                statements = self._statements[key] = Histogram(STATEMENT_BUCKETS)
+            statements.observe(stats.statements)
+            self._db_seconds[key] = self._db_seconds.get(key, 0.0) + stats.db_seconds
+            if stats.statements > self.n_plus_one_threshold:
+                self._n_plus_one[key] = self._n_plus_one.get(key, 0) + 1
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        def escape(value: str) -> str:
+            return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+    def _histogram_lines(self, name: str, histogram: Histogram, labels: dict):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f"{name}_bucket{self._labels(**labels, le=le)} {cumulative}"
+        yield f"{name}_sum{self._labels(**labels)} {histogram.total}"
+        yield f"{name}_count{self._labels(**labels)} {cumulative}"
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += ["# HELP http_request_duration_seconds Request latency by route template.",
+                      "# TYPE http_request_duration_seconds histogram"]
+            for (method, route, status), histogram in sorted(self._latency.items()):
+                lines += self._histogram_lines("http_request_duration_seconds", histogram,
+                                               {"method": method, "route": route, "status": status})
+
+            lines += ["# HELP http_request_db_statements SQL statements executed per request.",
+                      "# TYPE http_request_db_statements histogram"]
+            for (method, route), histogram in sorted(self._statements.items()):
+                lines += self._histogram_lines("http_request_db_statements", histogram,
+                                               {"method": method, "route": route})
+
+            lines += ["# HELP http_request_db_seconds_total Time spent in SQL statements by route.",
+                      "# TYPE http_request_db_seconds_total counter"]
+            for (method, route), seconds in sorted(self._db_seconds.items()):
+                lines.append(f"http_request_db_seconds_total{self._labels(method=method, route=route)} {seconds}")
+
+            lines += [f"# HELP http_requests_n_plus_one_total Requests running more than "
+                      f"{self.n_plus_one_threshold} SQL statements (likely N+1).",
+                      "# TYPE http_requests_n_plus_one_total counter"]
+            for (method, route), count in sorted(self._n_plus_one.items()):
+                lines.append(f"http_requests_n_plus_one_total{self._labels(method=method, route=route)} {count}")
+
+            lines += ["# HELP db_statements_outside_requests_total SQL statements not issued by an HTTP request.",
+                      "# TYPE db_statements_outside_requests_total counter",
+                      f"db_statements_outside_requests_total {self.statements_outside_requests}"]
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    stats = _current.get()
+    if stats is None:
+        request_metrics.statements_outside_requests += 1
+        return
+    stats.statements += 1
+    stats.db_seconds += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("metrics_started"):
+        connection.info["metrics_started"].pop()
+
+
+class MetricsMiddleware(object):
+    """ASGI middleware; latency covers the whole response, including streamed bodies."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = [500]
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot blow up cardinality
+            template = getattr(route, "path", None) or "unmatched"
+            request_metrics.observe(scope["method"], template, status[0], time.perf_counter() - started, stats)
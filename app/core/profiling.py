@@ -0,0 +1,220 @@
+"""
+SQL profiler: statement fingerprints, latency percentiles and sampled plans.
+
+Cursor events of every engine normalize each statement into a fingerprint
+(literals, bind parameters and IN / VALUES lists collapsed) and record its
+duration. SELECTs slower than SLOW_QUERY_MS are, with probability
+EXPLAIN_SAMPLE_RATE and at most once per EXPLAIN_INTERVAL per fingerprint,
+re-run as EXPLAIN (ANALYZE, BUFFERS) on a separate read-only connection in
+a background thread. Only statements from the psycopg2 engine are explained;
+their parameters can be replayed as they are.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from decouple import config
+from typing import Deque, Dict, List, Optional
+import functools
+import hashlib
+import random
+import re
+import threading
+import time
+
+QUERY_PROFILING = config("QUERY_PROFILING", default=True, cast=bool)
+SLOW_QUERY_MS = config("SLOW_QUERY_MS", default=200, cast=float)
+EXPLAIN_SAMPLE_RATE = config("EXPLAIN_SAMPLE_RATE", default=0.1, cast=float)
+EXPLAIN_INTERVAL = config("EXPLAIN_INTERVAL", default=300, cast=float)
+EXPLAIN_TIMEOUT_MS = config("EXPLAIN_TIMEOUT_MS", default=10000, cast=int)
+PROFILE_MAX_FINGERPRINTS = config("PROFILE_MAX_FINGERPRINTS", default=500, cast=int)
+PROFILE_SAMPLES = config("PROFILE_SAMPLES", default=1000, cast=int)
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|\$\d+|\?|(?<![:\w]):\w+")
+_NUMBERS = re.compile(r"(?<![\w\"$])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.I)
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\(\?\.\.\.\)|\(\?\))(?:\s*,\s*(?:\(\?\.\.\.\)|\(\?\)))+")
+_SPACES = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize(statement: str) -> str:
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PARAMS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _LISTS.sub("(?...)", sql)
+    sql = _ROWS.sub(r"\1, ...", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class QueryStats(object):
+    def __init__(self, sql: str, samples: int):
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.durations: Deque[float] = deque(maxlen=samples)
+        self.plan: Optional[str] = None
+        self.plan_captured_at: Optional[float] = None
+        self.plan_requested_at = 0.0
+
+    def to_dict(self, key: str) -> dict:
+        ordered = sorted(self.durations)
+        return {
+            "fingerprint": key,
+            "sql": self.sql,
+            "calls": self.calls,
+            "slow_calls": self.slow,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.calls * 1000, 3) if self.calls else 0.0,
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "plan": self.plan,
+            "plan_captured_at": self.plan_captured_at
+        }
+
+
+class QueryProfiler(object):
+    SORT_KEYS = ("total_ms", "p99_ms", "p95_ms", "mean_ms", "calls", "slow_calls", "max_ms")
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, sample_rate: float = EXPLAIN_SAMPLE_RATE,
+                 explain_interval: float = EXPLAIN_INTERVAL, max_fingerprints: int = PROFILE_MAX_FINGERPRINTS,
+                 samples: int = PROFILE_SAMPLES):
+        self.slow_seconds = slow_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain_interval = explain_interval
+        self.max_fingerprints = max_fingerprints
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._queries: Dict[str, QueryStats] = {}
+        self._explainer: Optional[ThreadPoolExecutor] = None
+        self._explain_pending = 0
+        self.dropped = 0
+        self.explain_errors = 0
+
+    def record(self, engine, statement: str, parameters, seconds: float, executemany: bool):
+        normalized = normalize(statement)
+        key = fingerprint(normalized)
+        explain = False
+        with self._lock:
+            stats = self._queries.get(key)
+            if stats is None:
+                if len(self._queries) >= self.max_fingerprints:
+                    self.dropped += 1
+                    return
+                stats = self._queries[key] = QueryStats(normalized, self.samples)
+            stats.calls += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.durations.append(seconds)
+            if seconds >= self.slow_seconds:
+                stats.slow += 1
+                now = time.time()
+                if (not executemany and engine.dialect.driver == "psycopg2"
+                        and normalized.split(" ", 1)[0].upper() in ("SELECT", "WITH")
+                        and now - stats.plan_requested_at >= self.explain_interval
+                        and self._explain_pending < 1
+                        and random.random() < self.sample_rate):
+                    stats.plan_requested_at = now
+                    self._explain_pending += 1
+                    explain = True
+        if explain:
+            self._get_explainer().submit(self._explain, engine, key, statement, parameters)
+
+    def _get_explainer(self) -> ThreadPoolExecutor:
+        if self._explainer is None:
+            self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        return self._explainer
+
+    def _explain(self, engine, key: str, statement: str, parameters):
+        try:
+            with engine.connect() as connection:
+                connection.info["profiling_explain"] = True
+                try:
+                    # ANALYZE executes the query: never let it write, never let it run long
+                    connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+                    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(EXPLAIN_TIMEOUT_MS)}")
+                    rows = connection.exec_driver_sql(
+                        "EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters
+                    ).all()
+                finally:
+                    connection.rollback()
+                    connection.info.pop("profiling_explain", None)
+            plan = "\n".join(row[0] for row in rows)
+            with self._lock:
+                stats = self._queries.get(key)
+                if stats is not None:
+                    stats.plan = plan
+                    stats.plan_captured_at = time.time()
+        except Exception:
+            with self._lock:
+                self.explain_errors += 1
+        finally:
+            with self._lock:
+                self._explain_pending -= 1
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> List[dict]:
+        with self._lock:
+            items = [stats.to_dict(key) for key, stats in self._queries.items()]
+        items.sort(key=lambda item: item[sort], reverse=True)
+        return items[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self.dropped = 0
+            self.explain_errors = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "fingerprints": len(self._queries),
+                "max_fingerprints": self.max_fingerprints,
+                "dropped": self.dropped,
+                "slow_query_ms": self.slow_seconds * 1000,
+                "explain_sample_rate": self.sample_rate,
+                "explain_pending": self._explain_pending,
+                "explain_errors": self.explain_errors
+            }
+
+    def shutdown(self):
+        if self._explainer is not None:
+            self._explainer.shutdown(wait=False, cancel_futures=True)
+            self._explainer = None
+
+
+query_profiler = QueryProfiler()
+
+
+if QUERY_PROFILING:
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["profiling_started"].pop()
+        if not conn.info.get("profiling_explain"):
+            query_profiler.record(conn.engine, statement, parameters, seconds, executemany)
+
+    @event.listens_for(Engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("profiling_started"):
+            connection.info["profiling_started"].pop()
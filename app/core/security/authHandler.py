@@ -9,6 +9,7 @@ class AuthHandler(object):
 
     @staticmethod
     def sign_jwt(user_id: int) -> str:
+        # Username and roles are loaded from the database per identity (see protectRoute), not trusted from the token
         payload = {
             "user_id": user_id,
             "expires": time.time() + 900
@@ -1,4 +1,20 @@
 from bcrypt import checkpw, hashpw, gensalt
+from concurrent.futures import Future, ThreadPoolExecutor
+from decouple import config
+from typing import Callable, Optional
+import asyncio
+import threading
+import time
+
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+HASH_WORKERS = config("HASH_WORKERS", default=2, cast=int)
+HASH_MAX_QUEUE = config("HASH_MAX_QUEUE", default=32, cast=int)
+HASH_QUEUE_TIMEOUT = config("HASH_QUEUE_TIMEOUT", default=5.0, cast=float)
+
+
+class HashQueueFull(Exception):
+    pass
+
 
 class HashHelper(object):
     
@@ -7,8 +23,103 @@ class HashHelper(object):
         return checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
         
     @staticmethod
-    def get_password_hash(plain_password: str):
+    def get_password_hash(plain_password: str, rounds: int = BCRYPT_ROUNDS):
         return hashpw(
             plain_password.encode('utf-8'),
-            gensalt()
-        ).decode('utf-8')
\ No newline at end of file
+            gensalt(rounds)
+        ).decode('utf-8')
+
+    @staticmethod
+    def needs_rehash(hashed_password: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+        """True when the hash was made with a different bcrypt cost than configured ($2b$<cost>$...)."""
+        try:
+            return int(hashed_password.split('$')[2]) != rounds
+        except (IndexError, ValueError):
+            return True
+
+
+class PasswordHashService(object):
+    """
+    Runs bcrypt on a small dedicated thread pool (bcrypt releases the GIL) so a burst
+    of logins cannot occupy the Starlette threadpool. At most workers + max_queue
+    operations are accepted; one that waited longer than queue_timeout for a worker
+    is dropped without hashing.
+    """
+
+    def __init__(self, max_workers: int = HASH_WORKERS, max_queue: int = HASH_MAX_QUEUE,
+                 queue_timeout: float = HASH_QUEUE_TIMEOUT, rounds: int = BCRYPT_ROUNDS):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rounds = rounds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "completed_total": 0,
+            "rejected_total": 0,
+            "timed_out_total": 0,
+            "hash_seconds_total": 0.0,
+            "queue_seconds_total": 0.0
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._stats["rejected_total"] += 1
+                raise HashQueueFull("Zbyt wiele jednoczesnych logowań, spróbuj ponownie")
+            self._in_flight += 1
+            executor = self._get_executor()
+        enqueued = time.perf_counter()
+
+        def _run():
+            started = time.perf_counter()
+            try:
+                if started - enqueued > self.queue_timeout:
+                    with self._lock:
+                        self._stats["timed_out_total"] += 1
+                    raise HashQueueFull("Przekroczono czas oczekiwania na weryfikację hasła")
+                result = fn(*args)
+                with self._lock:
+                    self._stats["completed_total"] += 1
+                    self._stats["queue_seconds_total"] += started - enqueued
+                    self._stats["hash_seconds_total"] += time.perf_counter() - started
+                return result
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        return executor.submit(_run)
+
+    async def hash(self, plain_password: str) -> str:
+        return await asyncio.wrap_future(self._submit(HashHelper.get_password_hash, plain_password, self.rounds))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(HashHelper.verify_password, plain_password, hashed_password))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return HashHelper.needs_rehash(hashed_password, self.rounds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "rounds": self.rounds,
+                "in_flight": self._in_flight,
+                **self._stats
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHashService()
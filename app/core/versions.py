@@ -0,0 +1,60 @@
+import hashlib
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Iterable, Set
+from decouple import config
+from app.core.changes import on_change
+
+ETAG_TTL = config("ETAG_TTL", default=60, cast=float)
+
+
+class TableVersions(object):
+    """
+    Per-table write counters, bumped by every committed change (see notify_change).
+
+    Counters live in process memory and restart at zero, so ETags carry a random
+    per-process prefix: a tag issued by another worker or before a restart never
+    matches and the client simply gets a fresh 200.
+
+    Writes this process is not told about (another worker without CHANGE_CHANNEL,
+    the GTFS import CLI, manual SQL) do not move the counters, so tags also carry
+    the current `ttl` epoch: a tag stays valid for at most `ttl` seconds, like the
+    ReferenceCache entries the responses are built from.
+    """
+
+    def __init__(self, ttl: float = ETAG_TTL, clock: Callable[[], float] = time.time):
+        self.prefix = secrets.token_hex(4)
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+
+    def bump(self, tables: Set[str]):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def version(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def epoch(self) -> int:
+        return int(self._clock() // self.ttl) if self.ttl > 0 else 0
+
+    def etag(self, tables: Iterable[str], scope: str) -> str:
+        """Weak ETag of a response built from `tables`; scope distinguishes URLs (path and query)."""
+        versions = ".".join(str(self.version(table)) for table in tables)
+        digest = hashlib.sha1(scope.encode("utf-8")).hexdigest()[:12]
+        return f'W/"{self.prefix}-{self.epoch()}-{versions}-{digest}"'
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"prefix": self.prefix, "ttl": self.ttl, "epoch": self.epoch(), "tables": dict(self._versions)}
+
+
+table_versions = TableVersions()
+
+
+@on_change
+def _bump_versions(tables: Set[str]):
+    table_versions.bump(tables)
@@ -1,13 +1,30 @@
-from sqlalchemy.orm import Session
-from ..models.system import Autobusy, Kierowcy, Brygady, Przystanki, Warianty, Trasy, Linie, Linie_Trasy
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import insert, select, func, and_, or_
+from ..models.system import (
+    Autobusy, Kierowcy, Brygady, Przystanki, Warianty, Trasy, Linie, Linie_Trasy,
+    Przystanki_Warianty, Warianty_Trasy, Odjazdy
+)
 from ..schema.autobus import (
     LiniaInCreate, AutobusInCreate, KierowcaInCreate, BrygadaInCreate, 
     PrzystanekInCreate, WariantInCreate, TrasaInCreate, LiniaInCreate,
     AutobusInUpdate, KierowcaInUpdate, BrygadaInUpdate, PrzystanekInUpdate,
-    WariantInUpdate, TrasaInUpdate, LiniaInUpdate
+    WariantInUpdate, TrasaInUpdate, LiniaInUpdate, TrasaCreate
 )
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
+from app.core.changes import notify_change
+from app.core.cache import reference_cache
+from ..repository.tableRepo import TableMessages, TableRepository
+from .bulk import BulkResult, UpsertResult, bulk_insert, bulk_upsert, dialect_insert
+from .sequence import SEQUENCE_GAP
+from .pagination import ListSpec, ListParams, Page, EQ, PREFIX, paginate, paginate_rows
+from decouple import config
+from datetime import time
+from typing import Dict, Iterable, List, Optional
+import json
+
+# Estimated travel time between consecutive stops, for stops without stored departures
+STOP_INTERVAL = config("STOP_INTERVAL", default=120, cast=int)
 
 #autobus
 def create_autobus(db: Session, autobus: AutobusInCreate):
@@ -18,6 +35,7 @@ def create_autobus(db: Session, autobus: AutobusInCreate):
     )
     db.add(db_autobus)
     db.commit()
+    notify_change(Autobusy.__tablename__)
     db.refresh(db_autobus)
     return db_autobus
 
@@ -30,6 +48,7 @@ def create_kierowca(db: Session, kierowca: KierowcaInCreate):
     )
     db.add(db_kierowca)
     db.commit()
+    notify_change(Kierowcy.__tablename__)
     db.refresh(db_kierowca)
     return db_kierowca
 
@@ -37,6 +56,7 @@ def create_brygada(db: Session, brygada: BrygadaInCreate):
     db_brygada = Brygady(nazwa=brygada.nazwa)
     db.add(db_brygada)
     db.commit()
+    notify_change(Brygady.__tablename__)
     db.refresh(db_brygada)
     return db_brygada
 
@@ -49,6 +69,7 @@ def create_przystanek(db: Session, przystanek: PrzystanekInCreate):
     )
     db.add(db_przystanek)
     db.commit()
+    notify_change(Przystanki.__tablename__)
     db.refresh(db_przystanek)
     return db_przystanek
 
@@ -59,6 +80,7 @@ def create_wariant(db: Session, wariant: WariantInCreate):
     )
     db.add(db_wariant)
     db.commit()
+    notify_change(Warianty.__tablename__)
     db.refresh(db_wariant)
     return db_wariant
 
@@ -66,6 +88,7 @@ def create_trasa(db: Session, trasa: TrasaInCreate):
     db_trasa = Trasy(nazwa=trasa.nazwa)
     db.add(db_trasa)
     db.commit()
+    notify_change(Trasy.__tablename__)
     db.refresh(db_trasa)
     return db_trasa
 
@@ -78,32 +101,141 @@ def create_linie(db: Session, linia: LiniaInCreate):
         )
         db.add(db_linia)
         db.commit()
+        notify_change(Linie.__tablename__)
         db.refresh(db_linia)
         return db_linia
     except IntegrityError:
         db.rollback()
         raise
 
+# Zbiorcze dodawanie: jedna transakcja, konflikty na unikalnych kolumnach raportowane per pozycja
+def create_autobusy_bulk(db: Session, autobusy: List[AutobusInCreate]) -> BulkResult:
+    return bulk_insert(db, Autobusy, [autobus.model_dump() for autobus in autobusy], key="rejestracja")
+
+def create_kierowcy_bulk(db: Session, kierowcy: List[KierowcaInCreate]) -> BulkResult:
+    return bulk_insert(db, Kierowcy, [kierowca.model_dump() for kierowca in kierowcy], key="pesel")
+
+def create_brygady_bulk(db: Session, brygady: List[BrygadaInCreate]) -> BulkResult:
+    return bulk_insert(db, Brygady, [brygada.model_dump() for brygada in brygady], key="nazwa")
+
+def create_przystanki_bulk(db: Session, przystanki: List[PrzystanekInCreate]) -> BulkResult:
+    return bulk_insert(db, Przystanki, [przystanek.model_dump() for przystanek in przystanki], key="nazwa")
+
+def create_linie_bulk(db: Session, linie: List[LiniaInCreate]) -> BulkResult:
+    return bulk_insert(db, Linie, [linia.model_dump() for linia in linie], key="numer")
+
+def create_trasy_bulk(db: Session, trasy: List[TrasaInCreate]) -> BulkResult:
+    # Trasy.nazwa has no unique constraint, so every route is inserted
+    return bulk_insert(db, Trasy, [trasa.model_dump() for trasa in trasy])
+
+
+# Synchronizacja po kluczu naturalnym (np. nocny import z systemu floty)
+def sync_autobusy(db: Session, autobusy: List[AutobusInCreate], delete_missing: bool = False) -> UpsertResult:
+    return bulk_upsert(db, Autobusy, [autobus.model_dump() for autobus in autobusy], "rejestracja", delete_missing)
+
+def sync_kierowcy(db: Session, kierowcy: List[KierowcaInCreate], delete_missing: bool = False) -> UpsertResult:
+    return bulk_upsert(db, Kierowcy, [kierowca.model_dump() for kierowca in kierowcy], "pesel", delete_missing)
+
+def sync_przystanki(db: Session, przystanki: List[PrzystanekInCreate], delete_missing: bool = False) -> UpsertResult:
+    return bulk_upsert(db, Przystanki, [przystanek.model_dump() for przystanek in przystanki], "nazwa", delete_missing)
+
+def sync_linie(db: Session, linie: List[LiniaInCreate], delete_missing: bool = False) -> UpsertResult:
+    return bulk_upsert(db, Linie, [linia.model_dump() for linia in linie], "numer", delete_missing)
+
+def create_trasa_z_wariantami(db: Session, dane: TrasaCreate) -> dict:
+    """
+    Create a route with one or more variants in one transaction. Stops of all variants are
+    resolved in a single query and the ordering/departure rows are bulk-inserted.
+    """
+    warianty = dane.lista_wariantow()
+    if not warianty:
+        raise HTTPException(status_code=400, detail="Podaj przystanki_ids lub listę wariantów")
+
+    ids = {przystanek_id for wariant in warianty for przystanek_id in wariant.przystanki_ids}
+    przystanki = {
+        p.id: {"id": p.id, "nazwa": p.nazwa, "ulica": p.ulica, "longi": p.longi, "lati": p.lati}
+        for p in db.query(Przystanki).filter(Przystanki.id.in_(ids))
+    }
+    for wariant in warianty:
+        for przystanek_id in wariant.przystanki_ids:
+            if przystanek_id not in przystanki:
+                raise HTTPException(status_code=404, detail=f"Przystanek o ID {przystanek_id} nie istnieje")
+
+    trasa = Trasy(nazwa=dane.nazwa_trasy)
+    db.add(trasa)
+    db.flush()
+
+    wariant_ids = db.scalars(
+        insert(Warianty).returning(Warianty.id, sort_by_parameter_order=True),
+        [{
+            "nazwa": wariant.nazwa or wariant.kod_wariantu,
+            "kod_wariantu": wariant.kod_wariantu,
+            "godziny_odjazdu": json.dumps(wariant.godziny_odjazdu)
+        } for wariant in warianty]
+    ).all()
+
+    db.execute(insert(Warianty_Trasy), [
+        {"id_warianty": wariant_id, "id_trasy": trasa.id} for wariant_id in wariant_ids
+    ])
+    db.execute(insert(Przystanki_Warianty), [
+        {"id_przystanki": przystanek_id, "id_warianty": wariant_id, "kolejnosc": pozycja * SEQUENCE_GAP}
+        for wariant_id, wariant in zip(wariant_ids, warianty)
+        for pozycja, przystanek_id in enumerate(wariant.przystanki_ids, start=1)
+    ])
+    # Odjazdy z przystanku początkowego każdego wariantu
+    odjazdy = [
+        {"id_warianty": wariant_id, "id_przystanku": wariant.przystanki_ids[0], "godzina": _parse_departure(godzina)}
+        for wariant_id, wariant in zip(wariant_ids, warianty)
+        for godzina in sorted(set(wariant.godziny_odjazdu))
+    ]
+    if odjazdy:
+        db.execute(insert(Odjazdy), odjazdy)
+
+    if dane.numer_linii:
+        db.add(Linie_Trasy(id_trasy=trasa.id, numer_linii=dane.numer_linii))
+
+    trasa_dane = {"id": trasa.id, "nazwa": trasa.nazwa}
+    db.commit()
+    notify_change(
+        Trasy.__tablename__, Warianty.__tablename__, Warianty_Trasy.__tablename__,
+        Przystanki_Warianty.__tablename__, Linie_Trasy.__tablename__, Odjazdy.__tablename__
+    )
+
+    wynik = [{
+        "id": wariant_id,
+        "nazwa": wariant.nazwa or wariant.kod_wariantu,
+        "kod_wariantu": wariant.kod_wariantu,
+        "godziny_odjazdu": wariant.godziny_odjazdu,
+        "przystanki": [przystanki[przystanek_id] for przystanek_id in wariant.przystanki_ids]
+    } for wariant_id, wariant in zip(wariant_ids, warianty)]
+    return {
+        **trasa_dane,
+        "wariant": wynik[0],
+        "przystanki": wynik[0]["przystanki"],
+        "warianty": wynik,
+        "numer_linii": dane.numer_linii
+    }
+
 
 #GET
+# Dane referencyjne (linie, przystanki, trasy, brygady, autobusy) są czytane przez
+# reference_cache jako niezmienne wiersze, pojedynczo i stronami list; zapis do tabeli
+# unieważnia jej wpisy
 
-def get_linie(db: Session):
-    return db.query(Linie).order_by(Linie.numer.asc()).all()
+def _row(db: Session, model, row_id: int):
+    return db.execute(select(*model.__table__.columns).where(model.id == row_id)).first()
 
+@reference_cache.cached(Linie.__tablename__)
 def get_linia_by_id(db: Session, linia_id: int):
-    return db.query(Linie).filter(Linie.id == linia_id).first()
-
-def get_przystanki(db: Session):
-    return db.query(Przystanki).all()
+    return _row(db, Linie, linia_id)
 
+@reference_cache.cached(Przystanki.__tablename__)
 def get_przystanek_by_id(db: Session, przystanek_id: int):
-    return db.query(Przystanki).filter(Przystanki.id == przystanek_id).first()
-
-def get_autobusy(db: Session):
-    return db.query(Autobusy).all()
+    return _row(db, Przystanki, przystanek_id)
 
+@reference_cache.cached(Autobusy.__tablename__)
 def get_autobus_by_id(db: Session, autobus_id: int):
-    return db.query(Autobusy).filter(Autobusy.id == autobus_id).first()
+    return _row(db, Autobusy, autobus_id)
 
 def get_kierowcy(db: Session):
     return db.query(Kierowcy).all()
@@ -111,17 +243,13 @@ def get_kierowcy(db: Session):
 def get_kierowca_by_id(db: Session, kierowca_id: int):
     return db.query(Kierowcy).filter(Kierowcy.id == kierowca_id).first()
 
-def get_brygady(db: Session):
-    return db.query(Brygady).order_by(Brygady.nazwa).all()
-
+@reference_cache.cached(Brygady.__tablename__)
 def get_brygada_by_id(db: Session, brygada_id: int):
-    return db.query(Brygady).filter(Brygady.id == brygada_id).first()
-
-def get_trasy(db: Session):
-    return db.query(Trasy).all()
+    return _row(db, Brygady, brygada_id)
 
+@reference_cache.cached(Trasy.__tablename__)
 def get_trasa_by_id(db: Session, trasa_id: int):
-    return db.query(Trasy).filter(Trasy.id == trasa_id).first()
+    return _row(db, Trasy, trasa_id)
 
 def get_warianty(db: Session):
     return db.query(Warianty).all()
@@ -129,229 +257,328 @@ def get_warianty(db: Session):
 def get_wariant_by_id(db: Session, wariant_id: int):
     return db.query(Warianty).filter(Warianty.id == wariant_id).first()
 
+# Listy stronicowane (keyset): dozwolone pola sortowania i filtrowania
+LINIE_LISTING = ListSpec(
+    Linie,
+    sort_fields={"id": Linie.id, "numer": Linie.numer, "kierunek": Linie.kierunek},
+    filter_fields={"numer": (Linie.numer, PREFIX), "kierunek": (Linie.kierunek, PREFIX)},
+    default_sort="numer"
+)
+PRZYSTANKI_LISTING = ListSpec(
+    Przystanki,
+    sort_fields={"id": Przystanki.id, "nazwa": Przystanki.nazwa, "ulica": Przystanki.ulica},
+    filter_fields={"nazwa": (Przystanki.nazwa, PREFIX), "ulica": (Przystanki.ulica, PREFIX)}
+)
+AUTOBUSY_LISTING = ListSpec(
+    Autobusy,
+    sort_fields={"id": Autobusy.id, "rejestracja": Autobusy.rejestracja, "marka": Autobusy.marka, "model": Autobusy.model},
+    filter_fields={"rejestracja": (Autobusy.rejestracja, PREFIX), "marka": (Autobusy.marka, EQ), "model": (Autobusy.model, EQ)}
+)
+KIEROWCY_LISTING = ListSpec(
+    Kierowcy,
+    sort_fields={"id": Kierowcy.id, "nazwisko": Kierowcy.nazwisko, "imie": Kierowcy.imie},
+    filter_fields={"nazwisko": (Kierowcy.nazwisko, PREFIX), "imie": (Kierowcy.imie, PREFIX), "pesel": (Kierowcy.pesel, EQ)}
+)
+BRYGADY_LISTING = ListSpec(
+    Brygady,
+    sort_fields={"id": Brygady.id, "nazwa": Brygady.nazwa},
+    filter_fields={"nazwa": (Brygady.nazwa, PREFIX)},
+    default_sort="nazwa"
+)
+TRASY_LISTING = ListSpec(
+    Trasy,
+    sort_fields={"id": Trasy.id, "nazwa": Trasy.nazwa},
+    filter_fields={"nazwa": (Trasy.nazwa, PREFIX)}
+)
+WARIANTY_LISTING = ListSpec(
+    Warianty,
+    sort_fields={"id": Warianty.id, "nazwa": Warianty.nazwa, "kod_wariantu": Warianty.kod_wariantu},
+    filter_fields={"nazwa": (Warianty.nazwa, PREFIX), "kod_wariantu": (Warianty.kod_wariantu, EQ)}
+)
+
+def page_cache_key(params: ListParams) -> tuple:
+    return ("page", params.limit, params.after, params.sort, params.desc, tuple(sorted(params.filters.items())))
+
+def _cached_page(db: Session, spec: ListSpec, params: ListParams) -> Page:
+    def load():
+        page = paginate_rows(db, spec, params)
+        return Page(tuple(page.items), page.next_cursor)
+    return reference_cache.get_or_load(spec.model.__tablename__, page_cache_key(params), load)
+
+def get_linie_page(db: Session, params: ListParams) -> Page:
+    return _cached_page(db, LINIE_LISTING, params)
+
+def get_przystanki_page(db: Session, params: ListParams) -> Page:
+    return _cached_page(db, PRZYSTANKI_LISTING, params)
+
+def get_autobusy_page(db: Session, params: ListParams) -> Page:
+    return _cached_page(db, AUTOBUSY_LISTING, params)
+
+def get_kierowcy_page(db: Session, params: ListParams) -> Page:
+    return paginate(db, KIEROWCY_LISTING, params)
+
+def get_brygady_page(db: Session, params: ListParams) -> Page:
+    return _cached_page(db, BRYGADY_LISTING, params)
+
+def get_trasy_page(db: Session, params: ListParams) -> Page:
+    return _cached_page(db, TRASY_LISTING, params)
+
+def get_warianty_page(db: Session, params: ListParams) -> Page:
+    return paginate_rows(db, WARIANTY_LISTING, params)
+
 #ALTER
+AUTOBUSY_MESSAGES = TableMessages(
+    not_found="Autobus nie został znaleziony",
+    conflict="Numer rejestracyjny już istnieje w systemie!",
+    in_use="Nie można usunąć autobusu - jest używany w systemie",
+    deleted="Autobus {rejestracja} został usunięty",
+)
+KIEROWCY_MESSAGES = TableMessages(
+    not_found="Kierowca nie został znaleziony",
+    conflict="PESEL już istnieje w systemie!",
+    in_use="Nie można usunąć kierowcy - jest przypisany do brygady",
+    deleted="Kierowca {imie} {nazwisko} został usunięty",
+)
+BRYGADY_MESSAGES = TableMessages(
+    not_found="Brygada nie została znaleziona",
+    conflict="Brygada o tej nazwie już istnieje!",
+    in_use="Nie można usunąć brygady - ma przypisanych kierowców lub autobusy",
+    deleted="Brygada {nazwa} została usunięta",
+)
+PRZYSTANKI_MESSAGES = TableMessages(
+    not_found="Przystanek nie został znaleziony",
+    conflict="Przystanek o tej nazwie już istnieje!",
+    in_use="Nie można usunąć przystanku - jest używany w trasach",
+    deleted="Przystanek {nazwa} został usunięty",
+)
+LINIE_MESSAGES = TableMessages(
+    not_found="Linia nie została znaleziona",
+    conflict="Linia o tym numerze już istnieje!",
+    in_use="Nie można usunąć linii - ma przypisane trasy lub brygady",
+    deleted="Linia {numer} została usunięta",
+)
+TRASY_MESSAGES = TableMessages(
+    not_found="Trasa nie została znaleziona",
+    conflict="Trasa o tej nazwie już istnieje!",
+    in_use="Nie można usunąć trasy - jest używana przez linie",
+    deleted="Trasa {nazwa} została usunięta",
+)
+WARIANTY_MESSAGES = TableMessages(
+    not_found="Wariant nie został znaleziony",
+    conflict="Kod wariantu już istnieje w systemie!",
+    in_use="Nie można usunąć wariantu - jest używany w trasach",
+    deleted="Wariant {nazwa} został usunięty",
+)
+
+def _changes(dane) -> dict:
+    # Fields sent as null are left unchanged, as before
+    return {key: value for key, value in dane.dict(exclude_unset=True, exclude={'id'}).items() if value is not None}
+
 def update_autobus(db: Session, autobus_update: AutobusInUpdate):
-    db_autobus = db.query(Autobusy).filter(Autobusy.id == autobus_update.id).first()
-    if not db_autobus:
-        raise HTTPException(status_code=404, detail="Autobus nie został znaleziony")
-    
-    update_data = autobus_update.dict(exclude_unset=True, exclude={'id'})
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_autobus, key, value)
-    
-    try:
-        db.commit()
-        db.refresh(db_autobus)
-        return db_autobus
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Numer rejestracyjny już istnieje w systemie!")
+    return TableRepository(db, Autobusy, AUTOBUSY_MESSAGES).update(autobus_update.id, _changes(autobus_update))
 
 def update_kierowca(db: Session, kierowca_update: KierowcaInUpdate):
-    db_kierowca = db.query(Kierowcy).filter(Kierowcy.id == kierowca_update.id).first()
-    if not db_kierowca:
-        raise HTTPException(status_code=404, detail="Kierowca nie został znaleziony")
-    
-    update_data = kierowca_update.dict(exclude_unset=True, exclude={'id'})
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_kierowca, key, value)
-    
-    try:
-        db.commit()
-        db.refresh(db_kierowca)
-        return db_kierowca
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="PESEL już istnieje w systemie!")
+    return TableRepository(db, Kierowcy, KIEROWCY_MESSAGES).update(kierowca_update.id, _changes(kierowca_update))
 
 def update_brygada(db: Session, brygada_update: BrygadaInUpdate):
-    db_brygada = db.query(Brygady).filter(Brygady.id == brygada_update.id).first()
-    if not db_brygada:
-        raise HTTPException(status_code=404, detail="Brygada nie została znaleziona")
-    
-    update_data = brygada_update.dict(exclude_unset=True, exclude={'id'})
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_brygada, key, value)
-    
-    try:
-        db.commit()
-        db.refresh(db_brygada)
-        return db_brygada
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Brygada o tej nazwie już istnieje!")
+    return TableRepository(db, Brygady, BRYGADY_MESSAGES).update(brygada_update.id, _changes(brygada_update))
 
 def update_przystanek(db: Session, przystanek_update: PrzystanekInUpdate):
-    db_przystanek = db.query(Przystanki).filter(Przystanki.id == przystanek_update.id).first()
-    if not db_przystanek:
-        raise HTTPException(status_code=404, detail="Przystanek nie został znaleziony")
-    
-    update_data = przystanek_update.dict(exclude_unset=True, exclude={'id'})
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_przystanek, key, value)
-    
-    try:
-        db.commit()
-        db.refresh(db_przystanek)
-        return db_przystanek
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Przystanek o tej nazwie już istnieje!")
+    return TableRepository(db, Przystanki, PRZYSTANKI_MESSAGES).update(przystanek_update.id, _changes(przystanek_update))
 
 def update_linia(db: Session, linia_update: LiniaInUpdate):
-    db_linia = db.query(Linie).filter(Linie.id == linia_update.id).first()
-    if not db_linia:
-        raise HTTPException(status_code=404, detail="Linia nie została znaleziona")
-    
-    update_data = linia_update.dict(exclude_unset=True, exclude={'id'})
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_linia, key, value)
-    
-    try:
-        db.commit()
-        db.refresh(db_linia)
-        return db_linia
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Linia o tym numerze już istnieje!")
+    return TableRepository(db, Linie, LINIE_MESSAGES).update(linia_update.id, _changes(linia_update))
 
 def update_trasa(db: Session, trasa_update: TrasaInUpdate):
-    db_trasa = db.query(Trasy).filter(Trasy.id == trasa_update.id).first()
-    if not db_trasa:
-        raise HTTPException(status_code=404, detail="Trasa nie została znaleziona")
-    
-    update_data = trasa_update.dict(exclude_unset=True, exclude={'id'})
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_trasa, key, value)
-    
-    try:
-        db.commit()
-        db.refresh(db_trasa)
-        return db_trasa
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Trasa o tej nazwie już istnieje!")
+    return TableRepository(db, Trasy, TRASY_MESSAGES).update(trasa_update.id, _changes(trasa_update))
 
 def update_wariant(db: Session, wariant_update: WariantInUpdate):
-    db_wariant = db.query(Warianty).filter(Warianty.id == wariant_update.id).first()
-    if not db_wariant:
-        raise HTTPException(status_code=404, detail="Wariant nie został znaleziony")
-    
-    update_data = wariant_update.dict(exclude_unset=True, exclude={'id'})
+    update_data = _changes(wariant_update)
     # Handle the 'kod' field mapping to 'kod_wariantu' in the model
     if 'kod' in update_data:
         update_data['kod_wariantu'] = update_data.pop('kod')
-    
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_wariant, key, value)
-    
-    try:
-        db.commit()
-        db.refresh(db_wariant)
-        return db_wariant
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Kod wariantu już istnieje w systemie!")
+    godziny = update_data.pop('godziny_odjazdu', None)
+    if godziny is None:
+        return TableRepository(db, Warianty, WARIANTY_MESSAGES).update(wariant_update.id, update_data)
+
+    update_data['godziny_odjazdu'] = json.dumps(godziny)
+    return TableRepository(db, Warianty, WARIANTY_MESSAGES).update(
+        wariant_update.id, update_data,
+        on_row=lambda wariant: replace_departures(db, wariant.id, godziny),
+        changed=[Odjazdy.__tablename__]
+    )
 
 
 #DELETE
 def delete_autobus(db: Session, autobus_id: int):
-    db_autobus = db.query(Autobusy).filter(Autobusy.id == autobus_id).first()
-    if not db_autobus:
-        raise HTTPException(status_code=404, detail="Autobus nie został znaleziony")
-    
-    try:
-        db.delete(db_autobus)
-        db.commit()
-        return {"message": f"Autobus {db_autobus.rejestracja} został usunięty"}
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Nie można usunąć autobusu - jest używany w systemie")
+    return TableRepository(db, Autobusy, AUTOBUSY_MESSAGES).delete(autobus_id)
 
 def delete_kierowca(db: Session, kierowca_id: int):
-    db_kierowca = db.query(Kierowcy).filter(Kierowcy.id == kierowca_id).first()
-    if not db_kierowca:
-        raise HTTPException(status_code=404, detail="Kierowca nie został znaleziony")
-    
-    try:
-        db.delete(db_kierowca)
-        db.commit()
-        return {"message": f"Kierowca {db_kierowca.imie} {db_kierowca.nazwisko} został usunięty"}
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Nie można usunąć kierowcy - jest przypisany do brygady")
+    return TableRepository(db, Kierowcy, KIEROWCY_MESSAGES).delete(kierowca_id)
 
 def delete_brygada(db: Session, brygada_id: int):
-    db_brygada = db.query(Brygady).filter(Brygady.id == brygada_id).first()
-    if not db_brygada:
-        raise HTTPException(status_code=404, detail="Brygada nie została znaleziona")
-    
-    try:
-        db.delete(db_brygada)
-        db.commit()
-        return {"message": f"Brygada {db_brygada.nazwa} została usunięta"}
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Nie można usunąć brygady - ma przypisanych kierowców lub autobusy")
+    return TableRepository(db, Brygady, BRYGADY_MESSAGES).delete(brygada_id)
 
 def delete_przystanek(db: Session, przystanek_id: int):
-    db_przystanek = db.query(Przystanki).filter(Przystanki.id == przystanek_id).first()
-    if not db_przystanek:
-        raise HTTPException(status_code=404, detail="Przystanek nie został znaleziony")
-    
-    try:
-        db.delete(db_przystanek)
-        db.commit()
-        return {"message": f"Przystanek {db_przystanek.nazwa} został usunięty"}
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Nie można usunąć przystanku - jest używany w trasach")
+    # Odjazdy has no ORM relationship; its rows go with the stop
+    return TableRepository(db, Przystanki, PRZYSTANKI_MESSAGES).delete(przystanek_id, cascade=[Odjazdy.id_przystanku])
 
 def delete_linia(db: Session, linia_id: int):
-    db_linia = db.query(Linie).filter(Linie.id == linia_id).first()
-    if not db_linia:
-        raise HTTPException(status_code=404, detail="Linia nie została znaleziona")
-    
-    try:
-        db.delete(db_linia)
-        db.commit()
-        return {"message": f"Linia {db_linia.numer} została usunięta"}
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Nie można usunąć linii - ma przypisane trasy lub brygady")
+    return TableRepository(db, Linie, LINIE_MESSAGES).delete(linia_id)
 
 def delete_trasa(db: Session, trasa_id: int):
-    db_trasa = db.query(Trasy).filter(Trasy.id == trasa_id).first()
-    if not db_trasa:
-        raise HTTPException(status_code=404, detail="Trasa nie została znaleziona")
-    
-    try:
-        db.delete(db_trasa)
-        db.commit()
-        return {"message": f"Trasa {db_trasa.nazwa} została usunięta"}
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Nie można usunąć trasy - jest używana przez linie")
+    return TableRepository(db, Trasy, TRASY_MESSAGES).delete(trasa_id)
 
 def delete_wariant(db: Session, wariant_id: int):
-    db_wariant = db.query(Warianty).filter(Warianty.id == wariant_id).first()
-    if not db_wariant:
-        raise HTTPException(status_code=404, detail="Wariant nie został znaleziony")
-    
-    try:
-        db.delete(db_wariant)
-        db.commit()
-        return {"message": f"Wariant {db_wariant.nazwa} został usunięty"}
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Nie można usunąć wariantu - jest używany w trasach")
+    return TableRepository(db, Warianty, WARIANTY_MESSAGES).delete(wariant_id, cascade=[Odjazdy.id_warianty])
+
+
+#odjazdy
+def _parse_departure(godzina: str) -> time:
+    return time.fromisoformat(godzina)
+
+def format_departure(godzina: time) -> str:
+    return godzina.strftime("%H:%M")
+
+def replace_departures(db: Session, wariant_id: int, godziny: List[str], przystanek_id: Optional[int] = None):
+    """
+    Replace the departures of a variant with one Odjazdy row per hour at its first stop.
+    Does not commit - the caller owns the transaction.
+    """
+    db.query(Odjazdy).filter(Odjazdy.id_warianty == wariant_id).delete(synchronize_session=False)
+    if przystanek_id is None:
+        first_stop = (db.query(Przystanki_Warianty.id_przystanki)
+                      .filter(Przystanki_Warianty.id_warianty == wariant_id)
+                      .order_by(Przystanki_Warianty.kolejnosc)
+                      .first())
+        przystanek_id = first_stop[0] if first_stop else None
+    if przystanek_id is None or not godziny:
+        return
+    db.execute(insert(Odjazdy), [
+        {"id_warianty": wariant_id, "id_przystanku": przystanek_id, "godzina": _parse_departure(godzina)}
+        for godzina in sorted(set(godziny))
+    ])
+
+def _first_stop_departures(db: Session, wariant_ids: Iterable):
+    """Query of (id_warianty, godzina) of the departures stored at each variant's first stop."""
+    first_stop = (db.query(
+                      Przystanki_Warianty.id_warianty.label("id_warianty"),
+                      func.min(Przystanki_Warianty.kolejnosc).label("kolejnosc"))
+                  .filter(Przystanki_Warianty.id_warianty.in_(wariant_ids))
+                  .group_by(Przystanki_Warianty.id_warianty)
+                  .subquery())
+    return (db.query(Odjazdy.id_warianty, Odjazdy.godzina)
+            .join(Przystanki_Warianty, and_(
+                Przystanki_Warianty.id_warianty == Odjazdy.id_warianty,
+                Przystanki_Warianty.id_przystanki == Odjazdy.id_przystanku))
+            .join(first_stop, and_(
+                first_stop.c.id_warianty == Przystanki_Warianty.id_warianty,
+                first_stop.c.kolejnosc == Przystanki_Warianty.kolejnosc))
+            .filter(Odjazdy.id_warianty.in_(wariant_ids)))
+
+def get_variant_departures(db: Session, wariant_ids: Iterable) -> Dict[int, List[str]]:
+    """
+    Departure hours of each variant from its first stop, sorted, in one query.
+    wariant_ids may be a list or a select() of ids.
+    """
+    rows = _first_stop_departures(db, wariant_ids).order_by(Odjazdy.id_warianty, Odjazdy.godzina).all()
+
+    departures: Dict[int, List[str]] = {}
+    for wariant_id, godzina in rows:
+        hours = departures.setdefault(wariant_id, [])
+        formatted = format_departure(godzina)
+        if not hours or hours[-1] != formatted:
+            hours.append(formatted)
+    return departures
+
+def _variant_line_numbers(db: Session, wariant_ids: Iterable) -> Dict[int, str]:
+    """Line numbers of each variant, a route may be linked to a line by id and by numer_linii at once."""
+    numer = func.coalesce(Linie_Trasy.numer_linii, Linie.numer)
+    rows = (db.query(Warianty_Trasy.id_warianty, numer)
+            .join(Linie_Trasy, Linie_Trasy.id_trasy == Warianty_Trasy.id_trasy)
+            .outerjoin(Linie, Linie.id == Linie_Trasy.id_linie)
+            .filter(Warianty_Trasy.id_warianty.in_(wariant_ids), numer.isnot(None))
+            .distinct()
+            .order_by(Warianty_Trasy.id_warianty, numer)
+            .all())
+    numbers: Dict[int, List[str]] = {}
+    for wariant_id, numer_linii in rows:
+        numbers.setdefault(wariant_id, []).append(numer_linii)
+    return {wariant_id: ", ".join(numery) for wariant_id, numery in numbers.items()}
+
+def _estimated_departures(db: Session, przystanek_id: int):
+    """
+    (godzina, id_warianty) at a stop the variant has no stored departures for: the departures
+    from its first stop plus STOP_INTERVAL seconds per stop before this one.
+    """
+    earlier = aliased(Przystanki_Warianty)
+    position = (select(func.count(earlier.id))
+                .where(earlier.id_warianty == Przystanki_Warianty.id_warianty,
+                       earlier.kolejnosc < Przystanki_Warianty.kolejnosc)
+                .scalar_subquery())
+    stored = (select(Odjazdy.id)
+              .where(Odjazdy.id_warianty == Przystanki_Warianty.id_warianty,
+                     Odjazdy.id_przystanku == przystanek_id)
+              .exists())
+    positions = (db.query(Przystanki_Warianty.id_warianty, position)
+                 .filter(Przystanki_Warianty.id_przystanki == przystanek_id, ~stored)
+                 .all())
+    if not positions:
+        return []
+
+    first_departures: Dict[int, List[time]] = {}
+    for wariant_id, godzina in _first_stop_departures(db, {wariant_id for wariant_id, _ in positions}):
+        first_departures.setdefault(wariant_id, []).append(godzina)
+
+    estimated = set()
+    for wariant_id, pozycja in positions:
+        for godzina in first_departures.get(wariant_id, []):
+            seconds = (godzina.hour * 3600 + godzina.minute * 60 + godzina.second + pozycja * STOP_INTERVAL) % 86400
+            estimated.add((time(seconds // 3600, seconds // 60 % 60, seconds % 60), wariant_id))
+    return estimated
+
+def get_departures_from_stop(db: Session, przystanek_id: int, od: time, do: time):
+    """
+    Departures from a stop within [od, do]; a window with od > do wraps past midnight.
+    Stops without stored departures get times estimated from the variant's first stop (szacowana).
+    """
+    if od <= do:
+        window = Odjazdy.godzina.between(od, do)
+    else:
+        window = or_(Odjazdy.godzina >= od, Odjazdy.godzina <= do)
+
+    stored = (db.query(Odjazdy.godzina, Odjazdy.id_warianty)
+              .filter(Odjazdy.id_przystanku == przystanek_id, Odjazdy.id_warianty.isnot(None), window)
+              .distinct()
+              .all())
+    estimated = [
+        (godzina, wariant_id) for godzina, wariant_id in _estimated_departures(db, przystanek_id)
+        if (od <= godzina <= do if od <= do else godzina >= od or godzina <= do)
+    ]
+    departures = [(godzina, wariant_id, False) for godzina, wariant_id in stored]
+    departures += [(godzina, wariant_id, True) for godzina, wariant_id in estimated]
+    departures.sort(key=lambda row: (row[0] < od, row[0], row[1]))
+    if not departures:
+        return []
+
+    wariant_ids = {wariant_id for _, wariant_id, _ in departures}
+    warianty = {
+        wariant_id: (kod, nazwa) for wariant_id, kod, nazwa in
+        db.query(Warianty.id, Warianty.kod_wariantu, Warianty.nazwa).filter(Warianty.id.in_(wariant_ids))
+    }
+    numery = _variant_line_numbers(db, wariant_ids)
+
+    return [
+        {
+            "godzina": godzina,
+            "wariant_id": wariant_id,
+            "kod_wariantu": warianty[wariant_id][0],
+            "nazwa_wariantu": warianty[wariant_id][1],
+            "numer_linii": numery.get(wariant_id),
+            "szacowana": szacowana
+        }
+        for godzina, wariant_id, szacowana in departures if wariant_id in warianty
+    ]
 
 
 #generator
@@ -388,6 +615,7 @@ def assign_route_to_line(db: Session, line_id: int, route_id: int, line_number:
         
         db.add(line_route)
         db.commit()
+        notify_change(Linie_Trasy.__tablename__)
         db.refresh(line_route)
         
         return line_route
@@ -396,6 +624,50 @@ def assign_route_to_line(db: Session, line_id: int, route_id: int, line_number:
         db.rollback()
         raise ValueError("Database integrity error - check if the relationship already exists")
 
+def assign_routes_to_line(db: Session, line_id: int, route_ids: List[int]):
+    """
+    Assign many routes to a line in one transaction.
+    Returns (results, errors) with the same per-route entries as repeated assign_route_to_line calls.
+    """
+    line = db.query(Linie.id, Linie.numer).filter(Linie.id == line_id).first()
+    if not line:
+        message = f"Line with ID {line_id} does not exist"
+        return [], [{"route_id": route_id, "status": "error", "message": message} for route_id in route_ids]
+
+    requested = set(route_ids)
+    known = {route_id for (route_id,) in db.query(Trasy.id).filter(Trasy.id.in_(requested))}
+    assigned = {route_id for (route_id,) in db.query(Linie_Trasy.id_trasy).filter(
+        Linie_Trasy.id_linie == line_id,
+        Linie_Trasy.id_trasy.in_(known)
+    )}
+
+    to_insert = [route_id for route_id in dict.fromkeys(route_ids) if route_id in known and route_id not in assigned]
+    inserted = {}
+    if to_insert:
+        statement = (dialect_insert(db, Linie_Trasy)
+                     .on_conflict_do_nothing(index_elements=[Linie_Trasy.id_linie, Linie_Trasy.id_trasy])
+                     .returning(Linie_Trasy.id_trasy, Linie_Trasy.id))
+        inserted = dict(db.execute(statement, [
+            {"id_linie": line_id, "id_trasy": route_id, "numer_linii": line.numer} for route_id in to_insert
+        ]).all())
+    db.commit()
+    if inserted:
+        notify_change(Linie_Trasy.__tablename__)
+
+    results, errors = [], []
+    for route_id in route_ids:
+        if route_id not in known:
+            errors.append({"route_id": route_id, "status": "error",
+                           "message": f"Route with ID {route_id} does not exist"})
+        elif route_id in inserted:
+            results.append({"route_id": route_id, "status": "success",
+                            "assignment_id": inserted.pop(route_id)})
+        else:
+            # Already assigned before, earlier in this request, or by a concurrent request
+            errors.append({"route_id": route_id, "status": "error",
+                           "message": "Route is already assigned to this line"})
+    return results, errors
+
 def remove_route_from_line(db: Session, line_id: int, route_id: int):
     """
     Remove a route from a line
@@ -410,6 +682,7 @@ def remove_route_from_line(db: Session, line_id: int, route_id: int):
     
     db.delete(line_route)
     db.commit()
+    notify_change(Linie_Trasy.__tablename__)
     
     return {"message": "Route removed from line successfully"}
 
@@ -0,0 +1,52 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.system import Trasy, Linie, Linie_Trasy
+from app.core.cache import reference_cache
+from .autobus import LINIE_LISTING, PRZYSTANKI_LISTING, TRASY_LISTING, WARIANTY_LISTING, page_cache_key
+from .pagination import ListParams, ListSpec, Page, paginate_rows_async
+
+# Async counterparts of the hot read paths in autobus.py, used by the transport
+# router when DB_ASYNC_READS is enabled.
+
+async def get_linia_by_id(db: AsyncSession, linia_id: int):
+    result = await db.execute(select(Linie).where(Linie.id == linia_id))
+    return result.scalars().first()
+
+async def _cached_page(db: AsyncSession, spec: ListSpec, params: ListParams) -> Page:
+    # Same cache entries as the sync readers in autobus.py
+    async def load():
+        page = await paginate_rows_async(db, spec, params)
+        return Page(tuple(page.items), page.next_cursor)
+    return await reference_cache.get_or_load_async(spec.model.__tablename__, page_cache_key(params), load)
+
+async def get_linie_page(db: AsyncSession, params: ListParams) -> Page:
+    return await _cached_page(db, LINIE_LISTING, params)
+
+async def get_przystanki_page(db: AsyncSession, params: ListParams) -> Page:
+    return await _cached_page(db, PRZYSTANKI_LISTING, params)
+
+async def get_trasy_page(db: AsyncSession, params: ListParams) -> Page:
+    return await _cached_page(db, TRASY_LISTING, params)
+
+async def get_warianty_page(db: AsyncSession, params: ListParams) -> Page:
+    return await paginate_rows_async(db, WARIANTY_LISTING, params)
+
+async def get_routes_for_line(db: AsyncSession, line_id: int):
+    """
+    Get all routes assigned to a specific line
+    """
+    result = await db.execute(
+        select(Linie_Trasy, Trasy)
+        .join(Trasy, Linie_Trasy.id_trasy == Trasy.id)
+        .where(Linie_Trasy.id_linie == line_id)
+    )
+
+    return [
+        {
+            "route_id": route.id,
+            "route_name": route.nazwa,
+            "line_number": line_route.numer_linii,
+            "assignment_id": line_route.id
+        }
+        for line_route, route in result.all()
+    ]
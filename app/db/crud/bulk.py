@@ -0,0 +1,130 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.changes import notify_change
+from decouple import config
+
+
+class BulkResult(NamedTuple):
+    inserted: List[Any]
+    conflicts: List[Dict[str, Any]]
+
+
+def dialect_insert(db: Session, model):
+    """INSERT construct of the session's dialect, which provides ON CONFLICT."""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def bulk_insert(db: Session, model, rows: List[Dict[str, Any]], key: Optional[str] = None) -> BulkResult:
+    """
+    Inserts rows in one transaction with multi-row INSERT ... RETURNING.
+    Rows whose unique `key` already exists (in the table or earlier in the batch)
+    are skipped with ON CONFLICT DO NOTHING and reported instead of failing the batch.
+    """
+    columns = model.__table__.columns
+    if key is None:
+        if not rows:
+            return BulkResult([], [])
+        statement = dialect_insert(db, model).returning(*columns, sort_by_parameter_order=True)
+        inserted = db.execute(statement, rows).all()
+        db.commit()
+        notify_change(model.__tablename__)
+        return BulkResult(inserted, [])
+
+    conflicts, unique_rows, first_index = [], [], {}
+    for index, row in enumerate(rows):
+        value = row[key]
+        if value in first_index:
+            conflicts.append({"index": index, "field": key, "value": value,
+                              "detail": f"Duplikat pozycji {first_index[value]} w żądaniu"})
+            continue
+        first_index[value] = index
+        unique_rows.append(row)
+
+    returned = {}
+    if unique_rows:
+        statement = (dialect_insert(db, model)
+                     .on_conflict_do_nothing(index_elements=[columns[key]])
+                     .returning(*columns))
+        returned = {row._mapping[key]: row for row in db.execute(statement, unique_rows).all()}
+        db.commit()
+        if returned:
+            notify_change(model.__tablename__)
+
+    inserted = []
+    for row in unique_rows:
+        if row[key] in returned:
+            inserted.append(returned[row[key]])
+        else:
+            conflicts.append({"index": first_index[row[key]], "field": key, "value": row[key],
+                              "detail": "Wartość już istnieje w systemie"})
+    conflicts.sort(key=lambda conflict: conflict["index"])
+    return BulkResult(inserted, conflicts)
+
+
+UPSERT_BATCH = config("UPSERT_BATCH", default=1000, cast=int)
+
+
+class UpsertResult(NamedTuple):
+    inserted: int
+    updated: int
+    unchanged: int
+    deleted: int
+
+
+class DuplicateKeyError(ValueError):
+    pass
+
+
+def bulk_upsert(db: Session, model, rows: List[Dict[str, Any]], key: str, delete_missing: bool = False) -> UpsertResult:
+    """
+    Synchronizes the table with rows identified by the unique `key`, in one transaction:
+    INSERT ... ON CONFLICT DO UPDATE in batches of UPSERT_BATCH, touching only rows whose
+    values differ. With delete_missing, rows whose key is absent from the payload are removed.
+    """
+    seen = set()
+    for row in rows:
+        if row[key] in seen:
+            raise DuplicateKeyError(f"Wartość {row[key]} pola {key} występuje w żądaniu więcej niż raz")
+        seen.add(row[key])
+
+    key_column = model.__table__.columns[key]
+    inserted = updated = deleted = 0
+    try:
+        for start in range(0, len(rows), UPSERT_BATCH):
+            batch = rows[start:start + UPSERT_BATCH]
+            keys = [row[key] for row in batch]
+            existing = set(db.scalars(select(key_column).where(key_column.in_(keys))))
+
+            statement = dialect_insert(db, model)
+            changed_columns = [name for name in batch[0] if name != key]
+            if changed_columns:
+                statement = statement.on_conflict_do_update(
+                    index_elements=[key_column],
+                    set_={name: statement.excluded[name] for name in changed_columns},
+                    where=or_(*(model.__table__.columns[name].is_distinct_from(statement.excluded[name])
+                                for name in changed_columns))
+                )
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=[key_column])
+            written = set(db.scalars(statement.returning(key_column), batch))
+            inserted += len(written - existing)
+            updated += len(written & existing)
+
+        if delete_missing:
+            missing = [value for value in db.scalars(select(key_column)) if value not in seen]
+            for start in range(0, len(missing), UPSERT_BATCH):
+                deleted += db.execute(
+                    delete(model).where(key_column.in_(missing[start:start + UPSERT_BATCH]))
+                ).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if inserted or updated or deleted:
+        notify_change(model.__tablename__)
+    return UpsertResult(inserted, updated, len(rows) - inserted - updated, deleted)
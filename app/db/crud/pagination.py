@@ -0,0 +1,135 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import and_, or_, select, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+import base64
+import json
+
+EQ = "eq"
+PREFIX = "prefix"
+
+
+class ListParamsError(ValueError):
+    pass
+
+
+@dataclass
+class ListSpec:
+    """Whitelisted sort and filter fields of a list endpoint."""
+    model: Any
+    sort_fields: Dict[str, Any]
+    filter_fields: Dict[str, Tuple[Any, str]] = field(default_factory=dict)
+    default_sort: str = "id"
+
+
+@dataclass
+class ListParams:
+    limit: Optional[int]    # None: the whole list in one response
+    after: Optional[str] = None
+    sort: Optional[str] = None
+    desc: bool = False
+    filters: Dict[str, str] = field(default_factory=dict)
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(sort: str, desc: bool, value: Any, last_id: int) -> str:
+    payload = json.dumps([sort, desc, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, bool, Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort, desc, value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return sort, bool(desc), value, int(last_id)
+    except (ValueError, TypeError):
+        raise ListParamsError("Nieprawidłowy kursor")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_page_query(spec: ListSpec, params: ListParams, columns: bool = False) -> Select:
+    """With columns=True the statement selects the table columns as plain rows instead of ORM entities."""
+    sort = params.sort or spec.default_sort
+    if sort not in spec.sort_fields:
+        raise ListParamsError(f"Nie można sortować po polu '{sort}'")
+    sort_column = spec.sort_fields[sort]
+    id_column = spec.model.id
+
+    query = select(*spec.model.__table__.columns) if columns else select(spec.model)
+    for name, value in params.filters.items():
+        if name not in spec.filter_fields:
+            raise ListParamsError(f"Nie można filtrować po polu '{name}'")
+        column, operator = spec.filter_fields[name]
+        if operator == PREFIX:
+            query = query.where(column.ilike(f"{_escape_like(value)}%", escape="\\"))
+        else:
+            query = query.where(column == value)
+
+    if params.after:
+        cursor_sort, cursor_desc, value, last_id = decode_cursor(params.after)
+        if cursor_sort != sort or cursor_desc != params.desc:
+            raise ListParamsError("Kursor nie pasuje do sortowania")
+        if sort_column is id_column:
+            query = query.where(id_column < last_id if params.desc else id_column > last_id)
+        elif params.desc:
+            # Descending order puts NULLs first, ascending puts them last
+            if value is None:
+                query = query.where(or_(sort_column.isnot(None), and_(sort_column.is_(None), id_column < last_id)))
+            else:
+                query = query.where(or_(sort_column < value, and_(sort_column == value, id_column < last_id)))
+        else:
+            if value is None:
+                query = query.where(sort_column.is_(None), id_column > last_id)
+            else:
+                query = query.where(or_(
+                    sort_column > value,
+                    and_(sort_column == value, id_column > last_id),
+                    sort_column.is_(None)
+                ))
+
+    if sort_column is id_column:
+        order = [id_column.desc() if params.desc else id_column.asc()]
+    elif params.desc:
+        order = [sort_column.desc().nulls_first(), id_column.desc()]
+    else:
+        order = [sort_column.asc().nulls_last(), id_column.asc()]
+
+    query = query.order_by(*order)
+    if params.limit is None:
+        return query
+    # One extra row tells whether another page exists
+    return query.limit(params.limit + 1)
+
+
+def _to_page(spec: ListSpec, params: ListParams, rows: List[Any]) -> Page:
+    if params.limit is None or len(rows) <= params.limit:
+        return Page(rows, None)
+    items = rows[:params.limit]
+    sort = params.sort or spec.default_sort
+    last = items[-1]
+    cursor = encode_cursor(sort, params.desc, getattr(last, spec.sort_fields[sort].key), last.id)
+    return Page(items, cursor)
+
+
+def paginate(db: Session, spec: ListSpec, params: ListParams) -> Page:
+    rows = db.execute(build_page_query(spec, params)).scalars().all()
+    return _to_page(spec, params, rows)
+
+
+def paginate_rows(db: Session, spec: ListSpec, params: ListParams) -> Page:
+    """Like paginate, but returns column rows without building ORM instances."""
+    rows = db.execute(build_page_query(spec, params, columns=True)).all()
+    return _to_page(spec, params, rows)
+
+
+async def paginate_rows_async(db: AsyncSession, spec: ListSpec, params: ListParams) -> Page:
+    result = await db.execute(build_page_query(spec, params, columns=True))
+    return _to_page(spec, params, result.all())
@@ -0,0 +1,121 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import Dict, Iterable, List, Optional
+from collections import defaultdict
+from .autobus import get_variant_departures
+from ..models.system import (
+    Linie, Trasy, Warianty, Przystanki,
+    Przystanki_Warianty, Warianty_Trasy, Linie_Trasy
+)
+
+
+def load_line_schedules(db: Session, line_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+    """
+    Load the Linie -> Trasy -> Warianty -> Przystanki tree in a constant
+    number of queries (one per level, plus departures from Odjazdy) and
+    assemble the nested dicts in one pass.
+    """
+    line_query = db.query(Linie)
+    if line_ids is not None:
+        line_ids = list(line_ids)
+        if not line_ids:
+            return []
+        line_query = line_query.filter(Linie.id.in_(line_ids))
+    lines = line_query.order_by(Linie.numer).all()
+    if not lines:
+        return []
+
+    # Subqueries keep the filter inside the database instead of shipping id lists back and forth
+    line_ids_q = select(Linie.id)
+    if line_ids is not None:
+        line_ids_q = line_ids_q.where(Linie.id.in_(line_ids))
+    route_ids_q = select(Linie_Trasy.id_trasy).where(Linie_Trasy.id_linie.in_(line_ids_q))
+    variant_ids_q = select(Warianty_Trasy.id_warianty).where(Warianty_Trasy.id_trasy.in_(route_ids_q))
+
+    line_routes = (db.query(Linie_Trasy.id_linie, Trasy)
+                   .join(Trasy, Linie_Trasy.id_trasy == Trasy.id)
+                   .filter(Linie_Trasy.id_linie.in_(line_ids_q))
+                   .order_by(Linie_Trasy.id)
+                   .all())
+
+    route_variants = (db.query(Warianty_Trasy.id_trasy, Warianty)
+                      .join(Warianty, Warianty_Trasy.id_warianty == Warianty.id)
+                      .filter(Warianty_Trasy.id_trasy.in_(route_ids_q))
+                      .order_by(Warianty_Trasy.id)
+                      .all())
+
+    variant_stops = (db.query(Przystanki_Warianty.id_warianty, Przystanki_Warianty.kolejnosc, Przystanki)
+                     .join(Przystanki, Przystanki_Warianty.id_przystanki == Przystanki.id)
+                     .filter(Przystanki_Warianty.id_warianty.in_(variant_ids_q))
+                     .order_by(Przystanki_Warianty.id_warianty, Przystanki_Warianty.kolejnosc)
+                     .all())
+
+    stops_by_variant = defaultdict(list)
+    for variant_id, kolejnosc, stop in variant_stops:
+        stops_by_variant[variant_id].append({
+            'id': stop.id,
+            'nazwa': stop.nazwa,
+            'ulica': stop.ulica,
+            'kolejnosc': kolejnosc
+        })
+
+    departures = get_variant_departures(db, variant_ids_q)
+
+    variants_by_route = defaultdict(list)
+    for route_id, variant in route_variants:
+        variants_by_route[route_id].append({
+            'id': variant.id,
+            'nazwa': variant.nazwa,
+            'kod': variant.kod_wariantu,
+            'godziny': departures.get(variant.id, []),
+            'przystanki': stops_by_variant.get(variant.id, [])
+        })
+
+    routes_by_line = defaultdict(list)
+    for line_id, route in line_routes:
+        routes_by_line[line_id].append({
+            'id': route.id,
+            'nazwa': route.nazwa,
+            'warianty': variants_by_route.get(route.id, [])
+        })
+
+    return [
+        {
+            'id': line.id,
+            'numer': line.numer,
+            'kierunek': line.kierunek,
+            'opis': line.opis,
+            'trasy': routes_by_line.get(line.id, [])
+        }
+        for line in lines
+    ]
+
+
+def load_stop_schedules(db: Session, stop_id: int) -> List[Dict]:
+    """
+    Schedules of every line serving the stop, pruned to the variants that call at it.
+    """
+    line_ids = [
+        line_id for (line_id,) in (
+            db.query(Linie_Trasy.id_linie)
+            .join(Warianty_Trasy, Warianty_Trasy.id_trasy == Linie_Trasy.id_trasy)
+            .join(Przystanki_Warianty, Przystanki_Warianty.id_warianty == Warianty_Trasy.id_warianty)
+            .filter(Przystanki_Warianty.id_przystanki == stop_id, Linie_Trasy.id_linie.isnot(None))
+            .distinct()
+            .all()
+        )
+    ]
+
+    schedules = []
+    for line in load_line_schedules(db, line_ids=line_ids):
+        routes = []
+        for route in line['trasy']:
+            variants = [
+                variant for variant in route['warianty']
+                if any(stop['id'] == stop_id for stop in variant['przystanki'])
+            ]
+            if variants:
+                routes.append({**route, 'warianty': variants})
+        if routes:
+            schedules.append({**line, 'trasy': routes})
+    return schedules
@@ -0,0 +1,193 @@
+"""
+Stop sequence of a variant with gap-based ordering keys.
+
+Przystanki_Warianty.kolejnosc only has to be increasing, so new positions get
+a key halfway between their neighbours and most edits write a single row.
+When two neighbours are adjacent integers the whole variant is renumbered
+with SEQUENCE_GAP spacing in one UPDATE ... FROM (VALUES ...).
+"""
+from sqlalchemy import Integer, column, func, insert, select, update, values
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from app.core.changes import notify_change
+from ..models.system import Przystanki, Przystanki_Warianty, Warianty, Odjazdy
+from typing import List, Optional, Tuple
+
+SEQUENCE_GAP = 1024
+
+
+def _lock_variant(db: Session, wariant_id: int):
+    # Serializes edits of one variant; other variants stay unaffected
+    wariant = db.execute(
+        select(Warianty.id).where(Warianty.id == wariant_id).with_for_update()
+    ).first()
+    if not wariant:
+        raise HTTPException(status_code=404, detail="Wariant nie został znaleziony")
+
+
+def _ordered(db: Session, wariant_id: int) -> List[Tuple[int, int, int]]:
+    """(row id, stop id, key) of every position, in order."""
+    return db.execute(
+        select(Przystanki_Warianty.id, Przystanki_Warianty.id_przystanki, Przystanki_Warianty.kolejnosc)
+        .where(Przystanki_Warianty.id_warianty == wariant_id)
+        .order_by(Przystanki_Warianty.kolejnosc, Przystanki_Warianty.id)
+    ).all()
+
+
+def _first_stop(db: Session, wariant_id: int) -> Optional[int]:
+    return db.execute(
+        select(Przystanki_Warianty.id_przystanki)
+        .where(Przystanki_Warianty.id_warianty == wariant_id)
+        .order_by(Przystanki_Warianty.kolejnosc, Przystanki_Warianty.id)
+        .limit(1)
+    ).scalar()
+
+
+def _position(db: Session, wariant_id: int, pozycja_id: int):
+    row = db.execute(
+        select(Przystanki_Warianty.id, Przystanki_Warianty.kolejnosc)
+        .where(Przystanki_Warianty.id == pozycja_id, Przystanki_Warianty.id_warianty == wariant_id)
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail=f"Pozycja {pozycja_id} nie należy do wariantu")
+    return row
+
+
+def _renumber(db: Session, keys: List[Tuple[int, int]]):
+    if not keys:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        new_keys = values(column("id", Integer), column("kolejnosc", Integer), name="nowe").data(keys)
+        db.execute(
+            update(Przystanki_Warianty)
+            .where(Przystanki_Warianty.id == new_keys.c.id)
+            .values(kolejnosc=new_keys.c.kolejnosc)
+        )
+    else:
+        # SQLite cannot alias the columns of a VALUES list
+        db.execute(update(Przystanki_Warianty), [{"id": row_id, "kolejnosc": key} for row_id, key in keys])
+
+
+def _key_after(db: Session, wariant_id: int, po_id: Optional[int], skip_id: Optional[int] = None) -> int:
+    """Free key right after position po_id (None = at the beginning), renumbering when there is no gap."""
+    conditions = [Przystanki_Warianty.id_warianty == wariant_id]
+    if skip_id is not None:
+        conditions.append(Przystanki_Warianty.id != skip_id)
+
+    previous = 0 if po_id is None else _position(db, wariant_id, po_id).kolejnosc
+    following = db.execute(
+        select(func.min(Przystanki_Warianty.kolejnosc))
+        .where(*conditions, Przystanki_Warianty.kolejnosc > previous)
+    ).scalar()
+    if following is None:
+        return previous + SEQUENCE_GAP
+    if following - previous > 1:
+        return (previous + following) // 2
+
+    # No room left: spread all positions and leave a slot after po_id
+    renumbered, slot, key = [], None, SEQUENCE_GAP
+    if po_id is None:
+        slot, key = key, key + SEQUENCE_GAP
+    for row_id, _, _ in _ordered(db, wariant_id):
+        if row_id == skip_id:
+            continue
+        renumbered.append((row_id, key))
+        key += SEQUENCE_GAP
+        if row_id == po_id:
+            slot, key = key, key + SEQUENCE_GAP
+    _renumber(db, renumbered)
+    return slot
+
+
+def _follow_first_stop(db: Session, wariant_id: int, previous_first: Optional[int]):
+    """Departures are stored at the first stop; move them along when the first stop changes."""
+    current_first = _first_stop(db, wariant_id)
+    if previous_first is None or current_first is None or current_first == previous_first:
+        return
+    already_there = db.execute(
+        select(Odjazdy.id).where(Odjazdy.id_warianty == wariant_id, Odjazdy.id_przystanku == current_first).limit(1)
+    ).first()
+    if not already_there:
+        db.execute(
+            update(Odjazdy)
+            .where(Odjazdy.id_warianty == wariant_id, Odjazdy.id_przystanku == previous_first)
+            .values(id_przystanku=current_first)
+        )
+
+
+def _finish(db: Session, wariant_id: int, previous_first: Optional[int]):
+    _follow_first_stop(db, wariant_id, previous_first)
+    db.commit()
+    notify_change(Przystanki_Warianty.__tablename__, Odjazdy.__tablename__)
+    return get_variant_sequence(db, wariant_id)
+
+
+def _check_stops(db: Session, przystanki_ids: List[int]):
+    found = set(db.scalars(select(Przystanki.id).where(Przystanki.id.in_(set(przystanki_ids)))))
+    for przystanek_id in przystanki_ids:
+        if przystanek_id not in found:
+            raise HTTPException(status_code=404, detail=f"Przystanek o ID {przystanek_id} nie istnieje")
+
+
+def get_variant_sequence(db: Session, wariant_id: int):
+    rows = db.execute(
+        select(Przystanki_Warianty.id, Przystanki_Warianty.id_przystanki, Przystanki.nazwa,
+               Przystanki_Warianty.kolejnosc)
+        .join(Przystanki, Przystanki.id == Przystanki_Warianty.id_przystanki)
+        .where(Przystanki_Warianty.id_warianty == wariant_id)
+        .order_by(Przystanki_Warianty.kolejnosc, Przystanki_Warianty.id)
+    ).all()
+    return [
+        {"id": row_id, "przystanek_id": przystanek_id, "nazwa": nazwa, "kolejnosc": kolejnosc}
+        for row_id, przystanek_id, nazwa, kolejnosc in rows
+    ]
+
+
+def insert_stop_after(db: Session, wariant_id: int, przystanek_id: int, po_id: Optional[int]):
+    _lock_variant(db, wariant_id)
+    _check_stops(db, [przystanek_id])
+    previous_first = _first_stop(db, wariant_id)
+    key = _key_after(db, wariant_id, po_id)
+    db.execute(insert(Przystanki_Warianty).values(
+        id_warianty=wariant_id, id_przystanki=przystanek_id, kolejnosc=key
+    ))
+    return _finish(db, wariant_id, previous_first)
+
+
+def move_stop_after(db: Session, wariant_id: int, pozycja_id: int, po_id: Optional[int]):
+    if po_id == pozycja_id:
+        raise HTTPException(status_code=400, detail="Nie można przenieść przystanku za samego siebie")
+    _lock_variant(db, wariant_id)
+    _position(db, wariant_id, pozycja_id)
+    previous_first = _first_stop(db, wariant_id)
+    key = _key_after(db, wariant_id, po_id, skip_id=pozycja_id)
+    db.execute(
+        update(Przystanki_Warianty).where(Przystanki_Warianty.id == pozycja_id).values(kolejnosc=key)
+    )
+    return _finish(db, wariant_id, previous_first)
+
+
+def remove_stop(db: Session, wariant_id: int, pozycja_id: int):
+    _lock_variant(db, wariant_id)
+    _position(db, wariant_id, pozycja_id)
+    count = db.execute(
+        select(func.count()).select_from(Przystanki_Warianty).where(Przystanki_Warianty.id_warianty == wariant_id)
+    ).scalar()
+    if count <= 2:
+        raise HTTPException(status_code=400, detail="Wariant musi mieć co najmniej 2 przystanki")
+    previous_first = _first_stop(db, wariant_id)
+    db.query(Przystanki_Warianty).filter(Przystanki_Warianty.id == pozycja_id).delete(synchronize_session=False)
+    return _finish(db, wariant_id, previous_first)
+
+
+def replace_sequence(db: Session, wariant_id: int, przystanki_ids: List[int]):
+    _lock_variant(db, wariant_id)
+    _check_stops(db, przystanki_ids)
+    previous_first = _first_stop(db, wariant_id)
+    db.query(Przystanki_Warianty).filter(Przystanki_Warianty.id_warianty == wariant_id) \
+        .delete(synchronize_session=False)
+    db.execute(insert(Przystanki_Warianty), [
+        {"id_warianty": wariant_id, "id_przystanki": przystanek_id, "kolejnosc": pozycja * SEQUENCE_GAP}
+        for pozycja, przystanek_id in enumerate(przystanki_ids, start=1)
+    ])
+    return _finish(db, wariant_id, previous_first)
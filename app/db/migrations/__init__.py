@@ -0,0 +1,68 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module named ``v<NNNN>_<name>.py`` in this package exposing
+``upgrade(connection)``. Applied versions are recorded in ``schema_migrations``;
+every pending migration runs in its own transaction. Run at deploy time with
+``python -m app.db.migrations``.
+"""
+import importlib
+import pkgutil
+import re
+from datetime import datetime, timezone
+from typing import List, Tuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+from sqlalchemy.engine import Connection, Engine
+
+MIGRATION_PATTERN = re.compile(r"^v(\d{4})_(\w+)$")
+
+# Arbitrary constant shared by all deploys so concurrent runners serialize on PostgreSQL
+ADVISORY_LOCK_ID = 72_310_001
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def discover_migrations() -> List[Tuple[int, str, object]]:
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = MIGRATION_PATTERN.match(module_info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{module_info.name}")
+            migrations.append((int(match.group(1)), match.group(2), module))
+    return sorted(migrations, key=lambda migration: migration[0])
+
+
+def _applied_versions(connection: Connection) -> set:
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    applied = []
+    with engine.connect() as lock_connection:
+        is_postgres = engine.dialect.name == "postgresql"
+        if is_postgres:
+            lock_connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            lock_connection.commit()
+        try:
+            with engine.begin() as connection:
+                _metadata.create_all(bind=connection)
+            for version, name, module in discover_migrations():
+                with engine.begin() as connection:
+                    if version in _applied_versions(connection):
+                        continue
+                    module.upgrade(connection)
+                    connection.execute(schema_migrations.insert().values(
+                        version=version, name=name, applied_at=datetime.now(timezone.utc)
+                    ))
+                applied.append(f"v{version:04d}_{name}")
+        finally:
+            if is_postgres:
+                lock_connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+                lock_connection.commit()
+    return applied
@@ -0,0 +1,10 @@
+from app.core.database import engine
+from app.db.migrations import run_migrations
+
+if __name__ == "__main__":
+    applied = run_migrations(engine)
+    if applied:
+        for migration in applied:
+            print(f"Zastosowano migracje: {migration}")
+    else:
+        print("Schemat bazy jest aktualny")
@@ -0,0 +1,19 @@
+"""Tables as they existed before versioned migrations (previously created in lifespan)."""
+from sqlalchemy.engine import Connection
+
+BASELINE_TABLES = [
+    "Users", "Rola", "User_Rola",
+    "Przystanki", "Warianty", "Trasy", "Linie", "Brygady", "Kierowcy", "Autobusy",
+    "Przystanki_Warianty", "Warianty_Trasy", "Linie_Trasy", "Brygady_Linie",
+    "Kierowcy_Brygady", "Brygady_Autobusy", "Odjazdy",
+]
+
+
+def upgrade(connection: Connection):
+    from app.core.database import Base
+    from app.db.models import user, system
+
+    # checkfirst leaves existing databases untouched; indexes follow in later migrations
+    tables = [Base.metadata.tables[name] for name in BASELINE_TABLES]
+    for table in tables:
+        table.create(bind=connection, checkfirst=True)
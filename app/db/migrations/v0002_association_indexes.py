@@ -0,0 +1,43 @@
+"""Foreign-key and composite indexes on the association tables."""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# (name, table, columns, unique, covering columns - PostgreSQL only)
+INDEXES = [
+    ("ix_Przystanki_Warianty_wariant_kolejnosc", "Przystanki_Warianty", ["id_warianty", "kolejnosc"], False, ["id_przystanki"]),
+    ("ix_Przystanki_Warianty_przystanek", "Przystanki_Warianty", ["id_przystanki", "id_warianty"], False, []),
+    ("ix_Warianty_Trasy_trasa_wariant", "Warianty_Trasy", ["id_trasy", "id_warianty"], False, []),
+    ("ix_Warianty_Trasy_wariant", "Warianty_Trasy", ["id_warianty"], False, []),
+    ("ux_Linie_Trasy_linia_trasa", "Linie_Trasy", ["id_linie", "id_trasy"], True, []),
+    ("ix_Linie_Trasy_trasa_linia", "Linie_Trasy", ["id_trasy", "id_linie"], False, []),
+    ("ix_Brygady_Linie_linia_brygada", "Brygady_Linie", ["id_linie", "id_brygady"], False, []),
+    ("ix_Brygady_Linie_brygada", "Brygady_Linie", ["id_brygady"], False, []),
+    ("ix_Kierowcy_Brygady_brygada_kierowca", "Kierowcy_Brygady", ["id_brygady", "id_kierowcy"], False, []),
+    ("ix_Kierowcy_Brygady_kierowca", "Kierowcy_Brygady", ["id_kierowcy"], False, []),
+    ("ix_Brygady_Autobusy_brygada_autobus", "Brygady_Autobusy", ["id_brygady", "id_autobusy"], False, []),
+    ("ix_Brygady_Autobusy_autobus", "Brygady_Autobusy", ["id_autobusy"], False, []),
+    ("ix_Odjazdy_przystanek_godzina", "Odjazdy", ["id_przystanku", "godzina"], False, []),
+    ("ix_Odjazdy_wariant_godzina", "Odjazdy", ["id_warianty", "godzina"], False, []),
+    ("ix_User_Rola_user_rola", "User_Rola", ["id_user", "id_rola"], False, []),
+]
+
+
+def _quote(names):
+    return ", ".join(f'"{name}"' for name in names)
+
+
+def upgrade(connection: Connection):
+    # The unique index cannot be built while duplicate assignments exist; keep the oldest one
+    connection.execute(text('''
+        DELETE FROM "Linie_Trasy"
+        WHERE id_linie IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM "Linie_Trasy" WHERE id_linie IS NOT NULL GROUP BY id_linie, id_trasy
+        )
+    '''))
+
+    is_postgres = connection.dialect.name == "postgresql"
+    for name, table, columns, unique, include in INDEXES:
+        statement = f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{name}" ON "{table}" ({_quote(columns)})'
+        if include and is_postgres:
+            statement += f" INCLUDE ({_quote(include)})"
+        connection.execute(text(statement))
@@ -0,0 +1,44 @@
+"""Backfill Odjazdy from the JSON kept in Warianty.godziny_odjazdu."""
+from sqlalchemy import func, and_, insert, select
+from sqlalchemy.engine import Connection
+from app.db.models.system import Warianty, Przystanki_Warianty, Odjazdy
+from datetime import time
+import json
+
+
+def upgrade(connection: Connection):
+    # Variants that already have Odjazdy rows were written by the application; leave them alone
+    migrated_ids = select(Odjazdy.id_warianty).where(Odjazdy.id_warianty.isnot(None)).distinct()
+    variants = connection.execute(
+        select(Warianty.id, Warianty.godziny_odjazdu)
+        .where(Warianty.godziny_odjazdu.isnot(None), Warianty.id.notin_(migrated_ids))
+    ).all()
+
+    first_kolejnosc = (select(
+                           Przystanki_Warianty.id_warianty.label("id_warianty"),
+                           func.min(Przystanki_Warianty.kolejnosc).label("kolejnosc"))
+                       .group_by(Przystanki_Warianty.id_warianty)
+                       .subquery())
+    first_stops = dict(connection.execute(
+        select(Przystanki_Warianty.id_warianty, Przystanki_Warianty.id_przystanki)
+        .join(first_kolejnosc, and_(
+            first_kolejnosc.c.id_warianty == Przystanki_Warianty.id_warianty,
+            first_kolejnosc.c.kolejnosc == Przystanki_Warianty.kolejnosc))
+    ).all())
+
+    rows = []
+    for wariant_id, godziny_odjazdu in variants:
+        if wariant_id not in first_stops:
+            continue
+        try:
+            godziny = sorted({time.fromisoformat(godzina) for godzina in json.loads(godziny_odjazdu)})
+        except (TypeError, ValueError):
+            print(f"Wariant {wariant_id}: nieprawidlowe godziny odjazdu, pominieto")
+            continue
+        rows.extend(
+            {"id_warianty": wariant_id, "id_przystanku": first_stops[wariant_id], "godzina": godzina}
+            for godzina in godziny
+        )
+
+    if rows:
+        connection.execute(insert(Odjazdy), rows)
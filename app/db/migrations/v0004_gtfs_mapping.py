@@ -0,0 +1,12 @@
+"""Mapping of GTFS routes and stop patterns onto Trasy and Warianty, so re-imports update instead of duplicating."""
+from sqlalchemy.engine import Connection
+
+MAPPING_TABLES = ["Gtfs_Trasy", "Gtfs_Warianty"]
+
+
+def upgrade(connection: Connection):
+    from app.core.database import Base
+    from app.db.models import system
+
+    for name in MAPPING_TABLES:
+        Base.metadata.tables[name].create(bind=connection, checkfirst=True)
@@ -1,5 +1,5 @@
 from app.core.database import Base
-from sqlalchemy import Text, Column, Integer, String, Double, ForeignKey, Time
+from sqlalchemy import Text, Column, Integer, String, Double, ForeignKey, Time, Index
 from sqlalchemy.orm import relationship
 
 class Przystanki(Base):
@@ -15,6 +15,10 @@ class Przystanki(Base):
 
 class Przystanki_Warianty(Base):
     __tablename__ = "Przystanki_Warianty"
+    __table_args__ = (
+        Index("ix_Przystanki_Warianty_wariant_kolejnosc", "id_warianty", "kolejnosc", postgresql_include=["id_przystanki"]),
+        Index("ix_Przystanki_Warianty_przystanek", "id_przystanki", "id_warianty"),
+    )
     id = Column(Integer, primary_key=True)
     id_przystanki = Column(Integer, ForeignKey("Przystanki.id"))
     id_warianty = Column(Integer, ForeignKey("Warianty.id"))
@@ -37,6 +41,10 @@ class Warianty(Base):
 
 class Warianty_Trasy(Base):
     __tablename__ = "Warianty_Trasy"
+    __table_args__ = (
+        Index("ix_Warianty_Trasy_trasa_wariant", "id_trasy", "id_warianty"),
+        Index("ix_Warianty_Trasy_wariant", "id_warianty"),
+    )
     id = Column(Integer, primary_key=True)
     id_warianty = Column(Integer, ForeignKey("Warianty.id"))
     id_trasy = Column(Integer, ForeignKey("Trasy.id"))
@@ -56,6 +64,10 @@ class Trasy(Base):
 
 class Linie_Trasy(Base):
     __tablename__ = "Linie_Trasy"
+    __table_args__ = (
+        Index("ux_Linie_Trasy_linia_trasa", "id_linie", "id_trasy", unique=True),
+        Index("ix_Linie_Trasy_trasa_linia", "id_trasy", "id_linie"),
+    )
     id = Column(Integer, primary_key=True)
     id_linie = Column(Integer, ForeignKey("Linie.id"))
     id_trasy = Column(Integer, ForeignKey("Trasy.id"))
@@ -78,6 +90,10 @@ class Linie(Base):
 
 class Brygady_Linie(Base):
     __tablename__ = "Brygady_Linie"
+    __table_args__ = (
+        Index("ix_Brygady_Linie_linia_brygada", "id_linie", "id_brygady"),
+        Index("ix_Brygady_Linie_brygada", "id_brygady"),
+    )
     id = Column(Integer, primary_key=True)
     id_brygady = Column(Integer, ForeignKey("Brygady.id"))
     id_linie = Column(Integer, ForeignKey("Linie.id"))
@@ -110,6 +126,10 @@ class Kierowcy(Base):
 
 class Kierowcy_Brygady(Base):
     __tablename__ = "Kierowcy_Brygady"
+    __table_args__ = (
+        Index("ix_Kierowcy_Brygady_brygada_kierowca", "id_brygady", "id_kierowcy"),
+        Index("ix_Kierowcy_Brygady_kierowca", "id_kierowcy"),
+    )
     id = Column(Integer, primary_key=True)
     id_kierowcy = Column(Integer, ForeignKey("Kierowcy.id"))
     id_brygady = Column(Integer, ForeignKey("Brygady.id"))
@@ -132,6 +152,10 @@ class Autobusy(Base):
 
 class Brygady_Autobusy(Base):
     __tablename__ = "Brygady_Autobusy"
+    __table_args__ = (
+        Index("ix_Brygady_Autobusy_brygada_autobus", "id_brygady", "id_autobusy"),
+        Index("ix_Brygady_Autobusy_autobus", "id_autobusy"),
+    )
     id = Column(Integer, primary_key=True)
     id_brygady = Column(Integer, ForeignKey("Brygady.id"))
     id_autobusy = Column(Integer, ForeignKey("Autobusy.id"))
@@ -141,7 +165,34 @@ class Brygady_Autobusy(Base):
 
 class Odjazdy(Base):
     __tablename__ = "Odjazdy"
+    __table_args__ = (
+        Index("ix_Odjazdy_przystanek_godzina", "id_przystanku", "godzina"),
+        Index("ix_Odjazdy_wariant_godzina", "id_warianty", "godzina"),
+    )
     id = Column(Integer, primary_key=True)
     id_warianty = Column(Integer, ForeignKey("Warianty.id"))
     id_przystanku = Column(Integer, ForeignKey("Przystanki.id"))
-    godzina = Column(Time)
\ No newline at end of file
+    godzina = Column(Time)
+
+class Gtfs_Trasy(Base):
+    """Route created by the GTFS import for a (route_id, direction_id) of the feed."""
+    __tablename__ = "Gtfs_Trasy"
+    __table_args__ = (
+        Index("ux_Gtfs_Trasy_route_direction", "route_id", "direction_id", unique=True),
+    )
+    id = Column(Integer, primary_key=True)
+    route_id = Column(Text, nullable=False)
+    direction_id = Column(Text, nullable=False)
+    id_trasy = Column(Integer, ForeignKey("Trasy.id", ondelete="CASCADE"), nullable=False)
+
+
+class Gtfs_Warianty(Base):
+    """Variant created by the GTFS import for a stop pattern (md5 of the stop ids) of a route."""
+    __tablename__ = "Gtfs_Warianty"
+    __table_args__ = (
+        Index("ux_Gtfs_Warianty_trasa_pattern", "id_trasy", "pattern", unique=True),
+    )
+    id = Column(Integer, primary_key=True)
+    id_trasy = Column(Integer, ForeignKey("Trasy.id", ondelete="CASCADE"), nullable=False)
+    pattern = Column(String(32), nullable=False)
+    id_warianty = Column(Integer, ForeignKey("Warianty.id", ondelete="CASCADE"), nullable=False)
@@ -1,5 +1,5 @@
 from app.core.database import Base
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 class User(Base):
@@ -12,6 +12,9 @@ class User(Base):
                                                        
 class User_Rola(Base):
     __tablename__ = "User_Rola"
+    __table_args__ = (
+        Index("ix_User_Rola_user_rola", "id_user", "id_rola"),
+    )
     id = Column(Integer, primary_key=True)
     id_user = Column(Integer, ForeignKey("Users.id"))
     id_rola = Column(Integer, ForeignKey("Rola.id"))
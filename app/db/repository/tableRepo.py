@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from sqlalchemy import Column, delete, inspect, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import ONETOMANY
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException
+from app.core.changes import notify_change
+from .base import BaseRepository
+
+
+@dataclass(frozen=True)
+class TableMessages:
+    not_found: str
+    conflict: str   # unique violation on update
+    in_use: str     # foreign key violation on delete
+    deleted: str    # formatted with the deleted row, e.g. "Autobus {rejestracja} został usunięty"
+
+
+class TableRepository(BaseRepository):
+    """
+    Update and delete of a single table row with UPDATE ... RETURNING / DELETE ... RETURNING
+    instead of load, modify, commit and refresh.
+    """
+
+    def __init__(self, session, model, messages: TableMessages) -> None:
+        super().__init__(session)
+        self.model = model
+        self.messages = messages
+        self.columns = model.__table__.columns
+
+    def _referencing_columns(self) -> List[Column]:
+        """
+        Foreign keys of child rows that session.delete() would set to NULL: one-to-many
+        relationships without a delete cascade.
+        """
+        columns = []
+        for relationship in inspect(self.model).relationships:
+            if relationship.direction is ONETOMANY and not relationship.cascade.delete:
+                columns.extend(remote for _, remote in relationship.local_remote_pairs)
+        return columns
+
+    def get(self, row_id: int) -> Row:
+        row = self.session.execute(select(*self.columns).where(self.model.id == row_id)).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail=self.messages.not_found)
+        return row
+
+    def update(self, row_id: int, values: Dict[str, Any],
+               on_row: Optional[Callable[[Row], None]] = None, changed: Iterable[str] = ()) -> Row:
+        """
+        Sets the given columns and returns the updated row. on_row runs in the same
+        transaction before the commit; changed lists further tables it modifies.
+        """
+        try:
+            if values:
+                row = self.session.execute(
+                    update(self.model).where(self.model.id == row_id).values(**values).returning(*self.columns)
+                ).first()
+                if row is None:
+                    raise HTTPException(status_code=404, detail=self.messages.not_found)
+            else:
+                row = self.get(row_id)
+            if on_row is not None:
+                on_row(row)
+            self.session.commit()
+        except IntegrityError:
+            self.session.rollback()
+            raise HTTPException(status_code=400, detail=self.messages.conflict)
+        except HTTPException:
+            self.session.rollback()
+            raise
+        notify_change(self.model.__tablename__, *changed)
+        return row
+
+    def delete(self, row_id: int, cascade: Iterable[Column] = ()) -> Dict[str, str]:
+        """
+        Deletes the row in one transaction with its dependants: rows referencing it through
+        `cascade` columns are deleted, children of its relationships are detached (FK set to
+        NULL) as session.delete() does.
+        """
+        changed = {self.model.__tablename__}
+        try:
+            for column in cascade:
+                if self.session.execute(delete(column.table).where(column == row_id)).rowcount:
+                    changed.add(column.table.name)
+            for column in self._referencing_columns():
+                if self.session.execute(
+                    update(column.table).where(column == row_id).values({column.name: None})
+                ).rowcount:
+                    changed.add(column.table.name)
+            row = self.session.execute(
+                delete(self.model).where(self.model.id == row_id).returning(*self.columns)
+            ).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail=self.messages.not_found)
+            self.session.commit()
+        except IntegrityError:
+            self.session.rollback()
+            raise HTTPException(status_code=400, detail=self.messages.in_use)
+        except HTTPException:
+            self.session.rollback()
+            raise
+        notify_change(*changed)
+        return {"message": self.messages.deleted.format(**row._mapping)}
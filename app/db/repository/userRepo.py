@@ -1,5 +1,7 @@
 from .base import BaseRepository
-from app.db.models.user import User
+from app.db.models.user import User, User_Rola, Rola
+from app.core.changes import notify_change
+from typing import List
 from app.db.schema.user import UserInCreate
 
 class AuthRepository(BaseRepository):
@@ -8,6 +10,7 @@ class AuthRepository(BaseRepository):
 
         self.session.add(instance=newUser)
         self.session.commit()
+        notify_change(User.__tablename__)
         self.session.refresh(instance=newUser)
 
         return newUser
@@ -23,4 +26,16 @@ class AuthRepository(BaseRepository):
 
     def get_user_by_id(self, user_id: int):
         user = self.session.query(User).filter_by(id=user_id).first()
-        return user
\ No newline at end of file
+        return user
+
+    def update_password(self, user_id: int, hashed_password: str):
+        self.session.query(User).filter_by(id=user_id).update({User.password: hashed_password})
+        self.session.commit()
+
+    def get_role_names(self, user_id: int) -> List[str]:
+        rows = self.session.query(Rola.nazwa) \
+            .join(User_Rola, User_Rola.id_rola == Rola.id) \
+            .filter(User_Rola.id_user == user_id) \
+            .order_by(Rola.nazwa) \
+            .all()
+        return [nazwa for (nazwa,) in rows]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Union, List, Optional
+from typing import Any, Generic, TypeVar, Union, List, Optional
 from datetime import time
 import json
 
@@ -74,6 +74,48 @@ class TrasaOutput(BaseModel):
     id: int
     nazwa: str
 
+T = TypeVar("T")
+
+class BulkConflict(BaseModel):
+    index: int
+    field: str
+    value: Any
+    detail: str
+
+class BulkCreateOutput(BaseModel, Generic[T]):
+    inserted: List[T]
+    conflicts: List[BulkConflict]
+
+class SyncOutput(BaseModel):
+    inserted: int
+    updated: int
+    unchanged: int
+    deleted: int
+
+# Wiersze list zwracanych wprost z tabel (szybka serializacja, pola jak kolumny)
+class LiniaRow(BaseModel):
+    id: int
+    numer: Optional[str] = None
+    kierunek: Optional[str] = None
+    opis: Optional[str] = None
+
+class PrzystanekRow(BaseModel):
+    id: int
+    nazwa: Optional[str] = None
+    longi: Optional[float] = None
+    lati: Optional[float] = None
+    ulica: Optional[str] = None
+
+class TrasaRow(BaseModel):
+    id: int
+    nazwa: Optional[str] = None
+
+class WariantRow(BaseModel):
+    id: int
+    nazwa: Optional[str] = None
+    kod_wariantu: Optional[str] = None
+    godziny_odjazdu: Optional[str] = None
+
 #-------------------------------
 
 class PrzystanekBase(BaseModel):
@@ -95,26 +137,71 @@ class WariantBase(BaseModel):
     class Config:
         orm_mode = True
 
-class TrasaCreate(BaseModel):
+def _validate_hour(v):
+    try:
+        time.fromisoformat(v)
+        return v
+    except ValueError:
+        raise ValueError("Nieprawidłowy format godziny. Użyj HH:MM")
+
+class WariantTrasyCreate(BaseModel):
+    kod_wariantu: str
+    nazwa: Optional[str] = None
     przystanki_ids: List[int] = Field(..., min_items=2, description="Lista ID przystanków w kolejności")
-    godziny_odjazdu: List[str] = Field(..., description="Godziny odjazdu w formacie HH:MM")
+    godziny_odjazdu: List[str] = Field([], description="Godziny odjazdu w formacie HH:MM")
+
+    @validator('godziny_odjazdu', each_item=True)
+    def validate_hour(cls, v):
+        return _validate_hour(v)
+
+class TrasaCreate(BaseModel):
+    # Pola pojedynczego wariantu (dotychczasowy format) - opcjonalne, gdy podano `warianty`
+    przystanki_ids: Optional[List[int]] = Field(None, min_items=2, description="Lista ID przystanków w kolejności")
+    godziny_odjazdu: List[str] = Field([], description="Godziny odjazdu w formacie HH:MM")
     nazwa_trasy: str = "Nowa trasa"
     kod_wariantu: str = "T1"
     numer_linii: Optional[str] = None
+    warianty: List[WariantTrasyCreate] = Field([], description="Kolejne warianty trasy, każdy z własnymi przystankami")
 
     @validator('godziny_odjazdu', each_item=True)
     def validate_hour(cls, v):
-        try:
-            time.fromisoformat(v)
-            return v
-        except ValueError:
-            raise ValueError("Nieprawidłowy format godziny. Użyj HH:MM")
+        return _validate_hour(v)
+
+    def lista_wariantow(self) -> List[WariantTrasyCreate]:
+        warianty = list(self.warianty)
+        if self.przystanki_ids:
+            warianty.insert(0, WariantTrasyCreate(
+                kod_wariantu=self.kod_wariantu,
+                przystanki_ids=self.przystanki_ids,
+                godziny_odjazdu=self.godziny_odjazdu
+            ))
+        return warianty
+
+class PozycjaPrzystanku(BaseModel):
+    id: int
+    przystanek_id: int
+    nazwa: Optional[str] = None
+    kolejnosc: int
+
+class PrzystanekWariantuInsert(BaseModel):
+    przystanek_id: int
+    po_id: Optional[int] = Field(None, description="ID pozycji, za którą wstawić przystanek; brak = na początek")
+
+class PrzystanekWariantuMove(BaseModel):
+    po_id: Optional[int] = Field(None, description="ID pozycji, za którą przenieść przystanek; brak = na początek")
+
+class SekwencjaPrzystankow(BaseModel):
+    przystanki_ids: List[int] = Field(..., min_items=2, description="Lista ID przystanków w kolejności")
+
+class WariantZPrzystankami(WariantBase):
+    przystanki: List[PrzystanekBase]
 
 class TrasaResponse(BaseModel):
     id: int
     nazwa: str
     wariant: WariantBase
     przystanki: List[PrzystanekBase]
+    warianty: List[WariantZPrzystankami] = []
     numer_linii: Optional[str] = None
     
     class Config:
@@ -168,6 +255,15 @@ class WariantInUpdate(BaseModel):
     id: int
     nazwa: Union[str, None] = None
     kod: Union[str, None] = None
+    godziny_odjazdu: Union[List[str], None] = None
+
+    @validator('godziny_odjazdu', each_item=True)
+    def validate_hour(cls, v):
+        try:
+            time.fromisoformat(v)
+            return v
+        except ValueError:
+            raise ValueError("Nieprawidłowy format godziny. Użyj HH:MM")
 
 # class UserOutput(BaseModel):
 #     id: int
@@ -185,6 +281,15 @@ class WariantInUpdate(BaseModel):
 # class UserWithToken(BaseModel):
 #     token: str
 
+class OdjazdOutput(BaseModel):
+    """Departure from a stop"""
+    godzina: time
+    wariant_id: int
+    kod_wariantu: Optional[str] = None
+    nazwa_wariantu: Optional[str] = None
+    numer_linii: Optional[str] = None
+    szacowana: bool = False
+
 class LinieTrasy(BaseModel):
     """Schema for assigning routes to lines"""
     line_id: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Union
+from typing import List, Union
 
 class UserInCreate(BaseModel):
     username: str
@@ -8,6 +8,7 @@ class UserInCreate(BaseModel):
 class UserOutput(BaseModel):
     id: int
     username: str
+    roles: List[str] = []
     
 class UserInUpdate(BaseModel):
     id: int
@@ -1,24 +1,32 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from app.db.schema.user import UserInCreate, UserInLogin, UserWithToken, UserOutput
 from app.core.database import get_db
+from app.core.security.hashHelper import HashQueueFull, HASH_QUEUE_TIMEOUT
 from sqlalchemy.orm import Session
 from app.service.userService import UserService
 
 authRouter = APIRouter()
 
+def _busy(error: HashQueueFull) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(error),
+                         headers={"Retry-After": str(max(1, int(HASH_QUEUE_TIMEOUT)))})
+
 @authRouter.post("/login", status_code=200, response_model=UserWithToken)
-def login(loginDetails: UserInLogin, session: Session = Depends(get_db)):
+async def login(loginDetails: UserInLogin, session: Session = Depends(get_db)):
     try:
-        print(loginDetails)
-        return UserService(session=session).login(login_details=loginDetails)
+        return await UserService(session=session).login(login_details=loginDetails)
+    except HashQueueFull as error:
+        raise _busy(error)
     except Exception as error:
         print(error)
         raise error
 
 @authRouter.post("/signup", status_code=201, response_model=UserOutput)
-def signUp(signUpDetails: UserInCreate, session: Session = Depends(get_db)):
+async def signUp(signUpDetails: UserInCreate, session: Session = Depends(get_db)):
     try:
-        return UserService(session=session).signup(user_details=signUpDetails)
+        return await UserService(session=session).signup(user_details=signUpDetails)
+    except HashQueueFull as error:
+        raise _busy(error)
     except Exception as error:
         print(error)
-        raise error
\ No newline at end of file
+        raise error
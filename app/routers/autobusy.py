@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.db.models.system import Linie_Trasy, Trasy, Kierowcy, Linie, Przystanki, Brygady, Autobusy, Warianty, Przystanki_Warianty, Odjazdy, Warianty_Trasy
@@ -7,26 +8,49 @@ from app.db.schema.autobus import (
     WariantInCreate, WariantOutput, TrasaInCreate, TrasaOutput, KierowcaInCreate, KierowcaOutput, 
     PrzystanekOutput, PrzystanekInCreate, BrygadaInCreate, BrygadaOutput,
     AutobusInUpdate, KierowcaInUpdate, BrygadaInUpdate, PrzystanekInUpdate,
-    WariantInUpdate, TrasaInUpdate, LiniaInUpdate
+    WariantInUpdate, TrasaInUpdate, LiniaInUpdate, OdjazdOutput,
+    LiniaRow, PrzystanekRow, TrasaRow, WariantRow, BulkCreateOutput, SyncOutput,
+    PozycjaPrzystanku, PrzystanekWariantuInsert, PrzystanekWariantuMove, SekwencjaPrzystankow
 )
 from app.db.crud.autobus import (
     create_linie, create_wariant, create_trasa, create_autobus, create_kierowca, create_brygada, create_przystanek,
-    get_autobusy, get_autobus_by_id, get_kierowcy, get_kierowca_by_id, get_brygady, get_brygada_by_id,
-    get_trasy, get_trasa_by_id, get_warianty, get_wariant_by_id, get_linia_by_id, get_przystanek_by_id,
+    get_autobus_by_id, get_kierowcy, get_kierowca_by_id, get_brygada_by_id,
+    get_trasa_by_id, get_warianty, get_wariant_by_id, get_linia_by_id, get_przystanek_by_id,
     update_autobus, update_kierowca, update_brygada, update_przystanek, update_linia, update_trasa, update_wariant,
-    delete_autobus, delete_kierowca, delete_brygada, delete_przystanek, delete_linia, delete_trasa, delete_wariant
+    delete_autobus, delete_kierowca, delete_brygada, delete_przystanek, delete_linia, delete_trasa, delete_wariant,
+    replace_departures, get_variant_departures, get_departures_from_stop,
+    get_autobusy_page, get_kierowcy_page, get_brygady_page, get_linie_page, get_przystanki_page,
+    get_trasy_page, get_warianty_page, create_trasa_z_wariantami,
+    create_autobusy_bulk, create_kierowcy_bulk, create_brygady_bulk, create_przystanki_bulk,
+    create_linie_bulk, create_trasy_bulk, sync_autobusy, sync_kierowcy, sync_przystanki, sync_linie,
+    AUTOBUSY_LISTING, KIEROWCY_LISTING, BRYGADY_LISTING, LINIE_LISTING, PRZYSTANKI_LISTING,
+    TRASY_LISTING, WARIANTY_LISTING
 )
-from app.core.database import get_db
+from app.db.crud.bulk import DuplicateKeyError
+from app.db.crud.pagination import ListSpec, ListParams, ListParamsError, Page
+from app.db.crud.sequence import (
+    get_variant_sequence, insert_stop_after, move_stop_after, remove_stop, replace_sequence
+)
+from app.core.database import get_db, get_async_db
+from app.core.changes import notify_change
+from app.core.versions import table_versions
+from app.service.pdfCache import etag_matches
+from app.service.gtfsImport import import_gtfs, GtfsImportError
+from app.util.protectRoute import get_current_user
+from app.db.crud import autobus_async
+from sqlalchemy.ext.asyncio import AsyncSession
+from decouple import config
 import time
 import json
-from typing import List
+from datetime import time as dt_time
+from typing import List, Optional
 
 from app.db.schema.autobus import (
     LinieTrasy, LinieTrasy_Response, RouteForLine, 
     LineForRoute, LineWithRoutes, RouteWithLines
 )
 from app.db.crud.autobus import (
-    assign_route_to_line, remove_route_from_line, 
+    assign_route_to_line, assign_routes_to_line, remove_route_from_line, 
     get_routes_for_line, get_lines_for_route
 )
 
@@ -35,6 +59,103 @@ router = APIRouter(
     tags=["Transport"]
 )
 
+# Hot read endpoints run on the async engine unless disabled, so both paths can be load-tested
+DB_ASYNC_READS = config("DB_ASYNC_READS", default=True, cast=bool)
+
+# Stronicowanie na żądanie: bez limit i after lista jest zwracana w całości (panel administracyjny),
+# z samym after strona ma PAGE_DEFAULT_LIMIT wierszy
+PAGE_DEFAULT_LIMIT = config("PAGE_DEFAULT_LIMIT", default=1000, cast=int)
+PAGE_MAX_LIMIT = config("PAGE_MAX_LIMIT", default=1000, cast=int)
+PAGE_RESERVED_PARAMS = {"limit", "after", "sort", "order"}
+
+
+def list_params(spec: ListSpec):
+    """Dependency reading limit/after/sort/order and whitelisted filters from the query string."""
+    def dependency(
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT, description="Rozmiar strony; bez limit i after cała lista"),
+        after: Optional[str] = Query(None, description="Kursor z nagłówka X-Next-Cursor"),
+        sort: Optional[str] = Query(None, description=f"Jedno z: {', '.join(spec.sort_fields)}"),
+        order: str = Query("asc", pattern="^(asc|desc)$")
+    ) -> ListParams:
+        filters = {k: v for k, v in request.query_params.items() if k not in PAGE_RESERVED_PARAMS}
+        unknown = sorted(set(filters) - set(spec.filter_fields))
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Nieznane filtry: {', '.join(unknown)}. Dozwolone: {', '.join(spec.filter_fields)}"
+            )
+        if sort is not None and sort not in spec.sort_fields:
+            raise HTTPException(status_code=400, detail=f"Nie można sortować po polu '{sort}'")
+        if limit is None and after is not None:
+            limit = PAGE_DEFAULT_LIMIT
+        return ListParams(limit=limit, after=after, sort=sort, desc=order == "desc", filters=filters)
+    return dependency
+
+
+def conditional_get(*models):
+    """
+    Dependency answering 304 when If-None-Match carries the current version of the given tables;
+    otherwise the ETag is set on the response (see _rows_response for endpoints returning a Response).
+    """
+    tables = [model.__tablename__ for model in models]
+
+    def dependency(request: Request, response: Response):
+        etag = table_versions.etag(tables, f"{request.url.path}?{request.url.query}")
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        request.state.etag = etag
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return dependency
+
+AUTOBUSY_VERSION = conditional_get(Autobusy)
+KIEROWCY_VERSION = conditional_get(Kierowcy)
+BRYGADY_VERSION = conditional_get(Brygady)
+LINIE_VERSION = conditional_get(Linie)
+PRZYSTANKI_VERSION = conditional_get(Przystanki)
+TRASY_VERSION = conditional_get(Trasy)
+WARIANTY_VERSION = conditional_get(Warianty)
+WARIANT_VERSION = conditional_get(Warianty, Odjazdy)
+SEKWENCJA_VERSION = conditional_get(Warianty, Przystanki_Warianty, Przystanki)
+ODJAZDY_VERSION = conditional_get(Przystanki, Odjazdy, Warianty, Warianty_Trasy, Linie_Trasy, Przystanki_Warianty, Linie)
+
+
+def _load_page(load_page) -> Page:
+    try:
+        return load_page()
+    except ListParamsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _load_page_async(load_page) -> Page:
+    try:
+        return await load_page()
+    except ListParamsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _page_headers(request: Request, page: Page) -> dict:
+    """Exposes the next cursor via X-Next-Cursor and Link headers; the body stays a plain list."""
+    if not page.next_cursor:
+        return {}
+    next_url = request.url.include_query_params(after=page.next_cursor)
+    return {"X-Next-Cursor": page.next_cursor, "Link": f'<{next_url}>; rel="next"'}
+
+
+def _page_items(request: Request, response: Response, page: Page):
+    response.headers.update(_page_headers(request, page))
+    return page.items
+
+
+def _rows_response(request: Request, page: Page) -> ORJSONResponse:
+    """Serializes column rows directly with orjson, bypassing jsonable_encoder and response_model validation."""
+    headers = _page_headers(request, page)
+    etag = getattr(request.state, "etag", None)
+    if etag:
+        headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+    return ORJSONResponse([row._asdict() for row in page.items], headers=headers)
+
 # Sekcja autobusów
 @router.post(
     "/autobusy",
@@ -148,97 +269,284 @@ def dodaj_linie(linia: LiniaInCreate, db: Session = Depends(get_db)):
             detail=f"Linia o numerze {linia.numer} już istnieje w systemie!"
         )
 
+# Zbiorcze dodawanie
+BULK_MAX_ITEMS = config("BULK_MAX_ITEMS", default=5000, cast=int)
+
+def _check_bulk_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="Lista do dodania jest pusta")
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Maksymalnie {BULK_MAX_ITEMS} pozycji w jednym żądaniu"
+        )
+
+@router.post("/autobusy/bulk", response_model=BulkCreateOutput[AutobusOutput])
+def dodaj_autobusy_zbiorczo(autobusy: List[AutobusInCreate], db: Session = Depends(get_db)):
+    _check_bulk_size(autobusy)
+    return create_autobusy_bulk(db, autobusy)._asdict()
+
+@router.post("/kierowcy/bulk", response_model=BulkCreateOutput[KierowcaOutput])
+def dodaj_kierowcow_zbiorczo(kierowcy: List[KierowcaInCreate], db: Session = Depends(get_db)):
+    _check_bulk_size(kierowcy)
+    return create_kierowcy_bulk(db, kierowcy)._asdict()
+
+@router.post("/brygady/bulk", response_model=BulkCreateOutput[BrygadaOutput])
+def dodaj_brygady_zbiorczo(brygady: List[BrygadaInCreate], db: Session = Depends(get_db)):
+    _check_bulk_size(brygady)
+    return create_brygady_bulk(db, brygady)._asdict()
+
+@router.post("/przystanki/bulk", response_model=BulkCreateOutput[PrzystanekRow])
+def dodaj_przystanki_zbiorczo(przystanki: List[PrzystanekInCreate], db: Session = Depends(get_db)):
+    _check_bulk_size(przystanki)
+    return create_przystanki_bulk(db, przystanki)._asdict()
+
+@router.post("/linie/bulk", response_model=BulkCreateOutput[LiniaRow])
+def dodaj_linie_zbiorczo(linie: List[LiniaInCreate], db: Session = Depends(get_db)):
+    _check_bulk_size(linie)
+    return create_linie_bulk(db, linie)._asdict()
+
+@router.post("/trasy/bulk", response_model=BulkCreateOutput[TrasaRow])
+def dodaj_trasy_zbiorczo(trasy: List[TrasaInCreate], db: Session = Depends(get_db)):
+    _check_bulk_size(trasy)
+    return create_trasy_bulk(db, trasy)._asdict()
+
+# Synchronizacja pełnej listy po kluczu naturalnym
+SYNC_MAX_ITEMS = config("SYNC_MAX_ITEMS", default=50000, cast=int)
+
+def _sync(items: list, run) -> dict:
+    if not items:
+        raise HTTPException(status_code=400, detail="Lista do synchronizacji jest pusta")
+    if len(items) > SYNC_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Maksymalnie {SYNC_MAX_ITEMS} pozycji w jednym żądaniu"
+        )
+    try:
+        return run()._asdict()
+    except DuplicateKeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        raise HTTPException(
+            status_code=409,
+            detail="Synchronizacja przerwana - nie można usunąć pozycji używanych w systemie"
+        )
+
+@router.put("/autobusy/sync", response_model=SyncOutput)
+def synchronizuj_autobusy(autobusy: List[AutobusInCreate], usun_brakujace: bool = False,
+                          db: Session = Depends(get_db)):
+    """Upsert autobusów po numerze rejestracyjnym"""
+    return _sync(autobusy, lambda: sync_autobusy(db, autobusy, usun_brakujace))
+
+@router.put("/kierowcy/sync", response_model=SyncOutput)
+def synchronizuj_kierowcow(kierowcy: List[KierowcaInCreate], usun_brakujace: bool = False,
+                           db: Session = Depends(get_db)):
+    """Upsert kierowców po numerze PESEL"""
+    return _sync(kierowcy, lambda: sync_kierowcy(db, kierowcy, usun_brakujace))
+
+@router.put("/przystanki/sync", response_model=SyncOutput)
+def synchronizuj_przystanki(przystanki: List[PrzystanekInCreate], usun_brakujace: bool = False,
+                            db: Session = Depends(get_db)):
+    """Upsert przystanków po nazwie"""
+    return _sync(przystanki, lambda: sync_przystanki(db, przystanki, usun_brakujace))
+
+@router.put("/linie/sync", response_model=SyncOutput)
+def synchronizuj_linie(linie: List[LiniaInCreate], usun_brakujace: bool = False,
+                       db: Session = Depends(get_db)):
+    """Upsert linii po numerze"""
+    return _sync(linie, lambda: sync_linie(db, linie, usun_brakujace))
+
     #get
-@router.get("/autobusy", response_model=List[AutobusOutput])
-def pobierz_autobusy(db: Session = Depends(get_db)):
-    return get_autobusy(db)
+@router.get("/autobusy", response_model=List[AutobusOutput], dependencies=[Depends(AUTOBUSY_VERSION)])
+def pobierz_autobusy(request: Request, response: Response,
+                     params: ListParams = Depends(list_params(AUTOBUSY_LISTING)), db: Session = Depends(get_db)):
+    return _page_items(request, response, _load_page(lambda: get_autobusy_page(db, params)))
 
-@router.get("/autobusy/{autobus_id}", response_model=AutobusOutput)
+@router.get("/autobusy/{autobus_id}", response_model=AutobusOutput, dependencies=[Depends(AUTOBUSY_VERSION)])
 def pobierz_autobus(autobus_id: int, db: Session = Depends(get_db)):
     autobus = get_autobus_by_id(db, autobus_id)
     if not autobus:
         raise HTTPException(status_code=404, detail="Autobus nie został znaleziony")
     return autobus
 
-@router.get("/kierowcy", response_model=List[KierowcaOutput])
-def pobierz_kierowcow(db: Session = Depends(get_db)):
-    return get_kierowcy(db)
+@router.get("/kierowcy", response_model=List[KierowcaOutput], dependencies=[Depends(KIEROWCY_VERSION)])
+def pobierz_kierowcow(request: Request, response: Response,
+                      params: ListParams = Depends(list_params(KIEROWCY_LISTING)), db: Session = Depends(get_db)):
+    return _page_items(request, response, _load_page(lambda: get_kierowcy_page(db, params)))
 
-@router.get("/kierowcy/{kierowca_id}", response_model=KierowcaOutput)
+@router.get("/kierowcy/{kierowca_id}", response_model=KierowcaOutput, dependencies=[Depends(KIEROWCY_VERSION)])
 def pobierz_kierowce(kierowca_id: int, db: Session = Depends(get_db)):
     kierowca = get_kierowca_by_id(db, kierowca_id)
     if not kierowca:
         raise HTTPException(status_code=404, detail="Kierowca nie został znaleziony")
     return kierowca
 
-@router.get("/brygady", response_model=List[BrygadaOutput])
-def pobierz_brygady(db: Session = Depends(get_db)):
-    return get_brygady(db)
+@router.get("/brygady", response_model=List[BrygadaOutput], dependencies=[Depends(BRYGADY_VERSION)])
+def pobierz_brygady(request: Request, response: Response,
+                    params: ListParams = Depends(list_params(BRYGADY_LISTING)), db: Session = Depends(get_db)):
+    return _page_items(request, response, _load_page(lambda: get_brygady_page(db, params)))
 
-@router.get("/brygady/{brygada_id}", response_model=BrygadaOutput)
+@router.get("/brygady/{brygada_id}", response_model=BrygadaOutput, dependencies=[Depends(BRYGADY_VERSION)])
 def pobierz_brygade(brygada_id: int, db: Session = Depends(get_db)):
     brygada = get_brygada_by_id(db, brygada_id)
     if not brygada:
         raise HTTPException(status_code=404, detail="Brygada nie została znaleziona")
     return brygada
 
-@router.get("/linie")
-def pobierz_linie(db: Session = Depends(get_db)):
-    return db.query(Linie).all()
-
-@router.get("/linie/{linia_id}", response_model=LiniaOutput)
+if DB_ASYNC_READS:
+    @router.get("/linie", response_model=List[LiniaRow], response_class=ORJSONResponse, dependencies=[Depends(LINIE_VERSION)])
+    async def pobierz_linie(request: Request,
+                            params: ListParams = Depends(list_params(LINIE_LISTING)),
+                            db: AsyncSession = Depends(get_async_db)):
+        return _rows_response(request, await _load_page_async(lambda: autobus_async.get_linie_page(db, params)))
+else:
+    @router.get("/linie", response_model=List[LiniaRow], response_class=ORJSONResponse, dependencies=[Depends(LINIE_VERSION)])
+    def pobierz_linie(request: Request,
+                      params: ListParams = Depends(list_params(LINIE_LISTING)), db: Session = Depends(get_db)):
+        return _rows_response(request, _load_page(lambda: get_linie_page(db, params)))
+
+@router.get("/linie/{linia_id}", response_model=LiniaOutput, dependencies=[Depends(LINIE_VERSION)])
 def pobierz_linie_by_id(linia_id: int, db: Session = Depends(get_db)):
     linia = get_linia_by_id(db, linia_id)
     if not linia:
         raise HTTPException(status_code=404, detail="Linia nie została znaleziona")
     return linia
 
-@router.get("/przystanki")
-def pobierz_przystanki(db: Session = Depends(get_db)):
-    try:
-        return db.query(Przystanki).all()
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Błąd serwera: {str(e)}"
-        )
+if DB_ASYNC_READS:
+    @router.get("/przystanki", response_model=List[PrzystanekRow], response_class=ORJSONResponse, dependencies=[Depends(PRZYSTANKI_VERSION)])
+    async def pobierz_przystanki(request: Request,
+                                 params: ListParams = Depends(list_params(PRZYSTANKI_LISTING)),
+                                 db: AsyncSession = Depends(get_async_db)):
+        try:
+            return _rows_response(request, await _load_page_async(lambda: autobus_async.get_przystanki_page(db, params)))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Błąd serwera: {str(e)}"
+            )
+else:
+    @router.get("/przystanki", response_model=List[PrzystanekRow], response_class=ORJSONResponse, dependencies=[Depends(PRZYSTANKI_VERSION)])
+    def pobierz_przystanki(request: Request,
+                           params: ListParams = Depends(list_params(PRZYSTANKI_LISTING)), db: Session = Depends(get_db)):
+        try:
+            return _rows_response(request, _load_page(lambda: get_przystanki_page(db, params)))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Błąd serwera: {str(e)}"
+            )
 
-@router.get("/przystanki/{przystanek_id}", response_model=PrzystanekOutput)
+@router.get("/przystanki/{przystanek_id}", response_model=PrzystanekOutput, dependencies=[Depends(PRZYSTANKI_VERSION)])
 def pobierz_przystanek(przystanek_id: int, db: Session = Depends(get_db)):
     przystanek = get_przystanek_by_id(db, przystanek_id)
     if not przystanek:
         raise HTTPException(status_code=404, detail="Przystanek nie został znaleziony")
     return przystanek
 
-@router.get("/trasy")
-def pobierz_trasy(db: Session = Depends(get_db)):
-    try:
-        return db.query(Trasy).all()
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Błąd serwera: {str(e)}"
-        )
+@router.get("/przystanki/{przystanek_id}/odjazdy", response_model=List[OdjazdOutput], dependencies=[Depends(ODJAZDY_VERSION)])
+def pobierz_odjazdy_z_przystanku(
+    przystanek_id: int,
+    od: dt_time = Query(dt_time(0, 0), description="Początek przedziału (HH:MM)"),
+    do: dt_time = Query(dt_time(23, 59, 59), description="Koniec przedziału (HH:MM)"),
+    db: Session = Depends(get_db)
+):
+    if not get_przystanek_by_id(db, przystanek_id):
+        raise HTTPException(status_code=404, detail="Przystanek nie został znaleziony")
+    return get_departures_from_stop(db, przystanek_id, od, do)
+
+if DB_ASYNC_READS:
+    @router.get("/trasy", response_model=List[TrasaRow], response_class=ORJSONResponse, dependencies=[Depends(TRASY_VERSION)])
+    async def pobierz_trasy(request: Request,
+                            params: ListParams = Depends(list_params(TRASY_LISTING)),
+                            db: AsyncSession = Depends(get_async_db)):
+        try:
+            return _rows_response(request, await _load_page_async(lambda: autobus_async.get_trasy_page(db, params)))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Błąd serwera: {str(e)}"
+            )
+else:
+    @router.get("/trasy", response_model=List[TrasaRow], response_class=ORJSONResponse, dependencies=[Depends(TRASY_VERSION)])
+    def pobierz_trasy(request: Request,
+                      params: ListParams = Depends(list_params(TRASY_LISTING)), db: Session = Depends(get_db)):
+        try:
+            return _rows_response(request, _load_page(lambda: get_trasy_page(db, params)))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Błąd serwera: {str(e)}"
+            )
     
-@router.get("/trasy/{trasa_id}", response_model=TrasaOutput)
+@router.get("/trasy/{trasa_id}", response_model=TrasaOutput, dependencies=[Depends(TRASY_VERSION)])
 def pobierz_trase(trasa_id: int, db: Session = Depends(get_db)):
     trasa = get_trasa_by_id(db, trasa_id)
     if not trasa:
         raise HTTPException(status_code=404, detail="Trasa nie została znaleziona")
     return trasa
 
-@router.get("/warianty")
-def pobierz_warianty(db: Session = Depends(get_db)):
-    try:
-        return db.query(Warianty).all()
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Błąd serwera: {str(e)}"
-        )
+if DB_ASYNC_READS:
+    @router.get("/warianty", response_model=List[WariantRow], response_class=ORJSONResponse, dependencies=[Depends(WARIANTY_VERSION)])
+    async def pobierz_warianty(request: Request,
+                               params: ListParams = Depends(list_params(WARIANTY_LISTING)),
+                               db: AsyncSession = Depends(get_async_db)):
+        try:
+            return _rows_response(request, await _load_page_async(lambda: autobus_async.get_warianty_page(db, params)))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Błąd serwera: {str(e)}"
+            )
+else:
+    @router.get("/warianty", response_model=List[WariantRow], response_class=ORJSONResponse, dependencies=[Depends(WARIANTY_VERSION)])
+    def pobierz_warianty(request: Request,
+                         params: ListParams = Depends(list_params(WARIANTY_LISTING)), db: Session = Depends(get_db)):
+        try:
+            return _rows_response(request, _load_page(lambda: get_warianty_page(db, params)))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Błąd serwera: {str(e)}"
+            )
     
+# Kolejność przystanków wariantu
+@router.get("/warianty/{wariant_id}/przystanki", response_model=List[PozycjaPrzystanku], dependencies=[Depends(SEKWENCJA_VERSION)])
+def pobierz_przystanki_wariantu(wariant_id: int, db: Session = Depends(get_db)):
+    if not get_wariant_by_id(db, wariant_id):
+        raise HTTPException(status_code=404, detail="Wariant nie został znaleziony")
+    return get_variant_sequence(db, wariant_id)
+
+@router.post("/warianty/{wariant_id}/przystanki", response_model=List[PozycjaPrzystanku], status_code=201)
+def wstaw_przystanek_wariantu(wariant_id: int, dane: PrzystanekWariantuInsert, db: Session = Depends(get_db)):
+    return insert_stop_after(db, wariant_id, dane.przystanek_id, dane.po_id)
+
+@router.patch("/warianty/{wariant_id}/przystanki/{pozycja_id}", response_model=List[PozycjaPrzystanku])
+def przenies_przystanek_wariantu(wariant_id: int, pozycja_id: int, dane: PrzystanekWariantuMove,
+                                 db: Session = Depends(get_db)):
+    return move_stop_after(db, wariant_id, pozycja_id, dane.po_id)
+
+@router.delete("/warianty/{wariant_id}/przystanki/{pozycja_id}", response_model=List[PozycjaPrzystanku])
+def usun_przystanek_wariantu(wariant_id: int, pozycja_id: int, db: Session = Depends(get_db)):
+    return remove_stop(db, wariant_id, pozycja_id)
+
+@router.put("/warianty/{wariant_id}/przystanki", response_model=List[PozycjaPrzystanku])
+def zastap_przystanki_wariantu(wariant_id: int, dane: SekwencjaPrzystankow, db: Session = Depends(get_db)):
+    return replace_sequence(db, wariant_id, dane.przystanki_ids)
+
 # nnie działa
-@router.get("/warianty/{wariant_id}")
+@router.get("/warianty/{wariant_id}", dependencies=[Depends(WARIANT_VERSION)])
 def pobierz_wariant(wariant_id: int, db: Session = Depends(get_db)):
     wariant = get_wariant_by_id(db, wariant_id)
     if not wariant:
@@ -249,7 +557,7 @@ def pobierz_wariant(wariant_id: int, db: Session = Depends(get_db)):
         "id": wariant.id,
         "nazwa": wariant.nazwa,
         "kod": wariant.kod_wariantu,  # Map kod_wariantu to kod for response
-        "godziny_odjazdu": json.loads(wariant.godziny_odjazdu) if wariant.godziny_odjazdu else []
+        "godziny_odjazdu": get_variant_departures(db, [wariant.id]).get(wariant.id, [])
     }
 
 
@@ -293,7 +601,7 @@ def aktualizuj_wariant(wariant_update: WariantInUpdate, db: Session = Depends(ge
         "id": updated_wariant.id,
         "nazwa": updated_wariant.nazwa,
         "kod": updated_wariant.kod_wariantu,
-        "godziny_odjazdu": json.loads(updated_wariant.godziny_odjazdu) if updated_wariant.godziny_odjazdu else []
+        "godziny_odjazdu": get_variant_departures(db, [updated_wariant.id]).get(updated_wariant.id, [])
     }
 
 #delete
@@ -352,82 +660,20 @@ def usun_wariant(wariant_id: int, db: Session = Depends(get_db)):
 #             detail=f"Linia o numerze {linia.numer} już istnieje w systemie!"
 #         )
 
+@router.post("/import/gtfs", dependencies=[Depends(get_current_user)])
+def importuj_gtfs(plik: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Importuje przystanki, linie, trasy, warianty i odjazdy z archiwum GTFS (.zip)."""
+    try:
+        return import_gtfs(db, plik.file)
+    except GtfsImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/trasyv2", response_model=TrasaResponse)
 def stworz_trase(
     dane: TrasaCreate,
     db: Session = Depends(get_db)
 ):
-    # Walidacja przystanków
-    przystanki = []
-    for przystanek_id in dane.przystanki_ids:
-        przystanek = db.query(Przystanki).get(przystanek_id)
-        if not przystanek:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Przystanek o ID {przystanek_id} nie istnieje"
-            )
-        przystanki.append(przystanek)
-    
-    if len(przystanki) < 2:
-        raise HTTPException(
-            status_code=400,
-            detail="Trasa musi mieć co najmniej 2 przystanki"
-        )
-
-    # Tworzenie trasy
-    trasa = Trasy(nazwa=dane.nazwa_trasy)
-    db.add(trasa)
-    db.flush()
-
-    # Tworzenie wariantu
-    wariant = Warianty(
-        nazwa=f"{dane.kod_wariantu}",
-        kod_wariantu=dane.kod_wariantu,
-        godziny_odjazdu=json.dumps(dane.godziny_odjazdu)  # Zapis jako JSON
-    )
-    db.add(wariant)
-    db.flush()
-
-    # Łączenie wariantu z trasą
-    wariant_trasa = Warianty_Trasy(
-        id_warianty=wariant.id,
-        id_trasy=trasa.id
-    )
-    db.add(wariant_trasa)
-
-    # Dodawanie przystanków do wariantu
-    for kolejnosc, przystanek in enumerate(przystanki, start=1):
-        pw = Przystanki_Warianty(
-            id_przystanki=przystanek.id,
-            id_warianty=wariant.id,
-            kolejnosc=kolejnosc
-        )
-        db.add(pw)
-
-    # Dodanie numeru linii jeśli podany
-    if dane.numer_linii:
-        linia = Linie_Trasy(
-            id_trasy=trasa.id,
-            numer_linii=dane.numer_linii
-        )
-        db.add(linia)
-
-    db.commit()
-    db.refresh(trasa)
-    
-    # Przygotowanie odpowiedzi
-    return {
-        "id": trasa.id,
-        "nazwa": trasa.nazwa,
-        "wariant": {
-            "id": wariant.id,
-            "nazwa": wariant.nazwa,
-            "kod_wariantu": wariant.kod_wariantu,
-            "godziny_odjazdu": json.loads(wariant.godziny_odjazdu)
-        },
-        "przystanki": przystanki,
-        "numer_linii": dane.numer_linii
-    }
+    return create_trasa_z_wariantami(db, dane)
 
 #trasolinie
 
@@ -521,38 +767,64 @@ def get_lines_for_route_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
-@router.get(
-    "/linie/{line_id}/complete",
-    response_model=LineWithRoutes,
-    summary="Get line with all its routes"
-)
-def get_line_with_routes(
-    line_id: int, 
-    db: Session = Depends(get_db)
-):
-    """
-    Get a line with all its assigned routes
-    """
-    try:
-        # Get the line
-        line = db.query(Linie).filter(Linie.id == line_id).first()
-        if not line:
-            raise HTTPException(status_code=404, detail="Line not found")
-        
-        # Get all routes for this line
-        routes = get_routes_for_line(db, line_id)
-        
-        return LineWithRoutes(
-            id=line.id,
-            numer=line.numer,
-            kierunek=line.kierunek,
-            opis=line.opis,
-            routes=routes
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+def _line_with_routes(line: Linie, routes) -> LineWithRoutes:
+    return LineWithRoutes(
+        id=line.id,
+        numer=line.numer,
+        kierunek=line.kierunek,
+        opis=line.opis,
+        routes=routes
+    )
+
+if DB_ASYNC_READS:
+    @router.get(
+        "/linie/{line_id}/complete",
+        response_model=LineWithRoutes,
+        summary="Get line with all its routes"
+    )
+    async def get_line_with_routes(
+        line_id: int,
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """
+        Get a line with all its assigned routes
+        """
+        try:
+            line = await autobus_async.get_linia_by_id(db, line_id)
+            if not line:
+                raise HTTPException(status_code=404, detail="Line not found")
+            return _line_with_routes(line, await autobus_async.get_routes_for_line(db, line_id))
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+else:
+    @router.get(
+        "/linie/{line_id}/complete",
+        response_model=LineWithRoutes,
+        summary="Get line with all its routes"
+    )
+    def get_line_with_routes(
+        line_id: int, 
+        db: Session = Depends(get_db)
+    ):
+        """
+        Get a line with all its assigned routes
+        """
+        try:
+            # Get the line
+            line = db.query(Linie).filter(Linie.id == line_id).first()
+            if not line:
+                raise HTTPException(status_code=404, detail="Line not found")
+            
+            # Get all routes for this line
+            routes = get_routes_for_line(db, line_id)
+            
+            return _line_with_routes(line, routes)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 @router.get(
     "/trasy/{route_id}/complete",
@@ -599,24 +871,7 @@ def assign_multiple_routes_to_line(
     Assign multiple routes to a line in a single operation
     """
     try:
-        results = []
-        errors = []
-        
-        for route_id in route_ids:
-            try:
-                result = assign_route_to_line(db, line_id, route_id)
-                results.append({
-                    "route_id": route_id,
-                    "status": "success",
-                    "assignment_id": result.id
-                })
-            except ValueError as e:
-                errors.append({
-                    "route_id": route_id,
-                    "status": "error",
-                    "message": str(e)
-                })
-        
+        results, errors = assign_routes_to_line(db, line_id, route_ids)
         return {
             "success_count": len(results),
             "error_count": len(errors),
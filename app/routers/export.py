@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Header
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from app.service.gtfsExport import current_export_path, stream_gtfs_zip
+from app.service.pdfCache import etag_matches
+from typing import Annotated, Union
+
+router = APIRouter(prefix="/export", tags=["Eksport"])
+
+@router.get("/gtfs")
+def eksportuj_gtfs(if_none_match: Annotated[Union[str, None], Header()] = None):
+    headers = {"Content-Disposition": "attachment; filename=gtfs.zip"}
+    key, path = current_export_path()
+    if path is not None:
+        etag = f'"{key}"'
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return FileResponse(path, media_type="application/zip", headers={**headers, "ETag": etag})
+
+    # Nothing cached for the current data: generate while sending and cache the result
+    return StreamingResponse(stream_gtfs_zip(), media_type="application/zip", headers=headers)
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Query
+from app.core.database import get_pool_stats
+from app.core.cache import reference_cache
+from app.core import broadcast
+from app.core.security.hashHelper import password_hasher
+from app.core.profiling import query_profiler, QueryProfiler
+from app.util.protectRoute import get_current_user, identity_cache
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    dependencies=[Depends(get_current_user)]
+)
+
+@router.get("/db/pool")
+def pool_stats():
+    """Live connection pool usage and checkout wait time histogram"""
+    return get_pool_stats()
+
+
+@router.get("/cache/reference")
+def reference_cache_stats():
+    """Hit/miss counters of the reference data cache and state of the cross-worker channel"""
+    stats = reference_cache.stats()
+    stats["broadcast"] = broadcast.change_broadcast.stats() if broadcast.change_broadcast else None
+    return stats
+
+
+@router.get("/cache/identity")
+def identity_cache_stats():
+    """Hit/miss counters of the authenticated user cache"""
+    return identity_cache.stats()
+
+
+@router.get("/auth/hashing")
+def password_hashing_stats():
+    """Load of the bcrypt executor: in-flight operations, rejections and queue timeouts"""
+    return password_hasher.stats()
+
+
+@router.get("/db/queries")
+def top_queries(limit: int = Query(20, ge=1, le=500),
+                sort: str = Query("total_ms", pattern=f"^({'|'.join(QueryProfiler.SORT_KEYS)})$")):
+    """Statement fingerprints with call counts, p50/p95/p99 and sampled EXPLAIN (ANALYZE, BUFFERS) plans"""
+    return {**query_profiler.stats(), "queries": query_profiler.top(limit, sort)}
+
+@router.delete("/db/queries")
+def reset_queries():
+    query_profiler.reset()
+    return {"message": "Statystyki zapytań zostały wyzerowane"}
@@ -0,0 +1,288 @@
+"""
+Streaming GTFS exporter.
+
+Every file is produced from a server-side cursor (yield_per) and written
+through zipfile into a small in-memory buffer that is drained after each
+chunk, so memory stays bounded regardless of network size. The finished
+archive is also written to the artifact cache and reused until one of the
+schedule tables changes, or for at most GTFS_CACHE_FINGERPRINT_TTL seconds when
+the change happened outside this process.
+
+    agency.txt, calendar.txt -> configuration (single daily service)
+    stops.txt                -> Przystanki
+    routes.txt               -> Linie
+    trips.txt                -> one trip per line, variant and departure from the first stop; a route
+                                belongs to Linie_Trasy.id_linie or, when only numer_linii is set
+                                (routes created through /trasyv2), to the line with that number
+    stop_times.txt           -> Przystanki_Warianty; the n-th trip takes the n-th Odjazdy row
+                                at each stop when that stop has as many departures as the first one
+
+Odjazdy usually holds times for the first stop only, while GTFS requires times
+at least at the first and last stop of a trip. Stops without a stored time are
+estimated: interpolated between stored times, or GTFS_STOP_INTERVAL seconds per
+stop after the last one. Estimated rows are exported with timepoint=0
+(approximate), stored ones with timepoint=1.
+"""
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+from app.core.database import AppSession
+from app.core.changes import on_change
+from app.db.crud.autobus import STOP_INTERVAL
+from app.db.models.system import (
+    Przystanki, Linie, Linie_Trasy, Warianty, Warianty_Trasy, Przystanki_Warianty, Odjazdy
+)
+from app.service.pdfCache import ArtifactCache, SCHEDULE_TABLES
+from decouple import config
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+
+GTFS_EXPORT_BATCH = config("GTFS_EXPORT_BATCH", default=5000, cast=int)
+GTFS_EXPORT_CHUNK = config("GTFS_EXPORT_CHUNK", default=256 * 1024, cast=int)
+GTFS_CACHE_DIR = config("GTFS_CACHE_DIR", default=os.path.join(tempfile.gettempdir(), "rozklad_gtfs_cache"))
+GTFS_AGENCY_NAME = config("GTFS_AGENCY_NAME", default="Komunikacja miejska")
+GTFS_AGENCY_URL = config("GTFS_AGENCY_URL", default="http://localhost")
+GTFS_AGENCY_TIMEZONE = config("GTFS_AGENCY_TIMEZONE", default="Europe/Warsaw")
+GTFS_CALENDAR_DAYS = config("GTFS_CALENDAR_DAYS", default=365, cast=int)
+GTFS_CACHE_FINGERPRINT_TTL = config("GTFS_CACHE_FINGERPRINT_TTL", default=300, cast=float)
+GTFS_STOP_INTERVAL = config("GTFS_STOP_INTERVAL", default=STOP_INTERVAL, cast=int)
+
+AGENCY_ID = "1"
+SERVICE_ID = "CODZIENNIE"
+ROUTE_TYPE_BUS = 3
+
+gtfs_cache = ArtifactCache(directory=GTFS_CACHE_DIR, max_entries=4, suffix=".zip",
+                           fingerprint_ttl=GTFS_CACHE_FINGERPRINT_TTL)
+
+
+@on_change
+def _invalidate_export(tables: Set[str]):
+    if tables & SCHEDULE_TABLES:
+        gtfs_cache.invalidate()
+
+
+def _stream(db: Session, statement) -> Iterable:
+    return db.execute(statement.execution_options(yield_per=GTFS_EXPORT_BATCH))
+
+
+def _gtfs_time(seconds: Optional[int]) -> str:
+    if seconds is None:
+        return ""
+    return f"{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+
+def _seconds(value) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _agency(db: Session):
+    yield [AGENCY_ID, GTFS_AGENCY_NAME, GTFS_AGENCY_URL, GTFS_AGENCY_TIMEZONE]
+
+
+def _calendar(db: Session):
+    start = date.today()
+    end = start + timedelta(days=GTFS_CALENDAR_DAYS)
+    yield [SERVICE_ID] + [1] * 7 + [start.strftime("%Y%m%d"), end.strftime("%Y%m%d")]
+
+
+def _stops(db: Session):
+    statement = select(Przystanki.id, Przystanki.nazwa, Przystanki.lati, Przystanki.longi, Przystanki.ulica) \
+        .order_by(Przystanki.id)
+    for row in _stream(db, statement):
+        yield list(row)
+
+
+def _routes(db: Session):
+    statement = select(Linie.id, Linie.numer, Linie.kierunek, Linie.opis).order_by(Linie.id)
+    for linia_id, numer, kierunek, opis in _stream(db, statement):
+        yield [linia_id, AGENCY_ID, numer, kierunek, opis, ROUTE_TYPE_BUS]
+
+
+def _numbered_departures():
+    """Odjazdy numbered per variant and stop in time order, with the number of departures at that stop."""
+    return select(
+        Odjazdy.id_warianty, Odjazdy.id_przystanku, Odjazdy.godzina,
+        func.row_number().over(partition_by=(Odjazdy.id_warianty, Odjazdy.id_przystanku),
+                               order_by=Odjazdy.godzina).label("n"),
+        func.count().over(partition_by=(Odjazdy.id_warianty, Odjazdy.id_przystanku)).label("cnt")
+    ).subquery("numbered")
+
+
+def _trips_query():
+    numbered = _numbered_departures()
+    first_stop = select(
+        Przystanki_Warianty.id_warianty, func.min(Przystanki_Warianty.kolejnosc).label("kolejnosc")
+    ).group_by(Przystanki_Warianty.id_warianty).subquery("first_stop")
+
+    linia_id = func.coalesce(Linie_Trasy.id_linie, Linie.id)
+    return select(
+        linia_id.label("linia_id"),
+        Warianty.id.label("wariant_id"),
+        Warianty.nazwa.label("nazwa"),
+        numbered.c.n, numbered.c.cnt, numbered.c.godzina
+    ).select_from(Przystanki_Warianty) \
+        .join(first_stop, and_(first_stop.c.id_warianty == Przystanki_Warianty.id_warianty,
+                               first_stop.c.kolejnosc == Przystanki_Warianty.kolejnosc)) \
+        .join(numbered, and_(numbered.c.id_warianty == Przystanki_Warianty.id_warianty,
+                             numbered.c.id_przystanku == Przystanki_Warianty.id_przystanki)) \
+        .join(Warianty, Warianty.id == Przystanki_Warianty.id_warianty) \
+        .join(Warianty_Trasy, Warianty_Trasy.id_warianty == Warianty.id) \
+        .join(Linie_Trasy, Linie_Trasy.id_trasy == Warianty_Trasy.id_trasy) \
+        .outerjoin(Linie, Linie.numer == Linie_Trasy.numer_linii) \
+        .where(linia_id.isnot(None))
+
+
+def _trip_id(linia_id: int, wariant_id: int, n: int) -> str:
+    return f"{linia_id}_{wariant_id}_{n}"
+
+
+def _trips(db: Session):
+    statement = _trips_query().order_by("linia_id", Warianty.id, "n")
+    for linia_id, wariant_id, nazwa, n, _, _ in _stream(db, statement):
+        yield [linia_id, SERVICE_ID, _trip_id(linia_id, wariant_id, n), nazwa]
+
+
+def _stop_times(db: Session):
+    trips = _trips_query().subquery("trips")
+    numbered = _numbered_departures()
+    statement = select(
+        trips.c.linia_id, trips.c.wariant_id, trips.c.n, trips.c.godzina.label("start"),
+        Przystanki_Warianty.id_przystanki, Przystanki_Warianty.kolejnosc, numbered.c.godzina
+    ).select_from(trips) \
+        .join(Przystanki_Warianty, Przystanki_Warianty.id_warianty == trips.c.wariant_id) \
+        .outerjoin(numbered, and_(numbered.c.id_warianty == trips.c.wariant_id,
+                                  numbered.c.id_przystanku == Przystanki_Warianty.id_przystanki,
+                                  numbered.c.n == trips.c.n,
+                                  numbered.c.cnt == trips.c.cnt)) \
+        .order_by(trips.c.linia_id, trips.c.wariant_id, trips.c.n, Przystanki_Warianty.kolejnosc)
+
+    trip_key, stops = None, []
+    for linia_id, wariant_id, n, start, przystanek_id, kolejnosc, godzina in _stream(db, statement):
+        if (linia_id, wariant_id, n) != trip_key:
+            yield from _trip_stop_times(trip_key, stops)
+            trip_key, stops = (linia_id, wariant_id, n), []
+        seconds = None
+        if godzina is not None:
+            seconds = _seconds(godzina)
+            # Odjazdy stores the time of day; trips running past midnight continue above 24:00:00
+            if seconds < _seconds(start):
+                seconds += 24 * 3600
+        stops.append([przystanek_id, kolejnosc, seconds])
+    yield from _trip_stop_times(trip_key, stops)
+
+
+def _trip_stop_times(trip_key: Optional[Tuple[int, int, int]], stops: List[list]):
+    """Rows of one trip, with the missing times estimated (see the module docstring)."""
+    if trip_key is None:
+        return
+    known = [i for i, stop in enumerate(stops) if stop[2] is not None]
+    estimated = [stop[2] for stop in stops]
+    for left, right in zip(known, known[1:]):
+        step = (stops[right][2] - stops[left][2]) / (right - left)
+        for i in range(left + 1, right):
+            estimated[i] = int(round(stops[left][2] + step * (i - left)))
+    if known:
+        for i in range(known[-1] + 1, len(stops)):
+            estimated[i] = stops[known[-1]][2] + GTFS_STOP_INTERVAL * (i - known[-1])
+    trip_id = _trip_id(*trip_key)
+    for (przystanek_id, kolejnosc, seconds), value in zip(stops, estimated):
+        gtfs_time = _gtfs_time(value)
+        yield [trip_id, gtfs_time, gtfs_time, przystanek_id, kolejnosc, 1 if seconds is not None else 0]
+
+
+GTFS_FILES: List[Tuple[str, List[str], object]] = [
+    ("agency.txt", ["agency_id", "agency_name", "agency_url", "agency_timezone"], _agency),
+    ("calendar.txt", ["service_id", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+                      "start_date", "end_date"], _calendar),
+    ("stops.txt", ["stop_id", "stop_name", "stop_lat", "stop_lon", "stop_desc"], _stops),
+    ("routes.txt", ["route_id", "agency_id", "route_short_name", "route_long_name", "route_desc", "route_type"],
+     _routes),
+    ("trips.txt", ["route_id", "service_id", "trip_id", "trip_headsign"], _trips),
+    ("stop_times.txt", ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence", "timepoint"],
+     _stop_times),
+]
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable target for zipfile that keeps only the not yet streamed bytes."""
+
+    def __init__(self, tee):
+        self._buffer = bytearray()
+        self._tee = tee
+        self._digest = hashlib.sha256()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._tee.write(data)
+        self._digest.update(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def current_export_path() -> Tuple[Optional[str], Optional[str]]:
+    """(etag key, path) of the cached archive for the current data, if there is one."""
+    key = gtfs_cache.current_fingerprint("gtfs")
+    if key is None:
+        return None, None
+    return key, gtfs_cache.get_path(key)
+
+
+def stream_gtfs_zip() -> Iterator[bytes]:
+    """
+    Yields the GTFS archive chunk by chunk and stores it in the artifact cache when complete.
+    Opens its own session: the request-scoped one is closed before a streaming body is sent.
+    """
+    generation = gtfs_cache.generation
+    tmp = gtfs_cache.temp_file()
+    db = AppSession()
+    completed = False
+    try:
+        sink = _ChunkSink(tmp)
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, header, rows in GTFS_FILES:
+                with archive.open(name, "w") as member:
+                    text = io.TextIOWrapper(member, encoding="utf-8", newline="")
+                    writer = csv.writer(text)
+                    writer.writerow(header)
+                    for row in rows(db):
+                        writer.writerow(row)
+                        if sink.pending() >= GTFS_EXPORT_CHUNK:
+                            yield sink.drain()
+                    text.flush()
+                    text.detach()
+                if sink.pending() >= GTFS_EXPORT_CHUNK:
+                    yield sink.drain()
+        yield sink.drain()
+        completed = True
+    finally:
+        db.close()
+        tmp.close()
+        if completed:
+            key = sink.hexdigest()
+            gtfs_cache.put_file(key, tmp.name)
+            gtfs_cache.remember_fingerprint("gtfs", key, generation)
+        elif os.path.exists(tmp.name):
+            os.unlink(tmp.name)
@@ -0,0 +1,323 @@
+"""
+Streaming GTFS importer.
+
+The archive is read member by member without unpacking it: each CSV is
+parsed row by row and loaded into temporary staging tables with COPY in
+batches of GTFS_COPY_BATCH rows. Mapping onto the schema then happens in
+set-based SQL on the server, so memory stays constant regardless of the
+number of stop_times:
+
+    stops                 -> Przystanki (by name)
+    routes                -> Linie (by short name)
+    trips, route+direction -> Trasy + Linie_Trasy, remembered in Gtfs_Trasy
+    distinct stop pattern -> Warianty + Warianty_Trasy + Przystanki_Warianty, remembered in Gtfs_Warianty
+    stop_times            -> Odjazdy
+
+Re-importing a feed is idempotent: routes and patterns already mapped keep
+their Trasy and Warianty and only their departures are replaced. Stops of the
+feed sharing a name end up as one Przystanki row (the name is unique); they are
+reported in the result instead of being merged silently.
+"""
+from sqlalchemy import text
+from sqlalchemy.exc import DataError
+from sqlalchemy.orm import Session
+from app.core.changes import notify_change
+from app.db.models.system import (
+    Przystanki, Linie, Trasy, Linie_Trasy, Warianty, Warianty_Trasy, Przystanki_Warianty, Odjazdy,
+    Gtfs_Trasy, Gtfs_Warianty
+)
+from decouple import config
+from typing import BinaryIO, Callable, Dict, List, Union
+import csv
+import io
+import re
+import zipfile
+
+GTFS_COPY_BATCH = config("GTFS_COPY_BATCH", default=50000, cast=int)
+
+# GTFS file -> (staging table, columns copied, columns that must be present)
+STAGING_TABLES = {
+    "stops.txt": ("gtfs_stops", ["stop_id", "stop_name", "stop_desc", "stop_lat", "stop_lon", "location_type"],
+                  ["stop_id", "stop_name"]),
+    "routes.txt": ("gtfs_routes", ["route_id", "route_short_name", "route_long_name", "route_desc"],
+                   ["route_id"]),
+    "trips.txt": ("gtfs_trips", ["trip_id", "route_id", "direction_id", "trip_headsign"],
+                  ["trip_id", "route_id"]),
+    "stop_times.txt": ("gtfs_stop_times", ["trip_id", "stop_id", "stop_sequence", "arrival_time", "departure_time"],
+                       ["trip_id", "stop_id", "stop_sequence"]),
+}
+
+GTFS_TIME = re.compile(r"\s*\d{1,3}:[0-5]\d:[0-5]\d\s*")
+SEQUENCE = re.compile(r"\s*\d{1,9}\s*")
+
+
+def _is_time(value: str) -> bool:
+    return not value or GTFS_TIME.fullmatch(value) is not None
+
+
+def _is_sequence(value: str) -> bool:
+    return SEQUENCE.fullmatch(value) is not None
+
+
+def _is_coordinate(value: str) -> bool:
+    if not value:
+        return True
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+# GTFS file -> {column: check}; values the mapping SQL casts are checked while staging, so a malformed
+# feed is rejected with the member, line and value instead of failing inside the mapping
+VALIDATED_COLUMNS: Dict[str, Dict[str, Callable[[str], bool]]] = {
+    "stops.txt": {"stop_lat": _is_coordinate, "stop_lon": _is_coordinate},
+    "stop_times.txt": {"stop_sequence": _is_sequence, "arrival_time": _is_time, "departure_time": _is_time},
+}
+
+IMPORTED_TABLES = [
+    Gtfs_Trasy.__tablename__, Gtfs_Warianty.__tablename__, Przystanki.__tablename__, Linie.__tablename__, Trasy.__tablename__, Linie_Trasy.__tablename__,
+    Warianty.__tablename__, Warianty_Trasy.__tablename__, Przystanki_Warianty.__tablename__, Odjazdy.__tablename__,
+]
+
+GTFS_REPORT_LIMIT = config("GTFS_REPORT_LIMIT", default=50, cast=int)
+
+LINE_NUMBER = "left(coalesce(NULLIF(r.route_short_name, ''), r.route_id), 25)"
+DIRECTION = "coalesce(NULLIF(t.direction_id, ''), '0')"
+PLAIN_STOP = "coalesce(NULLIF(location_type, ''), '0') = '0'"
+
+# (name of the counter in the result, statement); executed in order inside the import transaction
+MAPPING_STEPS = [
+    (None, 'CREATE INDEX ON gtfs_stop_times (trip_id)'),
+    (None, 'CREATE INDEX ON gtfs_trips (trip_id)'),
+    (None, 'ANALYZE gtfs_stops, gtfs_routes, gtfs_trips, gtfs_stop_times'),
+    ("przystanki", f'''
+        INSERT INTO "Przystanki" (nazwa, longi, lati, ulica)
+        SELECT DISTINCT ON (nazwa) nazwa, longi, lati, ulica
+        FROM (
+            SELECT left(stop_name, 50) AS nazwa,
+                   NULLIF(stop_lon, '')::float8 AS longi,
+                   NULLIF(stop_lat, '')::float8 AS lati,
+                   left(coalesce(stop_desc, ''), 50) AS ulica,
+                   stop_id
+            FROM gtfs_stops
+            WHERE {PLAIN_STOP} AND NULLIF(stop_name, '') IS NOT NULL
+        ) s
+        ORDER BY nazwa, stop_id
+        ON CONFLICT (nazwa) DO NOTHING
+    '''),
+    (None, '''
+        CREATE TEMP TABLE gtfs_stop_map ON COMMIT DROP AS
+        SELECT s.stop_id, p.id AS przystanek_id
+        FROM gtfs_stops s JOIN "Przystanki" p ON p.nazwa = left(s.stop_name, 50)
+    '''),
+    (None, 'CREATE UNIQUE INDEX ON gtfs_stop_map (stop_id)'),
+    ("linie", f'''
+        INSERT INTO "Linie" (numer, kierunek, opis)
+        SELECT DISTINCT ON (numer) numer, kierunek, opis
+        FROM (
+            SELECT {LINE_NUMBER} AS numer,
+                   left(coalesce(r.route_long_name, ''), 50) AS kierunek,
+                   left(coalesce(NULLIF(r.route_desc, ''), r.route_long_name, ''), 100) AS opis,
+                   r.route_id
+            FROM gtfs_routes r
+        ) r
+        ORDER BY numer, route_id
+        ON CONFLICT (numer) DO UPDATE SET kierunek = EXCLUDED.kierunek, opis = EXCLUDED.opis
+    '''),
+    (None, '''
+        CREATE TEMP TABLE gtfs_trip_patterns ON COMMIT DROP AS
+        SELECT st.trip_id, md5(string_agg(m.przystanek_id::text, ',' ORDER BY st.stop_sequence::int)) AS pattern
+        FROM gtfs_stop_times st JOIN gtfs_stop_map m ON m.stop_id = st.stop_id
+        GROUP BY st.trip_id
+    '''),
+    (None, 'CREATE UNIQUE INDEX ON gtfs_trip_patterns (trip_id)'),
+    # Ids are drawn from the sequences up front so the staging keys can be mapped without RETURNING;
+    # routes and patterns imported before keep their ids (COALESCE only calls nextval for new ones)
+    (None, f'''
+        CREATE TEMP TABLE gtfs_route_dirs ON COMMIT DROP AS
+        SELECT d.route_id, d.direction_id, d.nazwa,
+               coalesce(g.id_trasy, nextval(pg_get_serial_sequence('"Trasy"', 'id'))) AS trasa_id,
+               g.id_trasy IS NULL AS is_new
+        FROM (
+            SELECT t.route_id, {DIRECTION} AS direction_id,
+                   left(coalesce(min(NULLIF(t.trip_headsign, '')), t.route_id), 50) AS nazwa
+            FROM gtfs_trips t JOIN gtfs_trip_patterns tp ON tp.trip_id = t.trip_id
+            GROUP BY t.route_id, {DIRECTION}
+        ) d
+        LEFT JOIN "Gtfs_Trasy" g ON g.route_id = d.route_id AND g.direction_id = d.direction_id
+    '''),
+    ("trasy", 'INSERT INTO "Trasy" (id, nazwa) SELECT trasa_id, nazwa FROM gtfs_route_dirs WHERE is_new'),
+    (None, '''
+        INSERT INTO "Gtfs_Trasy" (route_id, direction_id, id_trasy)
+        SELECT route_id, direction_id, trasa_id FROM gtfs_route_dirs WHERE is_new
+    '''),
+    (None, f'''
+        INSERT INTO "Linie_Trasy" (id_linie, id_trasy, numer_linii)
+        SELECT l.id, d.trasa_id, l.numer
+        FROM gtfs_route_dirs d
+        JOIN gtfs_routes r ON r.route_id = d.route_id
+        JOIN "Linie" l ON l.numer = {LINE_NUMBER}
+        ON CONFLICT DO NOTHING
+    '''),
+    (None, f'''
+        CREATE TEMP TABLE gtfs_variants ON COMMIT DROP AS
+        SELECT d.trasa_id, p.pattern, p.rep_trip, p.nazwa,
+               left('W' || row_number() OVER (PARTITION BY d.trasa_id ORDER BY p.trips DESC, p.pattern), 5) AS kod,
+               coalesce(g.id_warianty, nextval(pg_get_serial_sequence('"Warianty"', 'id'))) AS wariant_id,
+               g.id_warianty IS NULL AS is_new
+        FROM (
+            SELECT t.route_id, {DIRECTION} AS direction_id, tp.pattern, min(t.trip_id) AS rep_trip,
+                   left(coalesce(min(NULLIF(t.trip_headsign, '')), ''), 50) AS nazwa, count(*) AS trips
+            FROM gtfs_trips t JOIN gtfs_trip_patterns tp ON tp.trip_id = t.trip_id
+            GROUP BY t.route_id, {DIRECTION}, tp.pattern
+        ) p
+        JOIN gtfs_route_dirs d ON d.route_id = p.route_id AND d.direction_id = p.direction_id
+        LEFT JOIN "Gtfs_Warianty" g ON g.id_trasy = d.trasa_id AND g.pattern = p.pattern
+    '''),
+    ("warianty", '''
+        INSERT INTO "Warianty" (id, nazwa, kod_wariantu) SELECT wariant_id, nazwa, kod FROM gtfs_variants WHERE is_new
+    '''),
+    (None, 'INSERT INTO "Warianty_Trasy" (id_warianty, id_trasy) SELECT wariant_id, trasa_id FROM gtfs_variants WHERE is_new'),
+    (None, '''
+        INSERT INTO "Gtfs_Warianty" (id_trasy, pattern, id_warianty)
+        SELECT trasa_id, pattern, wariant_id FROM gtfs_variants WHERE is_new
+    '''),
+    ("przystanki_warianty", '''
+        INSERT INTO "Przystanki_Warianty" (id_przystanki, id_warianty, kolejnosc)
+        SELECT m.przystanek_id, v.wariant_id,
+               row_number() OVER (PARTITION BY v.wariant_id ORDER BY st.stop_sequence::int)
+        FROM gtfs_variants v
+        JOIN gtfs_stop_times st ON st.trip_id = v.rep_trip
+        JOIN gtfs_stop_map m ON m.stop_id = st.stop_id
+        WHERE v.is_new
+    '''),
+    (None, f'''
+        CREATE TEMP TABLE gtfs_trip_variants ON COMMIT DROP AS
+        SELECT t.trip_id, v.wariant_id
+        FROM gtfs_trips t
+        JOIN gtfs_trip_patterns tp ON tp.trip_id = t.trip_id
+        JOIN gtfs_route_dirs d ON d.route_id = t.route_id AND d.direction_id = {DIRECTION}
+        JOIN gtfs_variants v ON v.trasa_id = d.trasa_id AND v.pattern = tp.pattern
+    '''),
+    (None, 'CREATE UNIQUE INDEX ON gtfs_trip_variants (trip_id)'),
+    # The feed is the source of departures of every variant it maps to
+    ("odjazdy_usuniete", '''
+        DELETE FROM "Odjazdy" WHERE id_warianty IN (SELECT wariant_id FROM gtfs_variants WHERE NOT is_new)
+    '''),
+    # GTFS times may exceed 24:00:00 for after-midnight trips; Odjazdy keeps the time of day
+    ("odjazdy", '''
+        INSERT INTO "Odjazdy" (id_warianty, id_przystanku, godzina)
+        SELECT DISTINCT tv.wariant_id, m.przystanek_id,
+               make_time(split_part(x.t, ':', 1)::int % 24, split_part(x.t, ':', 2)::int, split_part(x.t, ':', 3)::float8)
+        FROM gtfs_stop_times st
+        JOIN gtfs_trip_variants tv ON tv.trip_id = st.trip_id
+        JOIN gtfs_stop_map m ON m.stop_id = st.stop_id
+        CROSS JOIN LATERAL (SELECT trim(coalesce(NULLIF(st.departure_time, ''), NULLIF(st.arrival_time, ''))) AS t) x
+        WHERE x.t IS NOT NULL
+    '''),
+]
+
+# (name in the result, query returning one value); run after the mapping, before the staging tables are dropped
+REPORT_QUERIES = [
+    ("przystanki_scalone", f'''
+        SELECT count(*) - count(DISTINCT left(stop_name, 50))
+        FROM gtfs_stops WHERE {PLAIN_STOP} AND NULLIF(stop_name, '') IS NOT NULL
+    '''),
+    ("przystanki_pominiete", f'''
+        SELECT count(*) FROM gtfs_stops WHERE {PLAIN_STOP} AND NULLIF(stop_name, '') IS NULL
+    '''),
+    ("nazwy_scalonych_przystankow", f'''
+        SELECT coalesce(array_agg(nazwa ORDER BY nazwa), '{{}}')
+        FROM (
+            SELECT left(stop_name, 50) AS nazwa
+            FROM gtfs_stops WHERE {PLAIN_STOP} AND NULLIF(stop_name, '') IS NOT NULL
+            GROUP BY 1 HAVING count(*) > 1
+            ORDER BY 1 LIMIT {int(GTFS_REPORT_LIMIT)}
+        ) merged
+    '''),
+]
+
+
+class GtfsImportError(ValueError):
+    pass
+
+
+def _copy_member(cursor, archive: zipfile.ZipFile, member: str, table: str, columns: List[str], required: List[str]) -> int:
+    with archive.open(member) as raw:
+        reader = csv.reader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+        header = [name.strip() for name in next(reader, [])]
+        missing = [name for name in required if name not in header]
+        if missing:
+            raise GtfsImportError(f"{member}: brak kolumn {', '.join(missing)}")
+        positions = [header.index(name) if name in header else None for name in columns]
+        checks = [(name, columns.index(name), check)
+                  for name, check in VALIDATED_COLUMNS.get(member.rsplit("/", 1)[-1], {}).items()]
+
+        copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        total, batch = 0, io.StringIO()
+        writer = csv.writer(batch)
+        for row in reader:
+            if not row:
+                continue
+            values = [row[i] if i is not None and i < len(row) else "" for i in positions]
+            for name, position, check in checks:
+                if not check(values[position]):
+                    raise GtfsImportError(
+                        f"{member}, wiersz {reader.line_num}: nieprawidłowa wartość {name} '{values[position]}'"
+                    )
+            writer.writerow(values)
+            total += 1
+            if total % GTFS_COPY_BATCH == 0:
+                batch.seek(0)
+                cursor.copy_expert(copy_sql, batch)
+                batch.seek(0)
+                batch.truncate()
+        if batch.tell():
+            batch.seek(0)
+            cursor.copy_expert(copy_sql, batch)
+        return total
+
+
+def import_gtfs(db: Session, source: Union[str, BinaryIO]) -> Dict[str, Union[int, List[str]]]:
+    """Imports a GTFS zip (path or binary file object) in a single transaction."""
+    if db.get_bind().dialect.name != "postgresql":
+        raise GtfsImportError("Import GTFS wymaga bazy PostgreSQL")
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise GtfsImportError("Plik nie jest archiwum ZIP")
+
+    with archive:
+        members = {name.rsplit("/", 1)[-1]: name for name in archive.namelist()}
+        missing = [name for name in STAGING_TABLES if name not in members]
+        if missing:
+            raise GtfsImportError(f"Brak plików w archiwum: {', '.join(missing)}")
+
+        stats = {}
+        try:
+            cursor = db.connection().connection.driver_connection.cursor()
+            for member, (table, columns, required) in STAGING_TABLES.items():
+                db.execute(text(
+                    f"CREATE TEMP TABLE {table} ({', '.join(f'{column} text' for column in columns)}) ON COMMIT DROP"
+                ))
+                stats[f"{member[:-4]}_gtfs"] = _copy_member(cursor, archive, members[member], table, columns, required)
+
+            for name, statement in MAPPING_STEPS:
+                try:
+                    result = db.execute(text(statement))
+                except DataError as e:
+                    # Values the staging checks do not cover
+                    raise GtfsImportError(f"Nieprawidłowe dane w archiwum: {e.orig}".strip())
+                if name:
+                    stats[name] = result.rowcount
+            for name, query in REPORT_QUERIES:
+                stats[name] = db.execute(text(query)).scalar()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    notify_change(*IMPORTED_TABLES)
+    return stats
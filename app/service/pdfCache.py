@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from decouple import config
+from app.core.changes import on_change
+
+PDF_CACHE_DIR = config("PDF_CACHE_DIR", default=os.path.join(tempfile.gettempdir(), "rozklad_pdf_cache"))
+PDF_CACHE_MAX_BYTES = config("PDF_CACHE_MAX_BYTES", default=256 * 1024 * 1024, cast=int)
+PDF_CACHE_MAX_ENTRIES = config("PDF_CACHE_MAX_ENTRIES", default=64, cast=int)
+PDF_CACHE_FINGERPRINT_TTL = config("PDF_CACHE_FINGERPRINT_TTL", default=60, cast=float)
+
+# Bump whenever the PDF layout changes so old artifacts stop matching
+RENDER_VERSION = "1"
+
+SCHEDULE_TABLES = {
+    "Linie", "Linie_Trasy", "Trasy", "Warianty_Trasy",
+    "Warianty", "Przystanki_Warianty", "Przystanki", "Odjazdy"
+}
+
+
+def schedule_fingerprint(scope: str, schedules: List[Dict]) -> str:
+    payload = json.dumps(schedules, sort_keys=True, default=str, separators=(",", ":"))
+    digest = hashlib.sha256()
+    digest.update(f"{RENDER_VERSION}:{scope}:".encode("utf-8"))
+    digest.update(payload.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ArtifactCache(object):
+    """
+    Content-addressed on-disk store of rendered artifacts (PDFs, GTFS zips) with LRU eviction.
+
+    Fingerprints of the current data are memoized per scope and dropped whenever
+    a write touches one of the schedule tables, so an unchanged network is served
+    without touching the database at all. Writes this process is not told about
+    (another worker without CHANGE_CHANNEL, the GTFS import CLI, manual SQL) are
+    picked up when the memo expires after `fingerprint_ttl` seconds.
+    """
+
+    def __init__(self, directory: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES,
+                 max_entries: int = PDF_CACHE_MAX_ENTRIES, suffix: str = ".pdf",
+                 fingerprint_ttl: float = PDF_CACHE_FINGERPRINT_TTL, clock: Callable[[], float] = time.monotonic):
+        self.directory = directory
+        self.fingerprint_ttl = fingerprint_ttl
+        self._clock = clock
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._generation = 0
+        self._fingerprints: Dict[str, Tuple[float, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load_existing()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def _load_existing(self):
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                # Leftover from a write interrupted mid-way
+                self._unlink(path)
+            elif name.endswith(self.suffix):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self._unlink(self._path(key))
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def current_fingerprint(self, scope: str) -> Optional[str]:
+        entry = self._fingerprints.get(scope)
+        if entry is None or entry[0] <= self._clock():
+            return None
+        return entry[1]
+
+    def remember_fingerprint(self, scope: str, fingerprint: str, generation: int):
+        with self._lock:
+            # A write landed while the snapshot was loading; the fingerprint may already be stale
+            if generation == self._generation:
+                self._fingerprints[scope] = (self._clock() + self.fingerprint_ttl, fingerprint)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._fingerprints.clear()
+
+    def get_path(self, key: str) -> Optional[str]:
+        """Path of a cached artifact, for serving large files without reading them into memory."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            path = self._path(key)
+            if not os.path.exists(path):
+                self._size -= self._entries.pop(key, 0)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as cached_file:
+                return cached_file.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(key, 0)
+            return None
+
+    def temp_file(self):
+        """Open temporary file inside the cache directory, to be committed with put_file."""
+        return tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False)
+
+    def put_file(self, key: str, tmp_path: str):
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+
+    def put(self, key: str, data: bytes):
+        tmp = self.temp_file()
+        try:
+            with tmp:
+                tmp.write(data)
+            self.put_file(key, tmp.name)
+        except Exception:
+            self._unlink(tmp.name)
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "generation": self._generation
+            }
+
+
+pdf_cache = ArtifactCache()
+
+
+@on_change
+def _invalidate_schedules(tables: Set[str]):
+    if tables & SCHEDULE_TABLES:
+        pdf_cache.invalidate()
@@ -0,0 +1,252 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from decouple import config
+from app.service.schedulePdf import render_schedule_pdf, merge_pdfs
+
+RENDER_WORKERS = config("PDF_RENDER_WORKERS", default=2, cast=int)
+RENDER_MAX_QUEUE = config("PDF_RENDER_MAX_QUEUE", default=8, cast=int)
+RENDER_JOB_TTL = config("PDF_RENDER_JOB_TTL", default=600, cast=int)
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+def _timed_call(fn: Callable, args: tuple) -> Tuple[float, float, object]:
+    # Runs in the worker process: (wall clock start, render seconds, result)
+    started_at = time.time()
+    started = time.perf_counter()
+    result = fn(*args)
+    return started_at, time.perf_counter() - started, result
+
+
+class _RenderFuture(Future):
+    """Result of one render call; reports the pool future as running while a worker has it."""
+
+    def __init__(self, pool_future: Future):
+        super().__init__()
+        self._pool_future = pool_future
+
+    def running(self) -> bool:
+        return super().running() or (not self.done() and self._pool_future.running())
+
+
+class RenderJob(object):
+    def __init__(self, future: Future):
+        self.id = uuid.uuid4().hex
+        self.future = future
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        if self.future.cancelled() or self.future.exception() is not None:
+            return "failed"
+        return "done"
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.future.done() and not self.future.cancelled() and self.future.exception() is not None:
+            return str(self.future.exception())
+        return None
+
+    @property
+    def result(self) -> Optional[bytes]:
+        return self.future.result() if self.status == "done" else None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+
+
+class RenderService(object):
+    """
+    Renders schedule snapshots in a bounded process pool so that FPDF layout
+    never runs on the event loop. Work beyond workers + max_queue is rejected.
+    """
+
+    def __init__(self, max_workers: int = RENDER_WORKERS, max_queue: int = RENDER_MAX_QUEUE,
+                 job_ttl: int = RENDER_JOB_TTL):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.job_ttl = job_ttl
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, RenderJob] = {}
+        self._in_flight = 0
+        self._stats = {
+            "submitted_total": 0,
+            "completed_total": 0,
+            "failed_total": 0,
+            "rejected_total": 0,
+            "render_seconds_total": 0.0,
+            "queue_seconds_total": 0.0
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a multi-threaded uvicorn worker is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _submit_many(self, fn: Callable, args_list: List[tuple], admit: bool = True) -> List[Future]:
+        with self._lock:
+            if admit and self._in_flight + len(args_list) > self.max_workers + self.max_queue:
+                self._stats["rejected_total"] += 1
+                raise RenderQueueFull("Kolejka generowania PDF jest pelna")
+            self._in_flight += len(args_list)
+            self._stats["submitted_total"] += len(args_list)
+            executor = self._get_executor()
+
+        enqueued_at = time.time()
+
+        def _done(pool_future: Future, future: _RenderFuture):
+            failed = pool_future.cancelled() or pool_future.exception() is not None
+            with self._lock:
+                self._in_flight -= 1
+                if failed:
+                    self._stats["failed_total"] += 1
+                else:
+                    started_at, render_seconds, result = pool_future.result()
+                    self._stats["queue_seconds_total"] += max(started_at - enqueued_at, 0.0)
+                    self._stats["render_seconds_total"] += render_seconds
+                    self._stats["completed_total"] += 1
+            if pool_future.cancelled():
+                future.cancel()
+            elif failed:
+                future.set_exception(pool_future.exception())
+            else:
+                future.set_result(result)
+
+        futures = []
+        try:
+            for args in args_list:
+                pool_future = executor.submit(_timed_call, fn, args)
+                future = _RenderFuture(pool_future)
+                pool_future.add_done_callback(lambda f, future=future: _done(f, future))
+                futures.append(future)
+        except Exception:
+            # Calls that never reached the pool give their slots back; the submitted ones are not needed anymore
+            with self._lock:
+                self._in_flight -= len(args_list) - len(futures)
+                self._stats["submitted_total"] -= len(args_list) - len(futures)
+            for future in futures:
+                future._pool_future.cancel()
+            raise
+        return futures
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self._submit_many(fn, [args])[0]
+
+    def submit_schedules(self, schedules: List[Dict]) -> Future:
+        """
+        Split the network into one contiguous chunk of lines per worker, render
+        the chunks in parallel and concatenate them in line order in one more pool task.
+        """
+        chunk_count = min(self.max_workers, len(schedules))
+        if chunk_count <= 1:
+            return self.submit(render_schedule_pdf, schedules)
+
+        chunk_size = -(-len(schedules) // chunk_count)
+        chunks = [(schedules[i:i + chunk_size],) for i in range(0, len(schedules), chunk_size)]
+        parts = self._submit_many(render_schedule_pdf, chunks)
+
+        merged = Future()
+        merged.set_running_or_notify_cancel()
+        remaining = [len(parts)]
+        merge_lock = threading.Lock()
+
+        def _merged(merge: Future):
+            if merge.cancelled():
+                merged.set_exception(CancelledError())
+            elif merge.exception() is not None:
+                merged.set_exception(merge.exception())
+            else:
+                merged.set_result(merge.result())
+
+        def _part_done(_):
+            with merge_lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                # The merge is CPU work as well: it runs in the pool, not on this (the pool's) thread.
+                # The job was admitted with its chunks, so the merge takes one of their freed slots unchecked
+                merge = self._submit_many(merge_pdfs, [([part.result() for part in parts],)], admit=False)[0]
+            except Exception as e:
+                merged.set_exception(e)
+                return
+            merge.add_done_callback(_merged)
+
+        for part in parts:
+            part.add_done_callback(_part_done)
+        return merged
+
+    async def render(self, fn: Callable, *args) -> bytes:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    async def render_schedules(self, schedules: List[Dict]) -> bytes:
+        return await asyncio.wrap_future(self.submit_schedules(schedules))
+
+    def submit_job(self, schedules: List[Dict]) -> RenderJob:
+        self._prune_jobs()
+        job = RenderJob(self.submit_schedules(schedules))
+
+        def _finished(f: Future):
+            job.finished_at = time.time()
+
+        job.future.add_done_callback(_finished)
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get_job(self, job_id: str) -> Optional[RenderJob]:
+        self._prune_jobs()
+        return self._jobs.get(job_id)
+
+    def _prune_jobs(self):
+        cutoff = time.time() - self.job_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == "running")
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - self.max_workers, 0),
+                "running_jobs": running,
+                "stored_jobs": len(self._jobs),
+                **self._stats
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+render_service = RenderService()
@@ -0,0 +1,204 @@
+from fpdf import FPDF
+from datetime import datetime
+from typing import List, Dict
+from io import BytesIO
+from pypdf import PdfWriter
+
+class BusSchedulePDF(FPDF):
+    def __init__(self):
+        super().__init__()
+        self.set_auto_page_break(auto=True, margin=15)
+        self.section_label = None
+        self.section_start = 1
+
+    def start_section(self, label: str):
+        # Page numbers restart per section so independently rendered parts merge consistently
+        self.add_page()
+        self.section_label = label
+        self.section_start = self.page_no()
+        
+    def header(self):
+        self.set_font('Arial', 'B', 16)
+        self.cell(0, 10, 'Rozklad Jazdy Autobusow', 0, 1, 'C')
+        self.set_font('Arial', '', 10)
+        self.cell(0, 5, f'Wygenerowano: {datetime.now().strftime("%d.%m.%Y %H:%M")}', 0, 1, 'C')
+        self.ln(10)
+        
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        if self.section_label:
+            self.cell(0, 10, f'{self.section_label} - strona {self.page_no() - self.section_start + 1}', 0, 0, 'C')
+        else:
+            self.cell(0, 10, f'Strona {self.page_no()}', 0, 0, 'C')
+
+
+def render_schedule_pdf(schedules: List[Dict]) -> bytes:
+    pdf = BusSchedulePDF()
+
+    if not schedules:
+        pdf.add_page()
+        pdf.set_font('Arial', '', 12)
+        pdf.cell(0, 10, 'Brak danych o rozkladach jazdy w systemie.', 0, 1, 'C')
+        pdf.ln(10)
+        pdf.set_font('Arial', '', 10)
+        pdf.cell(0, 8, 'Aby wygenerowac rozklad jazdy, dodaj:', 0, 1, 'L')
+        pdf.cell(0, 6, '• Linie autobusowe', 0, 1, 'L')
+        pdf.cell(0, 6, '• Trasy z przystankami', 0, 1, 'L')
+        pdf.cell(0, 6, '• Warianty tras z godzinami odjazdu', 0, 1, 'L')
+        return bytes(pdf.output())
+
+    for line in schedules:
+        _render_line(pdf, line)
+
+    return bytes(pdf.output())
+
+
+def render_stop_pdf(stop: Dict, schedules: List[Dict]) -> bytes:
+    pdf = BusSchedulePDF()
+    pdf.start_section(f'Przystanek {stop["nazwa"]}')
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_fill_color(200, 220, 255)
+    pdf.cell(0, 10, f'Przystanek {stop["nazwa"]}', 1, 1, 'C', True)
+    if stop['ulica']:
+        pdf.set_font('Arial', 'I', 10)
+        pdf.cell(0, 8, stop['ulica'], 0, 1, 'C')
+    pdf.ln(5)
+
+    if not schedules:
+        pdf.set_font('Arial', '', 10)
+        pdf.cell(0, 8, 'Przez ten przystanek nie przejezdza zadna linia.', 0, 1, 'L')
+        return bytes(pdf.output())
+
+    for line in schedules:
+        pdf.set_font('Arial', 'B', 12)
+        pdf.set_fill_color(230, 230, 230)
+        pdf.cell(0, 8, f'Linia {line["numer"]} - {line["kierunek"]}', 1, 1, 'L', True)
+
+        for route in line['trasy']:
+            for variant in route['warianty']:
+                stops = variant['przystanki']
+                position = next(i for i, item in enumerate(stops) if item["id"] == stop["id"])
+                pdf.set_font('Arial', 'B', 10)
+                pdf.cell(0, 6, f'{route["nazwa"]}, wariant {variant["kod"]}: kierunek {stops[-1]["nazwa"]}', 0, 1, 'L')
+
+                pdf.set_font('Arial', '', 9)
+                pdf.cell(40, 5, 'Dalsze przystanki:', 0, 0, 'L')
+                next_stops = " > ".join(item["nazwa"] for item in stops[position + 1:]) or 'przystanek koncowy'
+                _print_wrapped_text(pdf, next_stops, 40, 150)
+
+                if variant['godziny']:
+                    pdf.set_font('Arial', 'B', 9)
+                    pdf.cell(40, 5, 'Odjazdy z poczatku:', 0, 0, 'L')
+                    pdf.set_font('Arial', '', 9)
+                    _print_wrapped_text(pdf, " | ".join(variant['godziny']), 40, 150)
+                else:
+                    pdf.set_font('Arial', 'I', 9)
+                    pdf.cell(40, 5, 'Odjazdy z poczatku:', 0, 0, 'L')
+                    pdf.cell(0, 5, 'Brak godzin odjazdu', 0, 1, 'L')
+
+                pdf.ln(3)
+
+        pdf.ln(2)
+
+    return bytes(pdf.output())
+
+
+def merge_pdfs(parts: List[bytes]) -> bytes:
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(BytesIO(part))
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def _render_line(pdf: BusSchedulePDF, line: Dict):
+    pdf.start_section(f'Linia {line["numer"]}')
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_fill_color(200, 220, 255)
+    pdf.cell(0, 10, f'Linia {line["numer"]} - {line["kierunek"]}', 1, 1, 'C', True)
+
+    if line['opis']:
+        pdf.set_font('Arial', 'I', 10)
+        pdf.cell(0, 8, line['opis'], 0, 1, 'C')
+
+    pdf.ln(5)
+
+    if not line['trasy']:
+        pdf.set_font('Arial', '', 10)
+        pdf.cell(0, 8, 'Brak przypisanych tras dla tej linii.', 0, 1, 'L')
+        return
+
+    for route in line['trasy']:
+        pdf.set_font('Arial', 'B', 12)
+        pdf.set_fill_color(230, 230, 230)
+        pdf.cell(0, 8, f'Trasa: {route["nazwa"]}', 1, 1, 'L', True)
+
+        if not route['warianty']:
+            pdf.set_font('Arial', '', 10)
+            pdf.cell(0, 6, '  Brak wariantow dla tej trasy.', 0, 1, 'L')
+            pdf.ln(3)
+            continue
+
+        for variant in route['warianty']:
+            pdf.set_font('Arial', 'B', 10)
+            pdf.cell(0, 6, f'Wariant {variant["kod"]}: {variant["nazwa"]}', 0, 1, 'L')
+
+            if variant['przystanki']:
+                pdf.set_font('Arial', '', 9)
+                pdf.cell(40, 5, 'Przystanki:', 0, 0, 'L')
+
+                stops_text = " > ".join([
+                    f"{stop['nazwa']}" + (f" ({stop['ulica']})" if stop['ulica'] else "")
+                    for stop in variant['przystanki']
+                ])
+
+                _print_wrapped_text(pdf, stops_text, 40, 150)
+            else:
+                pdf.set_font('Arial', 'I', 9)
+                pdf.cell(40, 5, 'Przystanki:', 0, 0, 'L')
+                pdf.cell(0, 5, 'Brak przypisanych przystankow', 0, 1, 'L')
+
+            if variant['godziny']:
+                pdf.set_font('Arial', 'B', 9)
+                pdf.cell(40, 5, 'Godziny odjazdu:', 0, 0, 'L')
+                pdf.set_font('Arial', '', 9)
+                hours_text = " | ".join(variant['godziny'])
+                _print_wrapped_text(pdf, hours_text, 40, 150)
+            else:
+                pdf.set_font('Arial', 'I', 9)
+                pdf.cell(40, 5, 'Godziny odjazdu:', 0, 0, 'L')
+                pdf.cell(0, 5, 'Brak godzin odjazdu', 0, 1, 'L')
+
+            pdf.ln(3)
+
+        pdf.ln(2)
+
+
+def _print_wrapped_text(pdf, text: str, indent: float, max_width: float):
+    if pdf.get_string_width(text) <= max_width:
+        pdf.cell(0, 5, text, 0, 1, 'L')
+    else:
+        words = text.split(' ')
+        lines = []
+        current_line = ""
+
+        for word in words:
+            test_line = current_line + " " + word if current_line else word
+            if pdf.get_string_width(test_line) <= max_width:
+                current_line = test_line
+            else:
+                if current_line:
+                    lines.append(current_line)
+                current_line = word
+
+        if current_line:
+            lines.append(current_line)
+
+        for i, line_text in enumerate(lines):
+            if i == 0:
+                pdf.cell(0, 5, line_text, 0, 1, 'L')
+            else:
+                pdf.cell(indent, 5, '', 0, 0, 'L')
+                pdf.cell(0, 5, line_text, 0, 1, 'L')
@@ -1,29 +1,34 @@
 from app.db.repository.userRepo import AuthRepository
 from app.db.schema.user import UserOutput, UserInCreate, UserInLogin, UserWithToken
 from app.db.schema.autobus import AutobusInCreate, AutobusOutput,  BrygadaInCreate, BrygadaOutput, KierowcaInCreate, KierowcaOutput, LiniaInCreate, LiniaOutput, PrzystanekInCreate, PrzystanekOutput,TrasaInCreate, TrasaOutput, WariantInCreate, WariantOutput
-from app.core.security.hashHelper import HashHelper
+from app.core.security.hashHelper import password_hasher
 from app.core.security.authHandler import AuthHandler
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 class UserService:
     def __init__(self, session: Session):
         self.__authRepository__ = AuthRepository(session=session)
     
-    def signup(self, user_details: UserInCreate) -> UserOutput:
-        if self.__authRepository__.user_exist_by_username(username=user_details.username):
+    async def signup(self, user_details: UserInCreate) -> UserOutput:
+        if await run_in_threadpool(self.__authRepository__.user_exist_by_username, username=user_details.username):
             raise HTTPException(status_code=400, detail="Please Login")
         
-        hashed_password = HashHelper.get_password_hash(plain_password=user_details.password)
+        hashed_password = await password_hasher.hash(user_details.password)
         user_details.password = hashed_password
-        return self.__authRepository__.create_user(user_data=user_details)
+        return await run_in_threadpool(self.__authRepository__.create_user, user_data=user_details)
     
-    def login(self, login_details: UserInLogin) -> UserWithToken:
-        if not self.__authRepository__.user_exist_by_username(username=login_details.username):
+    async def login(self, login_details: UserInLogin) -> UserWithToken:
+        user = await run_in_threadpool(self.__authRepository__.get_user_by_username, username=login_details.username)
+        if not user:
             raise HTTPException(status_code=400, detail="Please Register")
         
-        user = self.__authRepository__.get_user_by_username(username=login_details.username)
-        if HashHelper.verify_password(plain_password=login_details.password, hashed_password=user.password):
+        if await password_hasher.verify(login_details.password, user.password):
+            if password_hasher.needs_rehash(user.password):
+                # BCRYPT_ROUNDS changed since this password was stored
+                new_hash = await password_hasher.hash(login_details.password)
+                await run_in_threadpool(self.__authRepository__.update_password, user_id=user.id, hashed_password=new_hash)
             token = AuthHandler.sign_jwt(user_id=user.id)
             if token:
                 return UserWithToken(token=token)
@@ -0,0 +1,28 @@
+"""Import a GTFS feed: python -m app.util.import_gtfs feed.zip"""
+from app.core.database import AppSession
+from app.service.gtfsImport import import_gtfs, GtfsImportError
+import argparse
+import sys
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Import rozkładu z archiwum GTFS")
+    parser.add_argument("archiwum", help="Ścieżka do pliku GTFS (.zip)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = AppSession()
+    try:
+        stats = import_gtfs(db, args.archiwum)
+    except GtfsImportError as e:
+        print(f"Błąd importu: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db.close()
+
+    for name, count in stats.items():
+        print(f"{name}: {count}")
+    print(f"Czas importu: {time.perf_counter() - started:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +0,0 @@
-from app.core.database import Base, engine
-from app.db.models import user, system
-
-def create_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
@@ -1,13 +1,45 @@
 from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import Annotated, Union
+from typing import Annotated, Set, Union
 from app.core.security.authHandler import AuthHandler
-from app.service.userService import UserService
+from app.core.cache import ReferenceCache
+from app.core.changes import on_change
+from app.db.repository.userRepo import AuthRepository
 from app.core.database import get_db
+from app.db.models.user import User, User_Rola, Rola
 from app.db.schema.user import UserOutput
 from decouple import config
 
 AUTH_PREFIX = config("AUTH_PREFIX")
+AUTH_CACHE_TTL = config("AUTH_CACHE_TTL", default=60, cast=float)
+AUTH_CACHE_MAX_ENTRIES = config("AUTH_CACHE_MAX_ENTRIES", default=10000, cast=int)
+
+USER_TABLES = {User.__tablename__, User_Rola.__tablename__, Rola.__tablename__}
+
+# (user id, token) -> UserOutput with the roles read from the database; token expiry is still checked by
+# decde_jwt on every request. Role changes made outside the API apply after AUTH_CACHE_TTL
+identity_cache = ReferenceCache(ttl=AUTH_CACHE_TTL, max_entries=AUTH_CACHE_MAX_ENTRIES)
+
+
+@on_change
+def _invalidate_identities(tables: Set[str]):
+    if tables & USER_TABLES:
+        identity_cache.clear()
+
+
+def _load_identity(session: Session, payload: dict, auth_exception: HTTPException) -> UserOutput:
+    repository = AuthRepository(session=session)
+    user = repository.get_user_by_id(user_id=payload["user_id"])
+    if user is None:
+        # The account was deleted after the token was issued
+        raise auth_exception
+    # Roles are read from the database, so a role change applies without a new login
+    return UserOutput(
+        id=user.id,
+        username=user.username,
+        roles=repository.get_role_names(user_id=user.id)
+    )
+
 
 def get_current_user(
         session: Session = Depends(get_db), 
@@ -24,17 +56,12 @@ def get_current_user(
     if not authorisation.startswith(AUTH_PREFIX):
         raise auth_exception
     
-    payload = AuthHandler.decde_jwt(token=authorisation[len(AUTH_PREFIX):])
+    token = authorisation[len(AUTH_PREFIX):]
+    payload = AuthHandler.decde_jwt(token=token)
 
     if payload and payload["user_id"]:
-        try:
-            user = UserService(session=session).get_user_by_id(payload["user_id"])
-            return UserOutput(
-                id= user.id,
-                username= user.username,
-                email= user.email
-            )
-        except Exception as error:
-            raise error
+        return identity_cache.get_or_load(
+            User.__tablename__, (payload["user_id"], token), lambda: _load_identity(session, payload, auth_exception)
+        )
     
-    raise auth_exception
\ No newline at end of file
+    raise auth_exception
@@ -0,0 +1,212 @@
+"""Generates a synthetic city for the benchmarks against the application models.
+
+    python -m benchmarks.city --size medium --reset
+    python -m benchmarks.city --database-url postgresql://localhost/transport_bench --lines 200 --departures 60
+
+Each line gets its own routes (one Linie_Trasy row each), each route its variants
+with stops in SEQUENCE_GAP steps and departures at the first stop (Odjazdy and
+the legacy Warianty.godziny_odjazdu JSON). Brigades are spread over the lines;
+buses and drivers over the brigades. The same --seed builds the same city.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import time as clock_time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmarks/city.db")
+
+from sqlalchemy import create_engine, delete, insert, text
+from sqlalchemy.engine import Engine
+
+from app.db.models import user, system
+from app.db.models.system import (
+    Autobusy, Brygady, Brygady_Autobusy, Brygady_Linie, Gtfs_Trasy, Gtfs_Warianty, Kierowcy, Kierowcy_Brygady,
+    Linie, Linie_Trasy, Odjazdy, Przystanki, Przystanki_Warianty, Trasy, Warianty, Warianty_Trasy
+)
+from app.db.crud.sequence import SEQUENCE_GAP
+from app.db.migrations import run_migrations
+
+DEFAULT_DATABASE_URL = "sqlite:///benchmarks/city.db"
+
+SIZES = {
+    "small": dict(lines=10, routes=2, variants=2, stops=150, stops_per_variant=12, departures=20,
+                  brigades=30, buses=40, drivers=60),
+    "medium": dict(lines=60, routes=2, variants=2, stops=900, stops_per_variant=22, departures=40,
+                   brigades=180, buses=220, drivers=400),
+    "large": dict(lines=250, routes=3, variants=2, stops=4000, stops_per_variant=30, departures=70,
+                  brigades=750, buses=900, drivers=1600),
+}
+
+STREETS = ("Dluga", "Krakowska", "Zielona", "Polna", "Lesna", "Szkolna", "Ogrodowa", "Lipowa", "Brzozowa", "Kwiatowa",
+           "Sloneczna", "Mickiewicza", "Kosciuszki", "Sienkiewicza", "Kolejowa", "Parkowa", "Warszawska", "Rynek")
+MAKES = (("Solaris", "Urbino 12"), ("Solaris", "Urbino 18"), ("Mercedes", "Citaro"), ("MAN", "Lions City"),
+         ("Volvo", "7900"), ("Autosan", "Sancity"))
+FIRST_NAMES = ("Jan", "Anna", "Piotr", "Maria", "Krzysztof", "Katarzyna", "Tomasz", "Agnieszka", "Pawel", "Ewa")
+LAST_NAMES = ("Nowak", "Kowalski", "Wisniewski", "Wojcik", "Kaminski", "Lewandowski", "Zielinski", "Szymanski")
+
+CITY_TABLES = [Gtfs_Warianty, Gtfs_Trasy, Odjazdy, Przystanki_Warianty, Warianty_Trasy, Linie_Trasy, Brygady_Linie, Kierowcy_Brygady,
+               Brygady_Autobusy, Warianty, Trasy, Linie, Przystanki, Brygady, Autobusy, Kierowcy]
+
+
+def _insert(connection, model, rows) -> list:
+    if not rows:
+        return []
+    return connection.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows).scalars().all()
+
+
+def _departures(rng: random.Random, count: int) -> list:
+    # Service from 04:30 to 23:30, evenly spread with a few minutes of jitter
+    first, last = 4 * 60 + 30, 23 * 60 + 30
+    step = (last - first) / max(1, count)
+    minutes = sorted({min(last, int(first + i * step + rng.randint(0, 4))) for i in range(count)})
+    return [clock_time(minute // 60, minute % 60) for minute in minutes]
+
+
+def reset(engine: Engine):
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            tables = ", ".join(f'"{model.__tablename__}"' for model in CITY_TABLES)
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        else:
+            for model in CITY_TABLES:
+                connection.execute(delete(model))
+
+
+def generate(engine: Engine, lines: int, routes: int, variants: int, stops: int, stops_per_variant: int,
+             departures: int, brigades: int, buses: int, drivers: int, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    stops_per_variant = min(stops_per_variant, stops)
+    with engine.begin() as connection:
+        stop_ids = _insert(connection, Przystanki, [{
+            "nazwa": f"{STREETS[i % len(STREETS)]} {i + 1}",
+            "ulica": STREETS[i % len(STREETS)],
+            "longi": round(19.80 + rng.random() * 0.3, 6),
+            "lati": round(49.98 + rng.random() * 0.15, 6)
+        } for i in range(stops)])
+
+        line_numbers = [str(100 + i) for i in range(lines)]
+        line_ids = _insert(connection, Linie, [{
+            "numer": numer,
+            "kierunek": f"{STREETS[i % len(STREETS)]} - {STREETS[(i + 7) % len(STREETS)]}",
+            "opis": f"Linia {numer}"
+        } for i, numer in enumerate(line_numbers)])
+
+        route_lines = [(line_ids[i], line_numbers[i]) for i in range(lines) for _ in range(routes)]
+        route_ids = _insert(connection, Trasy, [{"nazwa": f"Trasa {numer}/{k % routes + 1}"}
+                                                for k, (_, numer) in enumerate(route_lines)])
+        _insert(connection, Linie_Trasy, [{"id_linie": line_id, "id_trasy": route_id, "numer_linii": numer}
+                                          for route_id, (line_id, numer) in zip(route_ids, route_lines)])
+
+        variant_rows, variant_routes, variant_hours, variant_stops = [], [], [], []
+        for route_id in route_ids:
+            for k in range(variants):
+                hours = _departures(rng, departures)
+                variant_rows.append({
+                    "nazwa": f"Wariant {chr(65 + k % 26)}",
+                    "kod_wariantu": f"{chr(65 + k % 26)}{route_id % 10000}",
+                    "godziny_odjazdu": json.dumps([hour.strftime("%H:%M") for hour in hours])
+                })
+                variant_routes.append(route_id)
+                variant_hours.append(hours)
+                variant_stops.append(rng.sample(stop_ids, stops_per_variant))
+        variant_ids = _insert(connection, Warianty, variant_rows)
+        _insert(connection, Warianty_Trasy, [{"id_warianty": variant_id, "id_trasy": route_id}
+                                             for variant_id, route_id in zip(variant_ids, variant_routes)])
+        _insert(connection, Przystanki_Warianty, [
+            {"id_warianty": variant_id, "id_przystanki": stop_id, "kolejnosc": (position + 1) * SEQUENCE_GAP}
+            for variant_id, chosen in zip(variant_ids, variant_stops)
+            for position, stop_id in enumerate(chosen)
+        ])
+        departure_ids = _insert(connection, Odjazdy, [
+            {"id_warianty": variant_id, "id_przystanku": chosen[0], "godzina": hour}
+            for variant_id, chosen, hours in zip(variant_ids, variant_stops, variant_hours)
+            for hour in hours
+        ])
+
+        brigade_lines = [line_numbers[i % lines] if lines else "0" for i in range(brigades)]
+        brigade_ids = _insert(connection, Brygady, [{"nazwa": f"{numer}/{i // max(1, lines) + 1:02d}"}
+                                                    for i, numer in enumerate(brigade_lines)])
+        if line_ids:
+            _insert(connection, Brygady_Linie, [{"id_brygady": brigade_id, "id_linie": line_ids[i % lines]}
+                                                for i, brigade_id in enumerate(brigade_ids)])
+
+        bus_ids = _insert(connection, Autobusy, [{
+            "rejestracja": f"KR{i + 1:05d}",
+            "marka": MAKES[i % len(MAKES)][0],
+            "model": MAKES[i % len(MAKES)][1]
+        } for i in range(buses)])
+        driver_ids = _insert(connection, Kierowcy, [{
+            "imie": rng.choice(FIRST_NAMES),
+            "nazwisko": rng.choice(LAST_NAMES),
+            "pesel": f"{80010100000 + i}"
+        } for i in range(drivers)])
+        if brigade_ids:
+            _insert(connection, Brygady_Autobusy, [{"id_brygady": brigade_ids[i % brigades], "id_autobusy": bus_id}
+                                                   for i, bus_id in enumerate(bus_ids)])
+            _insert(connection, Kierowcy_Brygady, [{"id_brygady": brigade_ids[i % brigades], "id_kierowcy": driver_id}
+                                                   for i, driver_id in enumerate(driver_ids)])
+
+    return {
+        "Przystanki": len(stop_ids), "Linie": len(line_ids), "Trasy": len(route_ids), "Warianty": len(variant_ids),
+        "Przystanki_Warianty": len(variant_ids) * stops_per_variant, "Odjazdy": len(departure_ids),
+        "Brygady": len(brigade_ids), "Autobusy": len(bus_ids), "Kierowcy": len(driver_ids)
+    }
+
+
+def build_parser(parser: argparse.ArgumentParser = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--size", choices=sorted(SIZES), default="small",
+                        help="preset; the options below override single values")
+    for name, help_text in (("lines", "linie"), ("routes", "trasy na linie"), ("variants", "warianty na trase"),
+                            ("stops", "przystanki"), ("stops-per-variant", "przystanki na wariant"),
+                            ("departures", "odjazdy na wariant"), ("brigades", "brygady"),
+                            ("buses", "autobusy"), ("drivers", "kierowcy")):
+        parser.add_argument(f"--{name}", type=int, help=help_text)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="usun istniejace dane miasta przed generowaniem")
+    return parser
+
+
+def city_options(args: argparse.Namespace) -> dict:
+    options = dict(SIZES[args.size])
+    for name in options:
+        value = getattr(args, name)
+        if value is not None:
+            options[name] = value
+    return options
+
+
+def is_empty(engine: Engine) -> bool:
+    with engine.connect() as connection:
+        return connection.execute(text('SELECT COUNT(*) FROM "Linie"')).scalar() == 0
+
+
+def prepare(engine: Engine, args: argparse.Namespace) -> dict:
+    """Migrates the schema and generates the city when asked to or when the database holds none."""
+    run_migrations(engine)
+    if not (args.reset or is_empty(engine)):
+        return {}
+    reset(engine)
+    return generate(engine, seed=args.seed, **city_options(args))
+
+
+def main():
+    args = build_parser().parse_args()
+    engine = create_engine(args.database_url)
+    run_migrations(engine)
+    if not (args.reset or is_empty(engine)):
+        raise SystemExit("Baza zawiera juz dane miasta, uzyj --reset")
+    started = time.perf_counter()
+    counts = prepare(engine, args)
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"{table:<22}{count:>10}")
+    print(f"{'czas':<22}{elapsed:>9.1f}s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
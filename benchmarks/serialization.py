@@ -0,0 +1,98 @@
+"""Compares serialization paths of the /transport list endpoints.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 20
+
+legacy    - ORM instances through jsonable_encoder and JSONResponse (previous behaviour)
+validated - Core rows validated with the row schemas, rendered with orjson
+fast      - Core rows rendered with orjson directly (current endpoints)
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///benchmarks/serialization.db")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.core.database import Base
+from app.db.models import user, system
+from app.db.models.system import Przystanki, Warianty
+from app.db.schema.autobus import PrzystanekRow, WariantRow
+
+
+def seed(engine, rows: int):
+    Base.metadata.drop_all(engine, tables=[Przystanki.__table__, Warianty.__table__])
+    Base.metadata.create_all(engine, tables=[Przystanki.__table__, Warianty.__table__])
+    with engine.begin() as connection:
+        connection.execute(insert(Przystanki), [
+            {"nazwa": f"Przystanek {i}", "ulica": f"Ulica {i % 500}", "longi": 19.9 + i / 1e5, "lati": 50.0 + i / 1e5}
+            for i in range(rows)
+        ])
+        connection.execute(insert(Warianty), [
+            {"nazwa": f"Wariant {i}", "kod_wariantu": f"K{i % 100}", "godziny_odjazdu": '["06:00", "07:30"]'}
+            for i in range(rows)
+        ])
+
+
+def legacy(db: Session, model, schema):
+    return JSONResponse(jsonable_encoder(db.execute(select(model)).scalars().all())).body
+
+
+def validated(db: Session, model, schema):
+    rows = db.execute(select(*model.__table__.columns)).all()
+    adapter = TypeAdapter(List[schema])
+    return ORJSONResponse(adapter.dump_python(adapter.validate_python([row._asdict() for row in rows]))).body
+
+
+def fast(db: Session, model, schema):
+    rows = db.execute(select(*model.__table__.columns)).all()
+    return ORJSONResponse([row._asdict() for row in rows]).body
+
+
+def measure(engine, fn, model, schema, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as db:
+            started = time.perf_counter()
+            fn(db, model, schema)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/serialization.db")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    seed(engine, args.rows)
+
+    print(f"{'tabela':<12}{'sciezka':<12}{'p50 ms':>10}{'p95 ms':>10}{'przyspieszenie':>16}")
+    for model, schema in ((Przystanki, PrzystanekRow), (Warianty, WariantRow)):
+        # The paths must produce the same payload before timings are comparable
+        with Session(engine) as db:
+            assert json.loads(legacy(db, model, schema)) == json.loads(fast(db, model, schema))
+
+        baseline = None
+        for name, fn in (("legacy", legacy), ("validated", validated), ("fast", fast)):
+            measure(engine, fn, model, schema, 2)
+            timings = sorted(measure(engine, fn, model, schema, args.repeat))
+            p50 = statistics.median(timings)
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            baseline = baseline or p50
+            print(f"{model.__tablename__:<12}{name:<12}{p50:>10.1f}{p95:>10.1f}{baseline / p50:>15.1f}x")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
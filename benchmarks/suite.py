@@ -0,0 +1,235 @@
+"""End-to-end benchmarks of the API on a synthetic city (see benchmarks.city).
+
+    python -m benchmarks.suite                                   # SQLite, small city
+    python -m benchmarks.suite --database-url postgresql://localhost/transport_bench --size medium \\
+        --requests 500 --concurrency 8 --save benchmarks/results.json
+    python -m benchmarks.suite --baseline benchmarks/results.json --tolerance 0.25   # exit 1 on regression
+
+Requests go through the ASGI app in-process (TestClient), so timings cover
+routing, validation, serialization and the database but no network. Groups:
+
+crud     - list, detail, 304 revalidation and create/update/delete of /transport resources
+schedule - ScheduleGenerator.get_line_schedules for all lines and for one line
+pdf      - ScheduleGenerator.generate_pdf of the whole city
+trasyv2  - POST /transport/trasyv2 creating a route with two variants
+auth     - /auth/signup, /auth/login (bcrypt) and a protected request with the token
+
+The city is generated when the database has none, or again with --reset.
+Writes made by the scenarios stay in the database; use --reset for a clean run.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import uuid
+
+# Settings are read when the app is imported, so the database and cache switches are parsed first
+_settings = argparse.ArgumentParser(add_help=False)
+_settings.add_argument("--database-url", default="sqlite:///benchmarks/city.db")
+_settings.add_argument("--no-cache", action="store_true")
+_known, _ = _settings.parse_known_args()
+os.environ["DATABASE_URL"] = _known.database_url
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("AUTH_PREFIX", "Bearer ")
+if _known.no_cache:
+    os.environ["REF_CACHE_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.core.database import AppSession, engine
+from app.db.models.system import Autobusy, Linie, Przystanki, Warianty
+from app.routers.pdf_generator import ScheduleGenerator
+from benchmarks import city
+from benchmarks.timing import compare, print_results, run, save_results
+import main as application
+
+GROUPS = ("crud", "schedule", "pdf", "trasyv2", "auth")
+
+
+def _checked(response, *statuses):
+    if response.status_code not in (statuses or (200,)):
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def crud_scenarios(client, ids, rng, args):
+    token = uuid.uuid4().hex[:4]
+    created = []
+
+    def detail(path, pool):
+        return lambda i: _checked(client.get(f"{path}/{rng.choice(pool)}"))
+
+    def revalidate(i):
+        _checked(client.get("/transport/linie", headers={"If-None-Match": etag}), 304)
+
+    def create(i):
+        response = _checked(client.post("/transport/autobusy", json={
+            "rejestracja": f"B{token}{i % 100:02d}" if i >= 0 else f"W{token}{-i:02d}",
+            "marka": "Solaris", "model": "Urbino 12"
+        }), 201)
+        created.append(response.json()["id"])
+
+    def update(i):
+        _checked(client.put("/transport/autobusy", json={"id": created[i % len(created)], "model": f"Urbino {i % 19}"}))
+
+    def remove(i):
+        _checked(client.delete(f"/transport/autobusy/{created.pop()}"))
+
+    etag = _checked(client.get("/transport/linie")).headers.get("ETag", "")
+    requests = min(args.requests, 100)
+    return [
+        ("GET /transport/linie", lambda i: _checked(client.get("/transport/linie")), args.requests),
+        ("GET /transport/przystanki", lambda i: _checked(client.get("/transport/przystanki")), args.requests),
+        ("GET /transport/autobusy", lambda i: _checked(client.get("/transport/autobusy")), args.requests),
+        ("GET /transport/linie (304)", revalidate, args.requests),
+        ("GET /transport/linie/{id}", detail("/transport/linie", ids["Linie"]), args.requests),
+        ("GET /transport/autobusy/{id}", detail("/transport/autobusy", ids["Autobusy"]), args.requests),
+        ("GET /transport/warianty/{id}", detail("/transport/warianty", ids["Warianty"]), args.requests),
+        ("GET /transport/przystanki/{id}/odjazdy",
+         lambda i: _checked(client.get(f"/transport/przystanki/{rng.choice(ids['Przystanki'])}/odjazdy")),
+         args.requests),
+        # Registration plates are 7 characters: one pass creates at most 100 buses, deleted again by DELETE
+        ("POST /transport/autobusy", create, requests),
+        ("PUT /transport/autobusy", update, requests),
+        ("DELETE /transport/autobusy/{id}", remove, requests),
+    ]
+
+
+def schedule_scenarios(session_factory, ids, rng, args):
+    def schedules(line_ids):
+        def operation(i):
+            with session_factory() as db:
+                ScheduleGenerator(db).get_line_schedules(line_ids() if line_ids else None)
+        return operation
+
+    return [
+        ("get_line_schedules (wszystkie)", schedules(None), max(1, args.requests // 10)),
+        ("get_line_schedules (1 linia)", schedules(lambda: [rng.choice(ids["Linie"])]), args.requests),
+    ]
+
+
+def pdf_scenarios(session_factory, ids, rng, args):
+    directory = tempfile.mkdtemp(prefix="bench_pdf_")
+
+    def generate(i):
+        with session_factory() as db:
+            path = ScheduleGenerator(db).generate_pdf(os.path.join(directory, f"rozklad_{i % 4}.pdf"))
+        if os.path.getsize(path) == 0:
+            raise RuntimeError("pusty PDF")
+
+    return [("generate_pdf", generate, args.pdf_requests)]
+
+
+def trasyv2_scenarios(client, ids, rng, args):
+    def create(i):
+        stops = rng.sample(ids["Przystanki"], min(len(ids["Przystanki"]), 24))
+        _checked(client.post("/transport/trasyv2", json={
+            "nazwa_trasy": f"Trasa testowa {i}",
+            "warianty": [
+                {"kod_wariantu": "A", "przystanki_ids": stops[:12],
+                 "godziny_odjazdu": [f"{hour:02d}:15" for hour in range(5, 23)]},
+                {"kod_wariantu": "B", "przystanki_ids": stops[12:] or stops[:2],
+                 "godziny_odjazdu": [f"{hour:02d}:45" for hour in range(5, 23)]}
+            ]
+        }))
+
+    return [("POST /transport/trasyv2", create, args.requests)]
+
+
+def auth_scenarios(client, ids, rng, args):
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    password = "haslo-benchmark"
+    tokens = []
+
+    def signup(i):
+        _checked(client.post("/auth/signup", json={"username": f"{prefix}-{i}", "password": password}), 201)
+
+    def login(i):
+        response = _checked(client.post("/auth/login", json={"username": f"{prefix}-{max(i, 0) % requests}",
+                                                            "password": password}))
+        tokens.append(response.json()["token"])
+
+    def protected(i):
+        _checked(client.get("/protected", headers={"authorisation": f"Bearer {tokens[i % len(tokens)]}"}))
+
+    # bcrypt dominates; a handful of calls is enough for stable percentiles
+    requests = max(1, args.auth_requests)
+    return [
+        ("POST /auth/signup", signup, requests),
+        ("POST /auth/login", login, requests),
+        ("GET /protected", protected, args.requests),
+    ]
+
+
+def _city_ids(engine):
+    with engine.connect() as connection:
+        return {model.__tablename__: connection.execute(select(model.id)).scalars().all()
+                for model in (Linie, Przystanki, Warianty, Autobusy)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    city.build_parser(parser)
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"grupy oddzielone przecinkami: {', '.join(GROUPS)}")
+    parser.add_argument("--requests", type=int, default=200, help="wywolania na scenariusz")
+    parser.add_argument("--pdf-requests", type=int, default=3)
+    parser.add_argument("--auth-requests", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--no-cache", action="store_true", help="wylacz cache danych referencyjnych (REF_CACHE_ENABLED)")
+    parser.add_argument("--save", help="zapisz wyniki jako JSON")
+    parser.add_argument("--baseline", help="porownaj z zapisanymi wynikami i zakoncz kodem 1 przy regresji")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="dopuszczalny wzrost p95 / spadek ops/s")
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.only.split(",") if group.strip()]
+    unknown = sorted(set(groups) - set(GROUPS))
+    if unknown:
+        parser.error(f"nieznane grupy: {', '.join(unknown)}")
+
+    counts = city.prepare(engine, args)
+    if counts:
+        print("wygenerowano miasto: " + ", ".join(f"{table} {count}" for table, count in counts.items()))
+    ids = _city_ids(engine)
+    rng = random.Random(args.seed)
+
+    results = []
+    with TestClient(application.app) as client:
+        builders = {
+            "crud": lambda: crud_scenarios(client, ids, rng, args),
+            "schedule": lambda: schedule_scenarios(AppSession, ids, rng, args),
+            "pdf": lambda: pdf_scenarios(AppSession, ids, rng, args),
+            "trasyv2": lambda: trasyv2_scenarios(client, ids, rng, args),
+            "auth": lambda: auth_scenarios(client, ids, rng, args),
+        }
+        for group in groups:
+            for name, operation, requests in builders[group]():
+                # Writes depend on each other's order; only reads run concurrently
+                concurrency = args.concurrency if name.startswith(("GET", "get_")) else 1
+                results.append(run(name, operation, requests, concurrency))
+
+    print(f"{engine.dialect.name}, wspolbieznosc {args.concurrency}")
+    print_results(results)
+    meta = {"database": engine.dialect.name, "size": args.size, "concurrency": args.concurrency,
+            "requests": args.requests, "seed": args.seed}
+    if args.save:
+        save_results(args.save, results, meta)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            before = json.load(baseline_file)["meta"]
+        mismatched = [key for key in ("database", "size", "concurrency") if before.get(key) != meta[key]]
+        if mismatched:
+            print("UWAGA: inne ustawienia niz w pomiarze bazowym: " + ", ".join(mismatched))
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESJA {regression}")
+        if regressions:
+            sys.exit(1)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Timing, percentile reporting and baseline comparison shared by the benchmarks."""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Latency differences below this are noise on a developer machine, whatever the ratio
+NOISE_FLOOR_MS = 1.0
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Result(object):
+    def __init__(self, name: str, latencies: List[float], seconds: float, errors: int, first_error: Optional[str]):
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.seconds = seconds
+        self.errors = errors
+        self.first_error = first_error
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "ops_per_s": round(self.throughput, 2),
+            "p50_ms": round(percentile(self.latencies, 0.50), 3),
+            "p95_ms": round(percentile(self.latencies, 0.95), 3),
+            "p99_ms": round(percentile(self.latencies, 0.99), 3),
+            "max_ms": round(self.latencies[-1], 3) if self.latencies else 0.0
+        }
+
+
+def run(name: str, operation: Callable[[int], object], requests: int, concurrency: int = 1,
+        warmup: int = 2) -> Result:
+    """
+    Calls operation(i) `requests` times from `concurrency` threads, after `warmup`
+    untimed calls. An operation fails by raising; failures are counted, not timed.
+    """
+    latencies: List[float] = []
+    errors = [0, None]
+    for i in range(min(warmup, requests)):
+        try:
+            operation(-1 - i)
+        except Exception as e:
+            errors[0] += 1
+            errors[1] = errors[1] or f"rozgrzewka: {type(e).__name__}: {e}"
+
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            try:
+                operation(i)
+            except Exception as e:
+                with lock:
+                    errors[0] += 1
+                    errors[1] = errors[1] or f"{type(e).__name__}: {e}"
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return Result(name, latencies, time.perf_counter() - started, errors[0], errors[1])
+
+
+def print_results(results: List[Result]):
+    width = max([len(result.name) for result in results] + [12]) + 2
+    print(f"{'scenariusz':<{width}}{'n':>7}{'bledy':>7}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}")
+    for result in results:
+        row = result.to_dict()
+        print(f"{result.name:<{width}}{row['requests']:>7}{row['errors']:>7}{row['ops_per_s']:>10.1f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}")
+        if result.first_error:
+            print(f"{'':<{width}}! {result.first_error[:200]}")
+
+
+def save_results(path: str, results: List[Result], meta: dict):
+    with open(path, "w") as output:
+        json.dump({"meta": meta, "results": {result.name: result.to_dict() for result in results}}, output, indent=2)
+
+
+def compare(results: List[Result], baseline_path: str, tolerance: float) -> List[str]:
+    """Scenarios whose p95 grew or throughput fell by more than `tolerance` against a saved run."""
+    with open(baseline_path) as baseline_file:
+        baseline: Dict[str, dict] = json.load(baseline_file)["results"]
+    regressions = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        now = result.to_dict()
+        if now["errors"] > before["errors"]:
+            regressions.append(f"{result.name}: bledy {before['errors']} -> {now['errors']}")
+        if (now["p95_ms"] > before["p95_ms"] * (1 + tolerance)
+                and now["p95_ms"] - before["p95_ms"] > NOISE_FLOOR_MS):
+            regressions.append(f"{result.name}: p95 {before['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms")
+        if now["ops_per_s"] < before["ops_per_s"] * (1 - tolerance):
+            regressions.append(f"{result.name}: ops/s {before['ops_per_s']:.1f} -> {now['ops_per_s']:.1f}")
+    return regressions
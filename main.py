@@ -1,18 +1,31 @@
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from app.util.init_db import create_tables
 from app.routers.auth import authRouter
 from app.util.protectRoute import get_current_user
 from app.db.schema.user import UserOutput
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers.autobusy import router
 from app.routers.pdf_generator import router as pdf_router
+from app.routers.internal import router as internal_router
+from app.routers.export import router as export_router
+from app.service.renderService import render_service
+from app.core.security.hashHelper import password_hasher
+from app.core.database import dispose_async_engine
+from app.core.metrics import MetricsMiddleware, request_metrics
+from app.core.profiling import query_profiler
+from app.core.broadcast import start_change_broadcast, stop_change_broadcast
 
 @asynccontextmanager
 async def lifespan(app : FastAPI):
-    print("Created")
-    create_tables()
+    # Schema migrations run at deploy time: python -m app.db.migrations
+    start_change_broadcast()
     yield
+    stop_change_broadcast()
+    render_service.shutdown()
+    password_hasher.shutdown()
+    query_profiler.shutdown()
+    await dispose_async_engine()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -30,18 +43,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag"],
 )
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/health")
 def health_check():
     return{"status": "Running..."}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/protected")
 def read_protected(user: UserOutput = Depends(get_current_user)):
     return{"status": "Running..."}
 
 app.include_router(router)
 app.include_router(pdf_router)
+app.include_router(internal_router)
+app.include_router(export_router)
 
 @app.get("/")
 def root():